@@ -5,6 +5,8 @@ import time
 import _thread
 import random
 from mini_protocol import PacketV12
+from timer_wheel import TimerWheel
+from rtt_estimator import RttEstimator
 
 # ==========================================
 # CONFIGURATION
@@ -12,8 +14,11 @@ from mini_protocol import PacketV12
 MY_ADDR = 0x0A          # Address of THIS node (0x00 - 0x0F)
 TARGET_ADDR = 0x0B      # Address of DESTINATION node
 WINDOW_SIZE = 4         # ARQ Sliding Window Size (Low for SF12 to reduce congestion)
-TIMEOUT_MS = 10000      # Retransmission Timeout (10s). Packet Time-on-Air at SF12 is ~1.5s-2s.
+TIMEOUT_MS = 10000      # Initial Retransmission Timeout (10s) until RTTs are measured. Packet Time-on-Air at SF12 is ~1.5s-2s.
+RTO_MAX_MS = 60000      # Ceiling of the adaptive Retransmission Timeout
 MAX_LBT_RETRIES = 5     # How many times to retry scanning channel before backing off fully.
+TIMER_TICK_MS = 250     # Retransmit timer wheel granularity (64 slots = 16s, covers TIMEOUT_MS)
+WAKE_POLL_MS = 10       # Nap length while the sender waits for a deadline
 
 # ==========================================
 # HARDWARE INITIALIZATION
@@ -42,6 +47,13 @@ for sx in [sx_tx, sx_rx]:
 
 print("[System] LoRa Modules Ready.")
 
+# Retransmission Timeout from measured round trips (one peer).
+# Floor: a full data frame out, the ACK back, and both random backoffs.
+max_frame = PacketV12.HEADER_SIZE + PacketV12.MAX_PAYLOAD + PacketV12.FOOTER_SIZE
+ack_frame = PacketV12.HEADER_SIZE + PacketV12.FOOTER_SIZE
+rtt = RttEstimator(TIMEOUT_MS, (sx_tx.getTimeOnAir(max_frame) + sx_tx.getTimeOnAir(ack_frame)) // 1000 + 40 + 15,
+                   RTO_MAX_MS, TIMER_TICK_MS)
+
 # ==========================================
 # GLOBAL STATE VARIABLES
 # ==========================================
@@ -51,6 +63,9 @@ window_base = 0         # Sequence number of the oldest unacknowledged packet
 next_seq_num = 0        # Sequence number to assign to the next new packet
 acked_buffer = {}       # Map: {SeqNum: Bool} - Tracks which packets have been ACKed
 tx_timestamps = {}      # Map: {SeqNum: TimeMS} - Tracks when a packet was last sent
+rtx_timers = TimerWheel(TIMER_TICK_MS) # Retransmit deadlines, keyed (SeqNum, send time)
+tx_timed_out = set()    # SeqNums whose retransmit timer fired and that still need resending
+tx_retried = set()      # SeqNums sent more than once (no RTT samples, Karn's rule)
 
 # Receiver State (Reassembly)
 rx_expected_seq = 0     # The next Sequence Number we expect to receive in order
@@ -59,10 +74,34 @@ rx_msg_reassembly = b'' # Temporary buffer to build the full message string
 
 # Thread Synchronization
 lock = _thread.allocate_lock() # Mutex to prevent race conditions between threads
+tx_wake = _thread.allocate_lock() # Held by the sleeping sender; wake_sender() releases it
+tx_wake.acquire()
 
 def millis():
     return time.ticks_ms()
 
+def wake_sender():
+    """Cut the sender's sleep short (message queued or ACK received)."""
+    try:
+        tx_wake.release()
+    except RuntimeError:
+        pass # Already woken
+
+def sender_wait(deadline):
+    """
+    Sleep until millis() reaches `deadline` (None = no deadline) or another
+    thread calls wake_sender(). MicroPython locks have no acquire timeout,
+    so with a deadline we nap WAKE_POLL_MS at a time and only test tx_wake.
+    """
+    if deadline is None:
+        tx_wake.acquire()
+        return
+    while not tx_wake.acquire(0):
+        left = time.ticks_diff(deadline, millis())
+        if left <= 0:
+            return
+        time.sleep_ms(min(left, WAKE_POLL_MS))
+
 # ==========================================
 # APPLICATION LAYER: FRAGMENTATION
 # ==========================================
@@ -96,6 +135,7 @@ def queue_message(text):
             next_seq_num = (next_seq_num + 1) % 16
             
     print(f"[App] Queuing complete. Waiting for Sender Thread.")
+    wake_sender()
 
 # ==========================================
 # THREAD 1: SENDER (ARQ + LBT)
@@ -107,13 +147,28 @@ def sender_loop():
     1. Checking if packets in the window need sending (First send or Timeout).
     2. Performing LBT (Listen Before Talk) to avoid collisions.
     3. Sliding the window forward when ACKs are received.
+    Between passes it sleeps until the next retransmit deadline in
+    rtx_timers (armed with rtt.rto), or until a new message or an ACK wakes it.
     """
     global window_base
     
     print("[Thread] Sender Loop Started.")
+    expired = []
     while True:
         current_time = millis()
+        retry_now = False
         with lock:
+            # Deadlines that passed: a timer is stale if its packet was ACKed
+            # or sent again since. The RTO backs off when the oldest packet
+            # times out (one timer's worth, not once per packet).
+            rtx_timers.expire(current_time, expired)
+            for seq, stamp in expired:
+                if tx_timestamps.get(seq) == stamp and not acked_buffer.get(seq, True):
+                    tx_timed_out.add(seq)
+                    if seq == window_base:
+                        rtt.backoff()
+            expired.clear()
+            
             # --- 1. Iterate through the current Window ---
             # We only look at packets from [window_base] to [window_base + WINDOW_SIZE]
             for i in range(WINDOW_SIZE):
@@ -131,8 +186,8 @@ def sender_loop():
                     last_sent = tx_timestamps.get(seq, 0)
                     
                     # --- 2. Check for Timeout ---
-                    # Condition: Never sent OR Time since last send > TIMEOUT_MS
-                    if last_sent == 0 or (time.ticks_diff(current_time, last_sent) > TIMEOUT_MS):
+                    # Condition: Never sent OR its retransmit timer fired (rtt.rto)
+                    if last_sent == 0 or seq in tx_timed_out:
                         
                         reason = "First Send" if last_sent == 0 else "Timeout Retry"
                         print(f"\n[ARQ] Triggering send for Seq {seq}. Reason: {reason}")
@@ -153,6 +208,10 @@ def sender_loop():
                                 # Channel Free: Transmit immediately using TX Module
                                 sx_tx.send(packet_to_send.to_bytes())
                                 tx_timestamps[seq] = millis() # Reset timer
+                                rtx_timers.schedule((seq, tx_timestamps[seq]), time.ticks_add(tx_timestamps[seq], rtt.rto))
+                                tx_timed_out.discard(seq)
+                                if last_sent:
+                                    tx_retried.add(seq)
                                 sent = True
                                 print(f"[TX] Seq {seq}: Packet Sent Successfully.")
                                 break
@@ -164,6 +223,7 @@ def sender_loop():
                         
                         if not sent:
                             print(f"[LBT] CRITICAL: Channel Congested for Seq {seq}. Dropping attempt.")
+                            retry_now = True
 
             # --- 4. Slide Window ---
             # If the oldest packet (window_base) has been ACKed, we can move the window forward.
@@ -176,15 +236,21 @@ def sender_loop():
                 # Cleanup state maps
                 del acked_buffer[window_base]
                 if window_base in tx_timestamps: del tx_timestamps[window_base]
+                tx_timed_out.discard(window_base)
+                tx_retried.discard(window_base)
                 
                 # Advance Base
                 window_base = (window_base + 1) % 16
             
             if old_base != window_base:
                 print(f"[ARQ] Window Slided. Old Base: {old_base} -> New Base: {window_base}")
+                # Packets behind the old window may be sendable now
+                retry_now = True
+            
+            wake_at = current_time if retry_now else rtx_timers.next_deadline()
                 
-        # Yield CPU to other threads
-        time.sleep_ms(20)
+        # Sleep until the next retransmit deadline, or until woken
+        sender_wait(wake_at)
 
 # ==========================================
 # HELPER: REASSEMBLY
@@ -243,7 +309,14 @@ def rx_loop():
                     if pkt.pkt_type == PacketV12.TYPE_ACK:
                         print(f"[RX] ACK Received for Seq {pkt.seq_num}.")
                         with lock:
+                            # RTT sample, unless the packet was sent twice (Karn's rule)
+                            sent_at = tx_timestamps.get(pkt.seq_num)
+                            if sent_at and not acked_buffer.get(pkt.seq_num, True) and pkt.seq_num not in tx_retried:
+                                rtt_ms = time.ticks_diff(millis(), sent_at)
+                                rtt.sample(rtt_ms)
+                                print(f"[ARQ] RTT {rtt_ms} ms -> RTO {rtt.rto} ms")
                             acked_buffer[pkt.seq_num] = True
+                        wake_sender()
                             
                     # --- CASE B: RECEIVED DATA ---
                     # We received a message. We MUST send an ACK back.
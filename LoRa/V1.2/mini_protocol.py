@@ -1,17 +1,7 @@
 import struct
 
-# --- CRC16-CCITT Implementation ---
-def crc16(data: bytes) -> int:
-    crc = 0xFFFF
-    for byte in data:
-        crc ^= (byte << 8)
-        for _ in range(8):
-            if crc & 0x8000:
-                crc = (crc << 1) ^ 0x1021
-            else:
-                crc <<= 1
-        crc &= 0xFFFF
-    return crc
+# --- CRC16-CCITT (shared table-driven engine in crc.py) ---
+from crc import crc16
 
 # --- PACKET CLASS v1.2 ---
 class PacketV12:
@@ -56,7 +46,7 @@ class PacketV12:
         # CRC Check
         payload_with_header = data[:-2]
         received_crc = struct.unpack('>H', data[-2:])[0]
-        calculated_crc = crc16(payload_with_header)
+        calculated_crc = crc16(memoryview(data)[:-2])
         
         if received_crc != calculated_crc:
             return None # Corrupt
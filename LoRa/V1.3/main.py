@@ -9,8 +9,22 @@ import socket
 import select
 import os
 import json
+import io
 import gc
-from mini_protocol import PacketV13
+from mini_protocol import PacketV13, FrameAggregator, TxRing
+from packet_pool import PacketPool
+from chunk_sizer import ChunkSizer
+from timer_wheel import TimerWheel
+from rtt_estimator import RttEstimator
+from congestion import CongestionWindow
+from timed_lock import TimedLock
+from multipart import MultipartSpool
+import tx_spool
+from tx_spool import TxSpool
+from chunk_bitmap import ChunkBitmap
+from block_writer import BlockWriter
+import lzss
+import fec
 
 # --- SYSTEM CONFIG ---
 WIFI_SSID = "LoRa_Node_AP"       # WiFi Access Point base SSID
@@ -33,8 +47,56 @@ else:
 LORA_SF = 7                       # Spreading factor
 LORA_BW = 250.0                   # Bandwidth in kHz
 WINDOW_SIZE = 8                   # Sliding window size for ARQ
-TIMEOUT_MS = 1500                 # Retransmission timeout for unacked packets
+TIMEOUT_MS = 1500                 # Initial retransmission timeout (until RTTs are measured)
+RTO_MAX_MS = 30000                # Ceiling of the adaptive retransmission timeout
+CWND_INIT = 2                     # Congestion window at boot (frames in flight)
 MAX_LBT_RETRIES = 10              # Max Listen-Before-Talk retries per send
+POOL_SIZE = 2 * WINDOW_SIZE + 4   # Recycled packet objects (TX window + RX reorder + ACK), ~300 B each
+DELAYED_ACK_MS = 150              # Wait this long for reverse data to carry a SACK
+TIMER_TICK_MS = 20                # Retransmit timer wheel granularity (64 slots)
+
+# --- EXTENDED SEQUENCE SPACE ---
+# Peers that both announce SEQ16 in TYPE_HELLO switch to 16-bit seqs and the
+# larger window once idle; 8-bit-only peers never see a HELLO and stay at
+# 256 / WINDOW_SIZE.
+SEQ16_ENABLED = True              # Offer the 16-bit extended header
+WINDOW_SIZE_16 = 256              # Window once both sides use 16-bit seqs
+POOL_SIZE_16 = 2 * WINDOW_SIZE_16 + 4  # Pool cap with 16-bit seqs, filled on demand (up to ~150 KB)
+HELLO_MS = 5000                   # Interval between HELLOs until the peer answers (one RTO while data waits)
+HELLO_TRIES = 12                  # HELLOs sent before assuming a peer without HELLO
+
+# --- CHUNK SIZING ---
+CHUNK_MIN = 32                    # Smallest message/file chunk the sizer may pick
+CHUNK_MAX = 200                   # Largest chunk (leaves room for a piggybacked SACK)
+
+# --- COMPRESSION ---
+COMPRESS_ENABLED = True           # LZSS-compress messages/files when it pays off
+COMPRESS_MIN = 64                 # Smaller payloads are sent raw
+COMPRESS_SAMPLE = 512             # Bytes trial-compressed to test compressibility
+COMPRESS_MAX_PCT = 90             # Send raw unless compressed to <= this % of original
+COMPRESS_FILE_MAX = 16384         # Larger uploads are streamed raw from their spool file
+
+# --- FLASH SPOOL ---
+SPOOL_DIR = "spool"               # Queued messages/files + index; survives a reset
+
+# --- RESUMABLE FILE TRANSFERS ---
+RESUME_ENABLED = True             # Offer raw files for resume (TYPE_FILE_RESUME)
+RESUME_DIR = "resume"             # Receiver: chunk bitmaps of partly received files
+RESUME_SAVE_BYTES = 4096          # Receiver: save the bitmap after this many new bytes
+
+# --- RECEIVED FILES ---
+RX_WRITE_BLOCK = 4096             # Incoming file data is written to flash in blocks of this size
+RX_WRITE_BUFFERS = 2              # Blocks gathered at once (RAM: RX_WRITE_BLOCK each)
+FILE_OFFSETS_ENABLED = True       # Offer [file no][offset] raw chunks (written on arrival) via TYPE_HELLO
+
+# --- FORWARD ERROR CORRECTION (files) ---
+FEC_ENABLED = False               # Add XOR parity chunks to file transfers
+FEC_BLOCK = 6                     # File chunks per block (K)
+FEC_PARITY = 1                    # Interleaved parity chunks per block (P), code rate K/(K+P)
+# A block plus its parity must fit in the window, or the receiver cannot
+# buffer it around a hole: FEC_BLOCK + FEC_PARITY <= WINDOW_SIZE
+if FEC_ENABLED and FEC_BLOCK + FEC_PARITY > WINDOW_SIZE:
+    raise ValueError("FEC_BLOCK + FEC_PARITY must not exceed WINDOW_SIZE")
 
 # --- HARDWARE INIT ---
 print(f"[System] Init Node 0x{MY_ADDR:02X} (TX:{FREQ_TX}MHz, RX:{FREQ_RX}MHz)")
@@ -88,25 +150,80 @@ sx_rx.begin(
 )
 
 # --- GLOBALS & BUFFERS ---
-tx_queue = []            # Outgoing packets waiting to be (re)sent
-window_base = 0          # Base of sliding window (lowest unacked seq num)
-next_seq_num = 0         # Next sequence number to allocate
-acked_buffer = {}        # seq_num -> bool (True if ACK received)
-tx_timestamps = {}       # seq_num -> last transmit time (ms)
+# Preallocated packets + frame buffers, recycled for TX, ACKs and RX decode
+pkt_pool = PacketPool(PacketV13, POOL_SIZE, PacketV13.MAX_FRAME)
+# Chunk size from the TX radio's airtime and the loss seen by the ARQ
+sizer = ChunkSizer(sx_tx.getTimeOnAir, CHUNK_MIN, CHUNK_MAX,
+                   PacketV13.HEADER_SIZE + 1 + PacketV13.FOOTER_SIZE)
+# Retransmission timeout from measured RTTs (one peer). Floor: a full frame
+# each way, the delayed-ACK wait and both LBT backoffs.
+rtt = RttEstimator(TIMEOUT_MS, 2 * sx_tx.getTimeOnAir(PacketV13.MAX_FRAME) // 1000 + DELAYED_ACK_MS + 80,
+                   RTO_MAX_MS, TIMER_TICK_MS)
+# AIMD cap on unacknowledged frames in flight, within the ARQ window
+cwnd = CongestionWindow(CWND_INIT, 1, WINDOW_SIZE)
+
+tx_ring = TxRing(WINDOW_SIZE_16)  # Packets in flight, slot = seq (window base .. next seq)
+tx_backlog = []          # Chunk generators of queued messages/files, packetised as the window opens
+spool = TxSpool(SPOOL_DIR)  # Queued messages/files on flash, reloaded at boot
+tx_due = []              # Seqs to (re)send on the next sender pass: new, fast-retransmit, timed out
+rtx_timers = TimerWheel(TIMER_TICK_MS)  # Retransmit deadlines, keyed (seq, send time)
 web_logs = []            # Recent log messages for web UI
+sack_peer = None         # Peer owed a SACK (set by rx_loop, sent by sender thread)
+ack_owed = []            # (addr, seq) owed a TYPE_ACK each while the peer sent no HELLO
+seq_mod = 256            # TX seq space (65536 after the SEQ16 switch)
+seq_flag = 0             # PacketV13.FLAG_SEQ16 once seq_mod is 65536
+window_size = WINDOW_SIZE  # TX window in use
+peer_seq16 = False       # Peer announced SEQ16 in its HELLO
+peer_offsets = False     # Peer announced file chunk offsets in its HELLO
+peer_heard = False       # Peer's HELLO showed it has heard ours
+hello_due = False        # Answer a HELLO on the next sender pass
+hello_left = HELLO_TRIES
+hello_at = 0             # millis() of the last HELLO sent
+boot_id = int.from_bytes(os.urandom(2), 'big')  # Sent in HELLOs: a new value means we restarted
+peer_boot = None         # Peer's boot ID from its HELLO (-1: HELLO without one, None: none yet)
+resume_have = {}         # Transfer ID -> body of the peer's TYPE_FILE_HAVE
+resume_wait = None       # millis() until which the head entry waits for a HELLO or that reply
+tx_file_no = 0           # TYPE_FILE_START frames sent (low byte), heads our raw file chunks
+sack_since = 0           # millis() when that SACK became owed
+lbt_busy = 0             # CAD scans that found the channel busy
+
+# --- AGGREGATION (sender thread only) ---
+agg = FrameAggregator(MY_ADDR)  # Packs frames for the peer into one radio packet
+tx_batch = []            # Data seqs inside the packet being built (stamped on send)
+piggy_buf = bytearray(PacketV13.MAX_FRAME)  # Data frame re-encoded with a piggybacked SACK
 
 # --- RX BUFFERS ---
 rx_expected_seq = 0      # Next sequence number expected in-order
-rx_packet_buffer = {}    # Out-of-order packets buffer: seq_num -> PacketV13
+rx_packet_buffer = {}    # Out-of-order packets buffer: seq_num -> PacketV13, or (offset, length) of a raw file chunk already written
+rx_seq_mod = 256         # RX seq space (65536 once the peer sends FLAG_SEQ16)
+rx_window = WINDOW_SIZE  # RX reorder window in use
+SACK_BYTES = (WINDOW_SIZE + 7) // 8
+sack_payload = bytearray((max(WINDOW_SIZE, WINDOW_SIZE_16) + 7) // 8)  # Bitmap of buffered seqs after rx_expected_seq
+sack_len = SACK_BYTES    # Bitmap bytes in use (grows with rx_window)
 rx_msg_reassembly = b''  # Buffer to reassemble multi-packet text messages
+rx_msg_inflater = None   # lzss.Decompressor for the current compressed message
 
 # File Reassembly
-rx_file_handle = None    # File object for writing incoming file chunks
+rx_file_writer = None    # BlockWriter over the file being received
+rx_file_no = 0           # TYPE_FILE_START frames delivered: matches the sender's tx_file_no
 rx_file_name = ""        # Name of file being received
+rx_file_inflater = None  # lzss.Decompressor for the current compressed file
+rx_file_fec = False      # Current file carries parity chunks
+rx_file_offsets = False  # Current file's raw chunks start with [file no][offset 3B]
+rx_file_xid = None       # Transfer ID from TYPE_FILE_RESUME, for the next TYPE_FILE_START
+rx_file_map = None       # ChunkBitmap of the current file (resumable transfers only)
+try:
+    os.mkdir(RESUME_DIR)
+except OSError:
+    pass  # Already there
+fec_cache = {}           # seq -> payload of delivered chunks parity may still need
+fec_stats = {"rebuilt": 0, "arq": 0}  # Lost chunks of the current file, by how they came back
 
 # --- LOCKS ---
-main_lock = _thread.allocate_lock()  # Protects tx_queue, window, and related state
+main_lock = TimedLock()              # Protects tx_ring, tx_backlog, window, and related state (hold times in /api/state)
 log_lock = _thread.allocate_lock()   # Protects web_logs
+tx_wake = _thread.allocate_lock()    # Held by the sleeping sender; wake_sender() releases it
+tx_wake.acquire()
 
 # --- UTILS ---
 def log_web(msg):
@@ -136,35 +253,12 @@ def setup_wifi():
     ap.config(essid=f"{WIFI_SSID}_{MY_ADDR:02X}", password=WIFI_PASS)
     print(f"[WiFi] AP Created: {ap.ifconfig()[0]}")
 
-def parse_multipart(body, boundary):
-    """
-    Very simple multipart/form-data parser.
-    Extracts first file with 'filename="' in its headers.
-
-    Returns:
-        (filename, content_bytes) or (None, None) on failure.
-    """
-    try:
-        parts = body.split(boundary)
-        for part in parts:
-            if b'filename="' in part:
-                # Split headers and content
-                headers, content = part.split(b'\r\n\r\n', 1)
-                h_str = headers.decode()
-                # Extract filename="..."
-                fname = h_str.split('filename="')[1].split('"')[0]
-                # Strip multipart trailing markers
-                content = content.rstrip(b'\r\n--')
-                return fname, content
-    except:
-        return None, None
-    return None, None
-
 def run_web_server():
     """
     Main HTTP server loop.
     - Serves index.html
     - Provides /api/state for status/logs
+    - Provides /api/cwnd for the congestion window and its history
     - Handles /api/send_msg to queue text messages
     - Handles /api/upload_file to queue file transfer over LoRa
     """
@@ -206,19 +300,23 @@ def run_web_server():
                     content_length = int(line.split(':')[1].strip())
                     break
             
-            # 3. Read Body Loop (ensure we read the entire body for uploads)
+            # 3. Read Body Loop (uploads are streamed to flash in the route below)
             body = request.split(b'\r\n\r\n', 1)[1] if b'\r\n\r\n' in request else b''
+            upload = "POST /api/upload_file" in header_part
             
-            if content_length > 0:
-                print(f"[Web] Receiving {content_length} bytes...")
-                while len(body) < content_length:
+            if content_length > 0 and not upload:
+                parts = [body]
+                received = len(body)
+                while received < content_length:
                     try:
                         chunk = conn.recv(1024)
                         if not chunk:
                             break
-                        body += chunk
+                        parts.append(chunk)
+                        received += len(chunk)
                     except:
                         break
+                body = b''.join(parts)
             
             # 4. Route Handling
             if "GET / " in header_part:
@@ -231,7 +329,21 @@ def run_web_server():
                 # Return current node info and logs as JSON
                 with log_lock:
                     current_logs = list(web_logs)
-                state = {"my_addr": MY_ADDR, "logs": current_logs}
+                state = {"my_addr": MY_ADDR, "logs": current_logs, "fec": fec_stats,
+                         "seq_bits": 16 if seq_mod > 256 else 8,
+                         "chunk": sizer.size(), "loss": round(sizer.loss, 3),
+                         "rtt": {"srtt": rtt.srtt, "rttvar": rtt.rttvar, "rto": rtt.rto},
+                         "cwnd": cwnd.size(), "lock": main_lock.stats(),
+                         "spool": {"queued": len(spool.entries), "bytes": spool.pending_bytes()}}
+                response = "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n" + json.dumps(state)
+                conn.send(response.encode())
+            
+            elif "GET /api/cwnd" in header_part:
+                # Congestion window and its recent changes [millis, cwnd, reason]
+                with main_lock:
+                    state = {"cwnd": cwnd.size(), "ssthresh": int(cwnd.ssthresh), "max": cwnd.max_w,
+                             "in_flight": tx_ring.unacked, "lbt_busy": lbt_busy,
+                             "history": [list(h) for h in cwnd.history]}
                 response = "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n" + json.dumps(state)
                 conn.send(response.encode())
                 
@@ -241,8 +353,9 @@ def run_web_server():
                 queue_message(msg_text)
                 conn.send("HTTP/1.1 200 OK\r\n\r\nOK".encode())
                 
-            elif "POST /api/upload_file" in header_part:
-                # Handle file upload via multipart/form-data
+            elif upload:
+                # Handle file upload via multipart/form-data, spooled to flash
+                # as it arrives so the upload never has to fit in RAM
                 try:
                     # Parse boundary string from Content-Type header
                     boundary = ''
@@ -252,15 +365,32 @@ def run_web_server():
                             break
                     
                     if boundary:
-                        boundary_bytes = b'--' + boundary.encode()
-                        fname, fcontent = parse_multipart(body, boundary_bytes)
+                        print(f"[Web] Receiving {content_length} bytes...")
+                        entry_id = spool.reserve()
+                        form = MultipartSpool(boundary.encode(), spool.path(entry_id))
+                        try:
+                            form.feed(body)
+                            received = len(body)
+                            while received < content_length:
+                                try:
+                                    chunk = conn.recv(1024)
+                                except:
+                                    break
+                                if not chunk:
+                                    break
+                                form.feed(chunk)
+                                received += len(chunk)
+                        finally:
+                            form.close()
                         
-                        if fname and fcontent:
-                            print(f"[TX FILE] Queued: {fname} ({len(fcontent)} B)")
-                            log_web(f"[Web] Queued: {fname}")
-                            queue_file(fname, fcontent)
+                        if form.filename and form.size and form.done:
+                            print(f"[TX FILE] Queued: {form.filename} ({form.size} B)")
+                            log_web(f"[Web] Queued: {form.filename}")
+                            queue_file(form.filename, entry_id, form.size)
                             conn.send("HTTP/1.1 200 OK\r\n\r\nOK".encode())
                         else:
+                            if form.filename:
+                                os.remove(form.path)
                             conn.send("HTTP/1.1 400 Bad Request\r\n\r\nParse Fail".encode())
                     else:
                         conn.send("HTTP/1.1 400 Bad Request\r\n\r\nNo Boundary".encode())
@@ -279,77 +409,281 @@ def run_web_server():
             # print(f"[Server Loop Err] {e}")
             pass
 
+# --- COMPRESSION STAGE ---
+def compress_payload(data, label):
+    """
+    Try LZSS on an outgoing message/file body; a trial run on the first
+    COMPRESS_SAMPLE bytes skips data that does not compress.
+
+    Returns:
+        (payload, type_flag) - compressed bytes with FLAG_COMPRESSED,
+        or the original data with 0.
+    """
+    n = len(data)
+    if not COMPRESS_ENABLED or n < COMPRESS_MIN:
+        return data, 0
+    sample = memoryview(data)[:COMPRESS_SAMPLE]
+    if len(lzss.compress(sample)) * 100 > len(sample) * COMPRESS_MAX_PCT:
+        log_web(f"[Zip] {label}: incompressible, sent raw")
+        return data, 0
+    packed = lzss.compress(data)
+    pct = len(packed) * 100 // n
+    if pct > COMPRESS_MAX_PCT:
+        log_web(f"[Zip] {label}: {n} -> {len(packed)} B ({pct}%), sent raw")
+        return data, 0
+    log_web(f"[Zip] {label}: {n} -> {len(packed)} B ({pct}%)")
+    return packed, PacketV13.FLAG_COMPRESSED
+
 # --- QUEUING LOGIC (V1.2 Fragmentation Logic) ---
+# Queued data sits in the flash spool (tx_spool.py) and waits in tx_backlog
+# as chunk generators; fill_window() pulls (type, payload, tag) triples from
+# them only while the window has room, so neither a large file nor a long
+# backlog occupies more RAM than the window holds. The generators run under
+# main_lock, which makes tx_ring.next the seq of the chunk they yield.
+# A chunk's tag (entry, offset) reaches spool.ack() once the window slides
+# past it: offset is the entry's bytes now acknowledged, None when the
+# entry's last frame was, which retires it from the spool.
+# A peer that sent no HELLO may run a V1.3 without LZSS, resume, offsets
+# or FEC: it gets plain chunks only.
+def await_hello():
+    """
+    Hold the head entry (yield None) until the peer's HELLO is in, at most
+    2 RTOs and only while our own HELLOs last.
+    """
+    global resume_wait
+    deadline = time.ticks_add(millis(), 2 * rtt.rto)
+    while peer_boot is None and hello_left and time.ticks_diff(deadline, millis()) > 0:
+        resume_wait = deadline
+        yield None
+    resume_wait = None
+
+def open_entry(entry, zflag):
+    """
+    Open a spooled entry for sending: (file, length). With `zflag` 0 a
+    compressed entry (at most COMPRESS_FILE_MAX bytes) is inflated into RAM,
+    for a peer without HELLO.
+    """
+    src = open(spool.path(entry.id), 'rb')
+    if zflag == entry.zflag:
+        return src, entry.length
+    with src:
+        data = lzss.decompress(src.read())
+    return io.BytesIO(data), len(data)
+
+def message_chunks(entry):
+    """
+    Fragment a spooled text message into LoRa payloads (sizer.size() bytes
+    each, up to CHUNK_MAX), using TYPE_MSG_CHUNK for intermediate chunks and
+    TYPE_MSG_END for the final chunk.
+    """
+    if entry.zflag:
+        yield from await_hello()
+    zflag = entry.zflag if peer_boot is not None else 0
+    src, length = open_entry(entry, zflag)
+    with src:
+        i = 0
+        while i < length:
+            # Sized for the link as it is when this chunk enters the window
+            chunk = src.read(sizer.size())
+            if not chunk:
+                break  # Data file shorter than logged
+            i += len(chunk)
+            # V1.2 Logic: Mark last chunk with TYPE_MSG_END
+            if i >= length:
+                yield PacketV13.TYPE_MSG_END | zflag, chunk, (entry, None)
+            else:
+                # Offsets into inflated data are not spool offsets
+                yield PacketV13.TYPE_MSG_CHUNK | zflag, chunk, (entry, i) if zflag == entry.zflag else None
+
+def missing_ranges(have, length):
+    """
+    Byte ranges [start, end) of a `length`-byte file the receiver still
+    needs, from the body of its TYPE_FILE_HAVE: [block size 2B] then
+    (first block 2B, block count 2B) per range it already has, ascending.
+    """
+    out = []
+    pos = 0
+    if len(have) >= 2:
+        block = int.from_bytes(have[:2], 'big')
+        for k in range(2, len(have) - 3, 4):
+            start = int.from_bytes(have[k:k+2], 'big') * block
+            end = min(start + int.from_bytes(have[k+2:k+4], 'big') * block, length)
+            if start > pos:
+                out.append((pos, start))
+            pos = max(pos, end)
+    if pos < length:
+        out.append((pos, length))
+    return out
+
+def file_chunks(entry):
+    """
+    Payloads of one spooled file, read from flash as they enter the window:
+    - TYPE_FILE_RESUME (raw files), then a wait of up to 4 RTOs for TYPE_FILE_HAVE
+    - TYPE_FILE_START with "name|size" metadata
+    - TYPE_FILE_CHUNK packets of the missing ranges (with offsets if the peer
+      takes them, else TYPE_FILE_SEEK), and FEC parity with FEC_ENABLED
+    - TYPE_FILE_END with empty payload.
+    """
+    global resume_wait, tx_file_no
+    yield from await_hello()
+    hello = peer_boot is not None
+    zflag = entry.zflag if hello else 0
+    # Metadata: "filename|filesize" (+ "|K+P" when parity follows, "|o" when chunks carry offsets)
+    meta = f"{entry.name}|{entry.size}"
+    parity = FEC_ENABLED and hello
+    if parity:
+        meta += f"|{FEC_BLOCK}+{FEC_PARITY}"
+    head = 4 if FILE_OFFSETS_ENABLED and peer_offsets and not zflag else 0
+    if head:
+        meta += "|o"
+    # An LZSS stream cannot be picked up in the middle: only raw files resume
+    offer = RESUME_ENABLED and hello and not zflag
+    if offer:
+        yield PacketV13.TYPE_FILE_RESUME, entry.xid.to_bytes(4, 'big'), None
+    # The receiver numbers files by counting the STARTs it delivers
+    tx_file_no = file_no = (tx_file_no + 1) & 0xFF
+    yield PacketV13.TYPE_FILE_START | zflag, meta.encode('utf-8'), None
+    ranges = None
+    if offer:
+        deadline = time.ticks_add(millis(), 4 * rtt.rto)
+        while entry.xid not in resume_have and time.ticks_diff(deadline, millis()) > 0:
+            resume_wait = deadline
+            yield None
+        resume_wait = None
+        ranges = missing_ranges(resume_have.pop(entry.xid, b''), entry.length)
+        if ranges != [(0, entry.length)]:
+            log_web(f"[Resume] {entry.name}: {entry.length - sum(e - s for s, e in ranges)} B already there")
+    src, length = open_entry(entry, zflag)
+    with src:
+        pos = 0
+        for start, end in ranges or [(0, length)]:
+            if start != pos:
+                src.seek(start)
+                pos = start
+                if not head:
+                    yield PacketV13.TYPE_FILE_SEEK, pos.to_bytes(4, 'big'), None
+            block = []  # (seq, chunk) of the current FEC block
+            while pos < end:
+                chunk = src.read(min(sizer.size() - head, end - pos))
+                if not chunk:
+                    break  # Data file shorter than logged
+                if head:
+                    chunk = bytes((file_no, pos >> 16, (pos >> 8) & 0xFF, pos & 0xFF)) + chunk
+                pos += len(chunk) - head
+                if parity:
+                    block.append((tx_ring.next, chunk))
+                # Offsets into inflated data are not spool offsets
+                yield PacketV13.TYPE_FILE_CHUNK | zflag, chunk, (entry, pos) if zflag == entry.zflag else None
+
+                # Block full (or end of range): one parity per interleave lane
+                if block and (len(block) == FEC_BLOCK or pos >= end):
+                    for j in range(min(FEC_PARITY, len(block))):
+                        lane = block[j::FEC_PARITY]
+                        yield PacketV13.TYPE_FILE_PARITY | zflag, fec.encode([c for _, c in lane], lane[0][0], FEC_PARITY), None
+                    block = []
+            if pos < end:
+                break
+    # End-of-file marker packet
+    yield PacketV13.TYPE_FILE_END | zflag, b'', (entry, None)
+
+def entry_chunks(entry):
+    return (file_chunks if entry.kind == tx_spool.KIND_FILE else message_chunks)(entry)
+
 def queue_message(text):
     """
-    Fragment a text message into multiple LoRa packets (200 bytes max payload each),
-    using TYPE_MSG_CHUNK for intermediate chunks and TYPE_MSG_END for final chunk.
-    Packets are appended to tx_queue with sequence numbers assigned.
+    Queue a text message for transmission (see message_chunks()).
+    Long messages are compressed first (types flagged with FLAG_COMPRESSED).
+    The message is in the flash spool before this returns.
     """
-    global next_seq_num
     print(f"[TX MSG] {text}")
     log_web(f">> {text}")
-    data = text.encode('utf-8')
-    # Split into chunks of up to 200 bytes
-    chunks = [data[i:i+200] for i in range(0, len(data), 200)]
-    
+    raw = text.encode('utf-8')
+    if not raw:
+        return
+    data, zflag = compress_payload(raw, "msg")
+    entry_id = spool.reserve()
+    with open(spool.path(entry_id), 'wb') as f:
+        f.write(data)
+    entry = spool.add(entry_id, tx_spool.KIND_MSG, zflag, len(data), len(raw), "")
     with main_lock:
-        for i, chunk in enumerate(chunks):
-            # V1.2 Logic: Mark last chunk with TYPE_MSG_END
-            is_last = (i == len(chunks) - 1)
-            p_type = PacketV13.TYPE_MSG_END if is_last else PacketV13.TYPE_MSG_CHUNK
-            
-            # Create packet and enqueue
-            pkt = PacketV13(TARGET_ADDR, MY_ADDR, next_seq_num, p_type, chunk)
-            tx_queue.append(pkt)
-            acked_buffer[next_seq_num] = False  # Not yet acknowledged
-            next_seq_num = (next_seq_num + 1) % 256  # Wrap at 256
-
-def queue_file(filename, content):
-    """
-    Queue a file for transmission:
-    - First send TYPE_FILE_START with "filename|size" metadata.
-    - Then send multiple TYPE_FILE_CHUNK packets (up to 180 bytes each).
-    - Finally send TYPE_FILE_END with empty payload.
-    """
-    global next_seq_num
-    # Metadata: "filename|filesize"
-    meta = f"{filename}|{len(content)}".encode('utf-8')
+        tx_backlog.append(message_chunks(entry))
+    wake_sender()
+
+def queue_file(filename, entry_id, size):
+    """
+    Queue the `size`-byte file written to spool.path(entry_id) (see file_chunks()).
+    Files up to COMPRESS_FILE_MAX bytes are compressed in RAM when it pays off;
+    larger ones are sent raw, chunk by chunk from flash.
+    """
+    path = spool.path(entry_id)
+    length, zflag = size, 0
+    if size <= COMPRESS_FILE_MAX:
+        with open(path, 'rb') as f:
+            content, zflag = compress_payload(f.read(), filename)
+        if zflag:
+            with open(path, 'wb') as f:
+                f.write(content)
+            length = len(content)
+    entry = spool.add(entry_id, tx_spool.KIND_FILE, zflag, length, size, filename)
     with main_lock:
-        # Start packet with metadata
-        tx_queue.append(PacketV13(TARGET_ADDR, MY_ADDR, next_seq_num, PacketV13.TYPE_FILE_START, meta))
-        acked_buffer[next_seq_num] = False
-        next_seq_num = (next_seq_num + 1) % 256
-        
-        # File data chunks (slightly smaller to account for headers)
-        chunks = [content[i:i+180] for i in range(0, len(content), 180)]
-        for chunk in chunks:
-            tx_queue.append(PacketV13(TARGET_ADDR, MY_ADDR, next_seq_num, PacketV13.TYPE_FILE_CHUNK, chunk))
-            acked_buffer[next_seq_num] = False
-            next_seq_num = (next_seq_num + 1) % 256
-            
-        # End-of-file marker packet
-        tx_queue.append(PacketV13(TARGET_ADDR, MY_ADDR, next_seq_num, PacketV13.TYPE_FILE_END, b''))
-        acked_buffer[next_seq_num] = False
-        next_seq_num = (next_seq_num + 1) % 256
+        tx_backlog.append(file_chunks(entry))
+    wake_sender()
+
+def window_open():
+    """
+    Room for one more new frame: inside the ARQ window (seq space) and
+    under the congestion window (unacknowledged frames in flight).
+    """
+    return tx_ring.count() < window_size and tx_ring.unacked < cwnd.size()
+
+def hello_interval():
+    """Time between unanswered HELLOs: one RTO while data is waiting on them."""
+    return rtt.rto if tx_backlog else HELLO_MS
+
+def fill_window():
+    """
+    Packetise backlog chunks until the window is full or the head entry
+    waits (caller holds main_lock); each is due on this pass.
+    """
+    while tx_backlog and window_open():
+        try:
+            item = next(tx_backlog[0])
+        except StopIteration:
+            tx_backlog.pop(0)
+            continue
+        if item is None:
+            break  # Head entry waits for a reply (see await_hello(), file_chunks())
+        p_type, payload, tag = item
+        pkt = pkt_pool.acquire().load(TARGET_ADDR, MY_ADDR, tx_ring.next, p_type | seq_flag, payload)
+        tx_due.append(tx_ring.push(pkt, tag))
 
 # --- PROCESS PACKET (Reassembly Logic) ---
 def process_ordered_packet(pkt):
     """
     Handle an in-order received packet, performing application-level actions:
-    - Reassemble text messages (TYPE_MSG_CHUNK / TYPE_MSG_END)
+    - Reassemble text messages (TYPE_MSG_CHUNK / TYPE_MSG_END), inflating LZSS
     - Reassemble files (TYPE_FILE_START / TYPE_FILE_CHUNK / TYPE_FILE_END)
+    - Resume (TYPE_FILE_RESUME / TYPE_FILE_HAVE) and FEC parity bookkeeping
     """
-    global rx_file_handle, rx_file_name, rx_msg_reassembly
+    global rx_file_writer, rx_file_name, rx_msg_reassembly, rx_msg_inflater, rx_file_inflater, rx_file_fec
+    global rx_file_xid, rx_file_map, rx_file_no, rx_file_offsets
+    
+    p_type = pkt.pkt_type & PacketV13.TYPE_MASK
+    zipped = pkt.pkt_type & PacketV13.FLAG_COMPRESSED
     
     # 1. Text Reassembly
-    if pkt.pkt_type == PacketV13.TYPE_MSG_CHUNK:
+    if p_type == PacketV13.TYPE_MSG_CHUNK or p_type == PacketV13.TYPE_MSG_END:
         # Accumulate partial text
-        rx_msg_reassembly += pkt.payload
+        if zipped:
+            if rx_msg_inflater is None:
+                rx_msg_inflater = lzss.Decompressor()
+            rx_msg_reassembly += rx_msg_inflater.feed(pkt.payload)
+        else:
+            rx_msg_reassembly += pkt.payload
         
-    elif pkt.pkt_type == PacketV13.TYPE_MSG_END:
+    if p_type == PacketV13.TYPE_MSG_END:
         # Final chunk of a text message
-        rx_msg_reassembly += pkt.payload
+        rx_msg_inflater = None
         try:
             full_msg = rx_msg_reassembly.decode('utf-8')
             print(f"[RX MSG] {full_msg}")
@@ -361,139 +695,760 @@ def process_ordered_packet(pkt):
         rx_msg_reassembly = b''
 
     # 2. File Handling
-    elif pkt.pkt_type == PacketV13.TYPE_FILE_START:
+    elif p_type == PacketV13.TYPE_FILE_RESUME:
+        # The next TYPE_FILE_START belongs to this transfer ID
+        rx_file_xid = int.from_bytes(bytes(pkt.payload[:4]), 'big')
+
+    elif p_type == PacketV13.TYPE_FILE_START:
         # Start of file transfer: parse "filename|size" and open file for writing
+        rx_file_no = (rx_file_no + 1) & 0xFF
         try:
-            meta = pkt.payload.decode().split('|')
-            rx_file_name = meta[0]
+            meta = bytes(pkt.payload).decode().split('|')
             size = int(meta[1])
-            rx_file_handle = open(rx_file_name, 'wb')
+            close_rx_file()
+            xid, rx_file_xid = rx_file_xid, None
+            rx_file_name = rx_name(meta[0])
+            path = f"{RESUME_DIR}/{rx_file_name}.map"
+            f = None
+            if xid is not None and not zipped and RESUME_ENABLED:
+                # Same transfer as a half-received file: keep what is there
+                rx_file_map = ChunkBitmap.load(path, xid, size)
+                if rx_file_map:
+                    try:
+                        f = open(rx_file_name, 'r+b')
+                    except OSError:
+                        rx_file_map = None
+                if not rx_file_map:
+                    rx_file_map = ChunkBitmap(path, xid, size)
+                reply_have(xid)
+            else:
+                try:
+                    os.remove(path)  # Overwritten: an old map no longer applies
+                except OSError:
+                    pass
+            rx_file_writer = BlockWriter(f or open(rx_file_name, 'wb'), RX_WRITE_BLOCK, RX_WRITE_BUFFERS)
+            rx_file_inflater = lzss.Decompressor() if zipped else None
+            rx_file_fec = any('+' in m for m in meta[2:])
+            rx_file_offsets = 'o' in meta[2:]
+            fec_cache.clear()
+            fec_stats["rebuilt"] = fec_stats["arq"] = 0
             print(f"[RX FILE] Start: {rx_file_name} ({size} B)")
             log_web(f"[File] Incoming: {rx_file_name}")
+        except ValueError as e:
+            # Bad name or size: drop the transfer, its chunks find no file open
+            print(f"[RX FILE] Rejected: {e}")
+            log_web(f"[File] Rejected: {e}")
         except:
             # Ignore malformed metadata
             pass
     
-    elif pkt.pkt_type == PacketV13.TYPE_FILE_CHUNK:
+    elif p_type == PacketV13.TYPE_FILE_CHUNK:
         # Write file chunk if a file is currently open
-        if rx_file_handle:
-            rx_file_handle.write(pkt.payload)
+        if rx_file_writer:
+            if rx_file_fec:
+                fec_cache[pkt.seq_num] = bytes(pkt.payload)
+            if rx_file_inflater:
+                rx_file_writer.write(rx_file_inflater.feed(pkt.payload))
+            elif not rx_file_offsets:
+                # Raw chunk without a header: follows the previous one
+                offset = rx_file_writer.pos
+                rx_file_writer.write(pkt.payload)
+                file_written(offset, len(pkt.payload))
+            elif len(pkt.payload) >= 4 and pkt.payload[0] == rx_file_no:
+                # Raw chunk: [file no][offset 3B][data]
+                offset = pkt.payload[1] << 16 | pkt.payload[2] << 8 | pkt.payload[3]
+                rx_file_writer.write(pkt.payload[4:], offset)
+                file_written(offset, len(pkt.payload) - 4)
+            else:
+                # In order yet for another file: the file counts are out of
+                # step, so this file cannot be trusted to be complete
+                no = pkt.payload[0] if pkt.payload else None
+                print(f"[RX FILE] {rx_file_name}: chunk of file #{no}, expected #{rx_file_no}: abandoned")
+                log_web(f"[File] {rx_file_name}: out of step with the sender, abandoned")
+                close_rx_file()
+
+    elif p_type == PacketV13.TYPE_FILE_SEEK:
+        # Resumed file without chunk offsets: the next chunks fill a range we do not have yet
+        if rx_file_writer:
+            rx_file_writer.seek(int.from_bytes(bytes(pkt.payload[:4]), 'big'))
+
+    elif p_type == PacketV13.TYPE_FILE_HAVE:
+        # Reply to our TYPE_FILE_RESUME: file_chunks() skips these ranges
+        resume_have[int.from_bytes(bytes(pkt.payload[:4]), 'big')] = bytes(pkt.payload[4:])
+
+    elif p_type == PacketV13.TYPE_FILE_PARITY:
+        # Every chunk this parity covers has been delivered: forget them
+        for seq in fec.covered(pkt.payload, pkt.seq_num, rx_seq_mod):
+            fec_cache.pop(seq, None)
     
-    elif pkt.pkt_type == PacketV13.TYPE_FILE_END:
+    elif p_type == PacketV13.TYPE_FILE_END:
         # Final packet of file transfer: close handle and report completion
-        if rx_file_handle:
-            rx_file_handle.close()
-            rx_file_handle = None
-            print(f"[RX FILE] Complete: {rx_file_name}")
-            log_web(f"[File] Saved: {rx_file_name}")
+        if rx_file_writer:
+            w = rx_file_writer
+            w.close()
+            rx_file_writer = None
+            if rx_file_map:
+                try:
+                    os.remove(rx_file_map.path)
+                except OSError:
+                    pass  # Never saved
+                rx_file_map = None
+            print(f"[RX FILE] Complete: {rx_file_name} ({w.bytes} B in {w.writes} flash writes)")
+            if rx_file_fec or fec_stats["arq"]:
+                log_web(f"[FEC] {rx_file_name}: {fec_stats['rebuilt']} chunks rebuilt from parity, {fec_stats['arq']} by ARQ")
+            rx_file_fec = False
+            fec_cache.clear()
+            if rx_file_inflater:
+                z = rx_file_inflater
+                log_web(f"[File] Saved: {rx_file_name} ({z.total_in} -> {z.total_out} B, {z.total_in * 100 // max(z.total_out, 1)}%)")
+                rx_file_inflater = None
+            else:
+                log_web(f"[File] Saved: {rx_file_name}")
+
+def close_rx_file():
+    """
+    Give up on the file being received (caller holds main_lock): a new
+    TYPE_FILE_START, or the peer restarted. Its chunk bitmap is saved, so
+    the sender can resume it later.
+    """
+    global rx_file_writer, rx_file_map, rx_file_inflater
+    if rx_file_writer:
+        rx_file_writer.close()
+        rx_file_writer = None
+        if rx_file_map:
+            rx_file_map.save()
+    rx_file_map = None
+    rx_file_inflater = None
+
+def rx_name(name):
+    """
+    Check a received file name: a bare name in the working directory,
+    never a path, and never one of the node's own code or config files.
+    Raises ValueError otherwise.
+    """
+    if not name or "/" in name or "\\" in name or ".." in name:
+        raise ValueError(f"bad file name '{name}'")
+    if name.split(".")[-1] in ("py", "mpy", "json") and name in os.listdir():
+        raise ValueError(f"{name} is a system file")
+    return name
+
+def file_written(offset, n):
+    """
+    `n` bytes of the current file at `offset` were delivered in order
+    (caller holds main_lock). The chunk bitmap counts only such bytes; it
+    is saved every RESUME_SAVE_BYTES, after what lies below is on flash.
+    """
+    if rx_file_map:
+        if offset != rx_file_map.pos:
+            rx_file_map.seek(offset)  # Resumed file: next missing range
+        rx_file_map.wrote(n)
+        if rx_file_map.unsaved >= RESUME_SAVE_BYTES:
+            rx_file_writer.flush(rx_file_map.pos)
+            rx_file_map.save()
+
+def write_early(pkt):
+    """
+    Write an out-of-order raw file chunk through rx_file_writer right away
+    (caller holds main_lock) if it belongs to the file being received, so
+    the reorder buffer does not hold its packet. Returns (offset, length) to
+    keep in rx_packet_buffer instead, None to buffer the packet as usual.
+    The file number rules out chunks of a later file whose START is still
+    missing. Only files whose chunks carry offsets are written early.
+    """
+    payload = pkt.payload
+    if (pkt.pkt_type & (PacketV13.TYPE_MASK | PacketV13.FLAG_COMPRESSED) != PacketV13.TYPE_FILE_CHUNK
+            or not rx_file_offsets or not rx_file_writer or len(payload) < 4 or payload[0] != rx_file_no):
+        return None
+    if rx_file_fec:
+        fec_cache[pkt.seq_num] = bytes(payload)
+    offset = payload[1] << 16 | payload[2] << 8 | payload[3]
+    rx_file_writer.write(payload[4:], offset)
+    return offset, len(payload) - 4
+
+def deliver_buffered():
+    """
+    Deliver buffered frames from rx_expected_seq on, up to the next gap
+    (caller holds main_lock).
+    """
+    global rx_expected_seq
+    while rx_expected_seq in rx_packet_buffer:
+        buffered = rx_packet_buffer.pop(rx_expected_seq)
+        if type(buffered) is tuple:
+            file_written(*buffered)  # Written on arrival
+        else:
+            process_ordered_packet(buffered)
+            pkt_pool.release(buffered)
+        rx_expected_seq = (rx_expected_seq + 1) % rx_seq_mod
+
+def reply_have(xid):
+    """
+    Queue TYPE_FILE_HAVE for a resume offer (caller holds main_lock):
+    [transfer ID][block size] + one (first block, count) pair per range of
+    the file already on flash, as many as fit in a chunk. It goes ahead of
+    our own backlog; ranges left out are simply sent again.
+    """
+    have = rx_file_map.ranges((CHUNK_MAX - 6) // 4)
+    body = bytearray(xid.to_bytes(4, 'big') + rx_file_map.block.to_bytes(2, 'big'))
+    for first, count in have:
+        body += first.to_bytes(2, 'big') + count.to_bytes(2, 'big')
+    if have:
+        log_web(f"[Resume] {rx_file_name}: {len(have)} ranges already here")
+    tx_backlog.insert(0, one_frame(PacketV13.TYPE_FILE_HAVE, body))
+
+def one_frame(p_type, payload):
+    """Backlog entry for a single control frame (no spool entry behind it)."""
+    yield p_type, payload, None
+
+# --- SELECTIVE ACK ---
+def fill_sack_bitmap():
+    """
+    Refresh sack_payload from the receive state: bit i set = seq
+    rx_expected_seq + 1 + i is buffered out of order.
+    """
+    for i in range(sack_len):
+        sack_payload[i] = 0
+    for seq in rx_packet_buffer:
+        d = (seq - rx_expected_seq - 1) % rx_seq_mod
+        if d < 8 * sack_len:
+            sack_payload[d >> 3] |= 1 << (d & 7)
+
+def build_sack(to_addr):
+    """
+    Encode one standalone SACK covering the whole receive state into a
+    pooled packet: seq_num = rx_expected_seq (everything before it arrived),
+    payload = bitmap from fill_sack_bitmap(). Sent with FLAG_SEQ16 once
+    the RX side runs 16-bit seqs.
+    """
+    fill_sack_bitmap()
+    p_type = PacketV13.TYPE_SACK | (PacketV13.FLAG_SEQ16 if rx_seq_mod > 256 else 0)
+    return pkt_pool.acquire().load(to_addr, MY_ADDR, rx_expected_seq, p_type, memoryview(sack_payload)[:sack_len])
+
+def apply_sack(cum, bitmap):
+    """
+    Mark the window from one SACK (caller holds main_lock): seqs before `cum`
+    and those flagged in `bitmap` are ACKed, holes sent before the newest
+    SACKed frame are due again at once. Also feeds rtt (Karn's rule) and cwnd.
+    """
+    ring = tx_ring
+    fresh = 0  # Send time of the newest newly ACKed frame sent once
+    before = ring.unacked
+    done = (cum - ring.base) % seq_mod
+    if done <= ring.count():
+        for k in range(done):
+            seq = (ring.base + k) % seq_mod
+            if ring.ack(seq) and ring.tries[seq & ring.mask] == 1:
+                sent = ring.sent[seq & ring.mask]
+                if sent and (not fresh or time.ticks_diff(sent, fresh) > 0):
+                    fresh = sent
+    newest = 0  # Send time of the newest SACKed frame
+    top = -1
+    for d in range(8 * len(bitmap)):
+        if bitmap[d >> 3] & (1 << (d & 7)):
+            seq = (cum + 1 + d) % seq_mod
+            if ring.holds(seq):
+                sent = ring.sent[seq & ring.mask]
+                if ring.ack(seq) and ring.tries[seq & ring.mask] == 1:
+                    if sent and (not fresh or time.ticks_diff(sent, fresh) > 0):
+                        fresh = sent
+                if sent and (not newest or time.ticks_diff(sent, newest) > 0):
+                    newest = sent
+                top = d
+    if fresh:
+        rtt.sample(time.ticks_diff(millis(), fresh))
+    cwnd.on_ack(before - ring.unacked, millis())
+    # Fast retransmit of real holes (cum itself, then gaps below the top bit)
+    for d in range(-1, top):
+        seq = (cum + 1 + d) % seq_mod
+        if ring.holds(seq) and not ring.is_acked(seq):
+            sent = ring.sent[seq & ring.mask]
+            if sent and newest and time.ticks_diff(newest, sent) > 0:
+                ring.sent[seq & ring.mask] = 0
+                tx_due.append(seq)
+
+def apply_ack(seq):
+    """
+    Mark `seq` from a per-frame TYPE_ACK (caller holds main_lock), as
+    apply_sack() would: one RTT sample (Karn's rule), cwnd opened, and
+    older frames sent before it and still unacknowledged due again - their
+    frame or its ACK was lost, and only a resend earns a new ACK.
+    """
+    ring = tx_ring
+    slot = seq & ring.mask
+    if not ring.ack(seq):
+        return
+    sent = ring.sent[slot]
+    if sent and ring.tries[slot] == 1:
+        rtt.sample(time.ticks_diff(millis(), sent))
+    cwnd.on_ack(1, millis())
+    for k in range((seq - ring.base) % seq_mod):
+        old = (ring.base + k) % seq_mod
+        i = old & ring.mask
+        if not ring.acked[i] and ring.sent[i] and sent and time.ticks_diff(sent, ring.sent[i]) > 0:
+            ring.sent[i] = 0
+            tx_due.append(old)
+
+# --- FEC RECEIVER ---
+def fec_rebuild(from_addr):
+    """
+    Rebuild file chunks lost in flight from buffered TYPE_FILE_PARITY
+    packets (caller holds main_lock). A parity whose lane misses exactly one
+    chunk still inside the receive window yields that chunk, which goes into
+    rx_packet_buffer as if it had arrived; the next SACK then acknowledges
+    it before the sender's timer fires. Returns the number rebuilt.
+    """
+    rebuilt = 0
+    for pkt in list(rx_packet_buffer.values()):
+        if type(pkt) is tuple or pkt.pkt_type & PacketV13.TYPE_MASK != PacketV13.TYPE_FILE_PARITY:
+            continue
+        missing = None
+        others = []
+        for seq in fec.covered(pkt.payload, pkt.seq_num, rx_seq_mod):
+            if seq in fec_cache:
+                others.append(fec_cache[seq])  # Delivered, or written on arrival
+            elif seq in rx_packet_buffer:
+                others.append(rx_packet_buffer[seq].payload)
+            elif missing is None:
+                missing = seq
+            else:
+                missing = -1  # Two holes in this lane: wait for ARQ
+        if missing is None or missing < 0 or (missing - rx_expected_seq) % rx_seq_mod >= rx_window:
+            continue
+        chunk = fec.rebuild(pkt.payload, others)
+        p_type = PacketV13.TYPE_FILE_CHUNK | (pkt.pkt_type & (PacketV13.FLAG_COMPRESSED | PacketV13.FLAG_SEQ16))
+        rebuilt_pkt = pkt_pool.acquire().load(MY_ADDR, from_addr, missing, p_type, chunk)
+        written = write_early(rebuilt_pkt)
+        if written:
+            pkt_pool.release(rebuilt_pkt)
+        rx_packet_buffer[missing] = written or rebuilt_pkt
+        fec_stats["rebuilt"] += 1
+        rebuilt += 1
+    return rebuilt
 
 # --- SENDER LOOP ---
+def transmit(frame, length):
+    """
+    Listen-Before-Talk with random backoff, then send one radio packet.
+    Returns True if the packet went out within MAX_LBT_RETRIES.
+    Busy CAD scans are counted in lbt_busy.
+    """
+    global lbt_busy
+    # LBT: random initial backoff
+    time.sleep_ms(random.randint(10, 40))
+    # Try up to MAX_LBT_RETRIES if channel is busy
+    for attempt in range(MAX_LBT_RETRIES):
+        if sx_tx.scanChannel() == sx126x.CHANNEL_FREE:
+            # Channel free, transmit the pre-encoded frame
+            sx_tx.send(frame, length)
+            return True
+        # Channel busy, back off randomly
+        lbt_busy += 1
+        time.sleep_ms(random.randint(20, 50))
+    return False
+
+def build_packet(due, pos, now):
+    """
+    Fill the aggregator with one radio packet (caller holds main_lock): due
+    frames from due[pos:] plus the owed SACK, piggybacked or standalone after
+    DELAYED_ACK_MS. Before the peer's HELLO: one TYPE_ACK or one frame.
+    Returns the index of the first frame left over.
+    """
+    global sack_peer
+    ring = tx_ring
+    if ack_owed:
+        to, seq = ack_owed.pop(0)
+        ack = pkt_pool.acquire().load(to, MY_ADDR, seq, PacketV13.TYPE_ACK, b'')
+        agg.add(ack.buf, ack.length, to)
+        pkt_pool.release(ack)
+        return pos
+    owed = sack_peer
+    if owed is not None:
+        fill_sack_bitmap()
+    while pos < len(due):
+        seq = due[pos]
+        slot = seq & ring.mask
+        if (pos and seq == due[pos - 1]) or not ring.holds(seq) or ring.acked[slot]:
+            pos += 1
+            continue
+        pkt = ring.pkts[slot]
+        n = 0
+        # An 8-bit frame cannot carry a 16-bit cumulative seq
+        if owed == pkt.to_addr and (rx_seq_mod == 256 or pkt.pkt_type & PacketV13.FLAG_SEQ16):
+            n = pkt.pack_with_ack(piggy_buf, rx_expected_seq, memoryview(sack_payload)[:sack_len])
+        if n:
+            if not agg.add(piggy_buf, n, owed):
+                break
+            owed = sack_peer = None
+        elif not agg.add(pkt.buf, pkt.length, pkt.to_addr):
+            break
+        tx_batch.append(seq)
+        pos += 1
+        if peer_boot is None:
+            break
+    # Nothing carried it: fall back to a standalone SACK
+    if pos >= len(due) and owed is not None and time.ticks_diff(now, sack_since) >= DELAYED_ACK_MS:
+        ack = build_sack(owed)
+        if agg.add(ack.buf, ack.length, ack.to_addr):
+            sack_peer = None
+        pkt_pool.release(ack)
+    return pos
+
+def settle_packet(sent, busy):
+    """
+    Account for one radio packet after transmit() (caller holds main_lock):
+    stamp and arm timers if it went out, else its seqs are due again.
+    """
+    now = millis()
+    if busy and tx_batch:
+        cwnd.on_congestion(now, "busy")
+    if sent:
+        deadline = time.ticks_add(now, rtt.rto)
+        for seq in tx_batch:
+            tx_ring.stamp(seq, now)
+            rtx_timers.schedule((seq, now), deadline)
+    else:
+        tx_due.extend(tx_batch)
+    tx_batch.clear()
+
+def build_hello():
+    """
+    Our HELLO (caller holds main_lock): [seq bits][heard][boot ID 2B][caps],
+    To BROADCAST so firmware without HELLO drops it (see docs 5.9).
+    """
+    global hello_at, hello_due, hello_left
+    hello = pkt_pool.acquire().load(PacketV13.BROADCAST, MY_ADDR, 0, PacketV13.TYPE_HELLO,
+                                    bytes((16 if SEQ16_ENABLED else 8,
+                                           (0 if peer_boot is None else 1) | (2 if peer_heard else 0),
+                                           boot_id >> 8, boot_id & 0xFF,
+                                           1 if FILE_OFFSETS_ENABLED else 0)))
+    hello_at = millis()
+    hello_due = False
+    if hello_left:
+        hello_left -= 1
+    return hello
+
+def handle_hello(pkt):
+    """
+    Record the peer's HELLO; answer it until the peer has our confirmation
+    that we heard it.
+    A boot ID other than the last one seen means the peer restarted with
+    fresh seqs: reset_link().
+    """
+    global peer_seq16, peer_offsets, peer_heard, hello_due, peer_boot
+    if len(pkt.payload) < 2 or pkt.from_addr != TARGET_ADDR:
+        return
+    with main_lock:
+        boot = (pkt.payload[2] << 8 | pkt.payload[3]) if len(pkt.payload) >= 4 else -1
+        if peer_boot is not None and boot != peer_boot:
+            reset_link()
+        peer_boot = boot
+        peer_seq16 = SEQ16_ENABLED and pkt.payload[0] >= 16
+        peer_offsets = len(pkt.payload) >= 5 and bool(pkt.payload[4] & 1)
+        peer_heard = peer_heard or bool(pkt.payload[1] & 1)
+        if not pkt.payload[1] & 2:
+            hello_due = True
+    wake_sender()
+
+def reset_link():
+    """
+    The peer restarted (caller holds main_lock): back to 8-bit seqs both
+    ways, drop what is in flight or buffered, requeue pending spool entries.
+    """
+    global seq_mod, seq_flag, window_size, peer_heard, hello_left, resume_wait, sack_peer
+    global rx_expected_seq, rx_seq_mod, rx_window, sack_len, rx_msg_reassembly, rx_msg_inflater, rx_file_fec
+    global tx_file_no, rx_file_no
+    ring = tx_ring
+    for i in range(len(ring.pkts)):
+        if ring.pkts[i]:
+            pkt_pool.release(ring.pkts[i])
+            ring.pkts[i] = None
+        ring.tags[i] = None
+    ring.base = ring.next = ring.unacked = 0
+    ring.mod = seq_mod = 256
+    seq_flag = 0
+    window_size = cwnd.max_w = WINDOW_SIZE
+    tx_due.clear()
+    for chunks in tx_backlog:
+        chunks.close()
+    tx_backlog.clear()
+    resume_wait = None
+    resume_have.clear()
+    for entry in spool.entries:
+        if not entry.done:
+            tx_backlog.append(entry_chunks(entry))
+
+    for buffered in rx_packet_buffer.values():
+        if type(buffered) is not tuple:
+            pkt_pool.release(buffered)
+    rx_packet_buffer.clear()
+    rx_expected_seq = 0
+    rx_seq_mod, rx_window, sack_len = 256, WINDOW_SIZE, SACK_BYTES
+    pkt_pool.resize(POOL_SIZE)
+    rx_msg_reassembly = b''
+    rx_msg_inflater = None
+    close_rx_file()
+    rx_file_fec = False
+    fec_cache.clear()
+    sack_peer = None
+    ack_owed.clear()
+    tx_file_no = rx_file_no = 0  # Both sides count files afresh
+
+    peer_heard = False
+    hello_left = HELLO_TRIES
+    log_web(f"[Link] Peer restarted, {len(tx_backlog)} queued again")
+
+def wake_sender():
+    """Cut the sender's sleep short: data queued, ACKs in, a SACK or HELLO owed."""
+    try:
+        tx_wake.release()
+    except RuntimeError:
+        pass  # Already woken
+
+def sender_wait(deadline):
+    """Sleep until `deadline` (None: no deadline) or wake_sender()."""
+    if deadline is None:
+        tx_wake.acquire()
+        return
+    while not tx_wake.acquire(0):
+        left = time.ticks_diff(deadline, millis())
+        if left <= 0:
+            return
+        time.sleep_ms(min(left, TIMER_TICK_MS))
+
+def next_wakeup(now):
+    """
+    When the sender next has work unless woken (caller holds main_lock):
+    `now`, the earliest deadline, or None if idle.
+    """
+    if tx_due or hello_due or ack_owed or (tx_backlog and window_open() and resume_wait is None):
+        return now
+    best = rtx_timers.next_deadline()
+    if resume_wait is not None and (best is None or time.ticks_diff(resume_wait, best) < 0):
+        best = resume_wait
+    if sack_peer is not None:
+        t = time.ticks_add(sack_since, DELAYED_ACK_MS)
+        if best is None or time.ticks_diff(t, best) < 0:
+            best = t
+    if hello_left and not peer_heard:
+        t = time.ticks_add(hello_at, hello_interval())
+        if best is None or time.ticks_diff(t, best) < 0:
+            best = t
+    return best
+
 def sender_loop():
     """
     Continuous sender thread implementing sliding window ARQ with:
-    - Window size WINDOW_SIZE
-    - Retransmission after TIMEOUT_MS
+    - Window size WINDOW_SIZE (WINDOW_SIZE_16 after the SEQ16 switch)
+    - Retransmission after rtt.rto, driven by rtx_timers, and cwnd
     - Listen-Before-Talk (LBT) with random backoff and MAX_LBT_RETRIES
+    - Frame aggregation of due frames and ACKs for the peer
+    This is the only thread that transmits on sx_tx.
     """
-    global window_base
+    global seq_mod, seq_flag, window_size
+    ring = tx_ring
+    due = []
+    fired = []
     while True:
         current_time = millis()
+        hello = None
         with main_lock:
-            # Iterate over all positions in the current window
-            for i in range(WINDOW_SIZE):
-                seq = (window_base + i) % 256
-                pkt_to_send = None
-
-                # Find packet with this sequence number in tx_queue
-                for pkt in tx_queue:
-                    if pkt.seq_num == seq:
-                        pkt_to_send = pkt
-                        break
-                
-                # If packet exists and is not yet ACKed, consider sending/retransmitting
-                if pkt_to_send and not acked_buffer.get(seq, False):
-                    last_sent = tx_timestamps.get(seq, 0)
-                    # Send if never sent or timed out
-                    if last_sent == 0 or (time.ticks_diff(current_time, last_sent) > TIMEOUT_MS):
-                        # LBT: random initial backoff
-                        initial_backoff = random.randint(10, 40)
-                        time.sleep_ms(initial_backoff)
-                        sent = False
-                        # Try up to MAX_LBT_RETRIES if channel is busy
-                        for attempt in range(MAX_LBT_RETRIES):
-                            if sx_tx.scanChannel() == sx126x.CHANNEL_FREE:
-                                # Channel free, transmit packet
-                                sx_tx.send(pkt_to_send.to_bytes())
-                                tx_timestamps[seq] = millis()
-                                sent = True
-                                break
-                            else:
-                                # Channel busy, back off randomly
-                                time.sleep_ms(random.randint(20, 50))
-
-            # Slide window forward past any consecutive ACKed packets from window_base
-            while acked_buffer.get(window_base, False):
-                to_rem = next((p for p in tx_queue if p.seq_num == window_base), None)
-                if to_rem:
-                    tx_queue.remove(to_rem)
-                # Remove bookkeeping for this sequence number
-                del acked_buffer[window_base]
-                if window_base in tx_timestamps:
-                    del tx_timestamps[window_base]
-                # Move window base forward with wraparound
-                window_base = (window_base + 1) % 256
-        # Small sleep to avoid hogging CPU
-        time.sleep_ms(10)
+            # Slide window forward past any consecutive ACKed packets
+            done = ring.pop()
+            while done:
+                pkt, tries, tag = done
+                if tag:
+                    spool.ack(*tag)
+                # Every copy but the one that got through was lost
+                for _ in range(tries - 1):
+                    sizer.sample(pkt.length, True)
+                sizer.sample(pkt.length, False)
+                pkt_pool.release(pkt)
+                done = ring.pop()
+
+            if hello_due or (hello_left and not peer_heard
+                             and time.ticks_diff(current_time, hello_at) >= hello_interval()):
+                hello = build_hello()
+            # Both sides speak SEQ16: switch while nothing is in flight, so
+            # the peer never sees the two seq spaces mixed
+            if seq_mod == 256 and peer_seq16 and peer_heard and ring.count() == 0:
+                seq_mod, seq_flag, window_size = 65536, PacketV13.FLAG_SEQ16, WINDOW_SIZE_16
+                ring.mod = seq_mod
+                pkt_pool.resize(POOL_SIZE_16)
+                cwnd.max_w = window_size
+                log_web(f"[Link] 16-bit seqs, window {window_size}")
+            fill_window()
+
+            # Due seqs: new and fast-retransmit ones, plus expired timers.
+            # A timer is stale if its seq was ACKed or sent again since.
+            # The RTO backs off when the oldest frame times out, as with
+            # TCP's single retransmit timer, not once per frame
+            rtx_timers.expire(current_time, fired)
+            for seq, stamp in fired:
+                slot = seq & ring.mask
+                if ring.holds(seq) and not ring.acked[slot] and ring.sent[slot] == stamp:
+                    tx_due.append(seq)
+                    cwnd.on_congestion(current_time, "timeout")
+                    if seq == ring.base:
+                        rtt.backoff()
+            fired.clear()
+            due.extend(tx_due)
+            tx_due.clear()
+            due.sort(key=lambda s: (s - ring.base) % seq_mod)  # Oldest first
+
+        # Log what the slide acknowledged; flash writes stay outside main_lock
+        spool.sync()
+
+        # Radio I/O runs without main_lock: LBT backoffs, CAD scans and the
+        # blocking send would otherwise stall rx_loop's ACK handling and the
+        # web server's queue_message()/queue_file()
+        if hello:
+            transmit(hello.buf, hello.length)
+            pkt_pool.release(hello)
+
+        # One radio packet at a time: build it from the state under the
+        # lock, send it without, then stamp what went out
+        pos = 0
+        while True:
+            with main_lock:
+                pos = build_packet(due, pos, current_time)
+                if agg.count == 0:
+                    due.clear()
+                    wake_at = next_wakeup(millis())
+                    break
+                frame, length = agg.finish()
+            busy = lbt_busy
+            sent = transmit(frame, length)
+            with main_lock:
+                settle_packet(sent, lbt_busy != busy)
+        # Sleep until the next deadline, or until woken
+        sender_wait(wake_at)
 
 # --- RECEIVER LOOP ---
+def handle_frame(data, nested=False):
+    """
+    Decode and act on one frame (`nested`: from a TYPE_AGGREGATE container):
+    - ACK / SACK frames update sender state
+    - Data frames go through in-order delivery and owe the peer a SACK
+      (a TYPE_ACK per frame until its HELLO is in)
+    - HELLO frames (To BROADCAST) carry the peer's capabilities
+    """
+    global rx_expected_seq, sack_peer, sack_since, rx_seq_mod, rx_window, sack_len, hello_due
+    # Lazy decode into a pooled packet: foreign frames are dropped
+    # before CRC work and the payload stays a view into `data`
+    rx_pkt = pkt_pool.acquire()
+    kept = False
+    hdr = PacketV13.peek(data)
+    dest = PacketV13.BROADCAST if hdr and hdr[0] == PacketV13.BROADCAST else MY_ADDR
+    pkt = PacketV13.from_view(data, dest, rx_pkt)
+    if pkt:
+        kind = pkt.pkt_type & PacketV13.TYPE_MASK
+        if dest == PacketV13.BROADCAST:
+            if kind == PacketV13.TYPE_HELLO:
+                handle_hello(pkt)
+        elif kind == PacketV13.TYPE_AGGREGATE:
+            if not nested:
+                for inner in PacketV13.split_aggregate(pkt.payload):
+                    handle_frame(inner, True)
+        elif kind == PacketV13.TYPE_SACK:
+            # Cumulative + selective ACK: mark the whole window in one pass
+            with main_lock:
+                apply_sack(pkt.seq_num, pkt.payload)
+            wake_sender()
+        elif kind == PacketV13.TYPE_ACK:
+            # ACK packet: mark corresponding seq as acknowledged
+            with main_lock:
+                apply_ack(pkt.seq_num)
+            wake_sender()
+        else:
+            # Reverse-direction data may carry our SACK in its header
+            if pkt.pkt_type & PacketV13.FLAG_ACK:
+                ack = pkt.strip_ack()
+                if ack:
+                    with main_lock:
+                        apply_sack(ack[0], ack[1])
+            seq = pkt.seq_num
+            with main_lock:
+                if pkt.pkt_type & PacketV13.FLAG_SEQ16:
+                    if peer_boot is None:
+                        seq = -1  # From the session before our restart
+                    elif rx_seq_mod == 256:
+                        # Peer switched with its window empty: seqs carry on
+                        # numerically, only the wrap point and window grow
+                        rx_seq_mod, rx_window = 65536, WINDOW_SIZE_16
+                        sack_len = (WINDOW_SIZE_16 + 7) // 8
+                        pkt_pool.resize(POOL_SIZE_16)
+                elif rx_seq_mod > 256:
+                    seq = -1  # Stray 8-bit frame from before the switch
+                # Compute distance from expected sequence number modulo the RX seq space
+                diff = (seq - rx_expected_seq) % rx_seq_mod if seq >= 0 else rx_seq_mod
+                if diff == 0:
+                    # This is exactly the next in-order packet; with later
+                    # frames buffered it fills a hole, i.e. was recovered by ARQ
+                    if rx_packet_buffer and pkt.pkt_type & PacketV13.TYPE_MASK == PacketV13.TYPE_FILE_CHUNK:
+                        fec_stats["arq"] += 1
+                    process_ordered_packet(pkt)
+                    rx_expected_seq = (rx_expected_seq + 1) % rx_seq_mod
+                    # Deliver any subsequent buffered packets in order
+                    deliver_buffered()
+                elif diff < rx_window:
+                    # Packet is within receive window but out of order: a raw
+                    # file chunk goes to flash now, anything else is buffered
+                    # (payload copied into the pooled packet's own buffer)
+                    if seq not in rx_packet_buffer:
+                        written = write_early(pkt)
+                        if written:
+                            rx_packet_buffer[seq] = written
+                        else:
+                            rx_packet_buffer[seq] = pkt.detach()
+                            kept = True
+                        # Parity may now fill the hole at rx_expected_seq
+                        if rx_file_fec and fec_rebuild(pkt.from_addr):
+                            deliver_buffered()
+                if peer_boot is None:
+                    # No HELLO from the peer (yet): it may not know SACKs, so
+                    # frames in or behind the window get a TYPE_ACK each.
+                    # Our HELLO goes out soon, so a peer still sending from
+                    # before our restart resets its side.
+                    dup = rx_seq_mod - diff <= rx_window  # Behind the window: delivered
+                    if seq >= 0 and (diff < rx_window or dup) and (pkt.from_addr, seq) not in ack_owed:
+                        ack_owed.append((pkt.from_addr, seq))
+                    if hello_left and time.ticks_diff(millis(), hello_at) >= rtt.rto:
+                        hello_due = True
+                else:
+                    # Set after the RX state changed, so the SACK built under
+                    # main_lock already covers this frame (duplicates included).
+                    # In-order frames may wait DELAYED_ACK_MS for reverse data;
+                    # gaps and duplicates are reported on the next pass.
+                    if sack_peer is None:
+                        sack_since = millis()
+                    if diff != 0:
+                        sack_since = time.ticks_add(millis(), -DELAYED_ACK_MS)
+                    sack_peer = pkt.from_addr
+            wake_sender()
+    if not kept:
+        pkt_pool.release(rx_pkt)
+
 def rx_loop():
     """
-    Continuous receiver thread:
-    - Receives LoRa packets on sx_rx
-    - Handles ACK packets to update sender state
-    - For data packets: sends ACK back and performs in-order delivery using
-      rx_expected_seq and rx_packet_buffer (reordering buffer).
+    Continuous receiver thread: receives LoRa packets on sx_rx and hands
+    each one (aggregates included) to handle_frame().
     """
-    global rx_expected_seq
     while True:
         try:
             # Blocking receive with timeout
             data, err = sx_rx.recv(len=0, timeout_en=True, timeout_ms=1000)
             if len(data) > 0:
-                pkt = PacketV13.from_bytes(data)
-                # Ensure the packet is intended for this node
-                if pkt and pkt.to_addr == MY_ADDR:
-                    if pkt.pkt_type == PacketV13.TYPE_ACK:
-                        # ACK packet: mark corresponding seq as acknowledged
-                        with main_lock:
-                            acked_buffer[pkt.seq_num] = True
-                    else:
-                        # Data packet: send ACK back to sender
-                        ack = PacketV13(pkt.from_addr, MY_ADDR, pkt.seq_num, PacketV13.TYPE_ACK)
-                        # Small randomized delay to reduce collision chance
-                        time.sleep_ms(random.randint(5, 15))
-                        sx_tx.send(ack.to_bytes())
-                        
-                        seq = pkt.seq_num
-                        with main_lock:
-                            # Compute distance from expected sequence number modulo 256
-                            diff = (seq - rx_expected_seq) % 256
-                            if diff == 0:
-                                # This is exactly the next in-order packet
-                                process_ordered_packet(pkt)
-                                rx_expected_seq = (rx_expected_seq + 1) % 256
-                                # Deliver any subsequent buffered packets in order
-                                while rx_expected_seq in rx_packet_buffer:
-                                    process_ordered_packet(rx_packet_buffer.pop(rx_expected_seq))
-                                    rx_expected_seq = (rx_expected_seq + 1) % 256
-                            elif diff < WINDOW_SIZE:
-                                # Packet is within receive window but out of order: buffer it
-                                if seq not in rx_packet_buffer:
-                                    rx_packet_buffer[seq] = pkt
+                handle_frame(data)
         except Exception as e:
             # Print RX error and continue listening
             print(f"[RX Error] {e}")
 
+# Resume what was still queued when the node went down: unfinished
+# messages and files are sent again from their start
+for entry in spool.entries:
+    tx_backlog.append(entry_chunks(entry))
+if spool.entries:
+    log_web(f"[Spool] {len(spool.entries)} queued, {spool.pending_bytes()} B to send")
+
 # Start receiver and sender threads
 _thread.start_new_thread(rx_loop, ())
 _thread.start_new_thread(sender_loop, ())
@@ -1,60 +1,386 @@
 import struct
 
-# --- CRC16-CCITT Implementation ---
-def crc16(data: bytes) -> int:
-    crc = 0xFFFF
-    for byte in data:
-        crc ^= (byte << 8)
-        for _ in range(8):
-            if crc & 0x8000:
-                crc = (crc << 1) ^ 0x1021
-            else:
-                crc <<= 1
-        crc &= 0xFFFF
-    return crc
+# --- CRC16-CCITT (shared table-driven engine in crc.py) ---
+from crc import crc16
 
 class PacketV13:
     # Packet Types
     TYPE_ACK = 0x01
+    TYPE_SACK = 0x08       # seq_num = next expected seq, payload = OOO bitmap
     TYPE_MSG_CHUNK = 0x02  # Part of a text message
     TYPE_MSG_END   = 0x06  # End of a text message (NEW)
     
     TYPE_FILE_START = 0x03 # Metadata
-    TYPE_FILE_CHUNK = 0x04 # Content
+    TYPE_FILE_CHUNK = 0x04 # Content; raw files may start with [file no][offset 3B]
     TYPE_FILE_END   = 0x05 # EOF
+    TYPE_FILE_PARITY = 0x09 # XOR parity over a block of file chunks (see fec.py)
+    TYPE_FILE_RESUME = 0x0B # Transfer ID offered ahead of TYPE_FILE_START
+    TYPE_FILE_HAVE   = 0x0C # Receiver -> sender: [ID][block][ranges it already has]
+    TYPE_FILE_SEEK   = 0x0D # Next chunks go to this byte offset (chunks without offsets)
+
+    TYPE_AGGREGATE  = 0x07 # Container: several complete frames for one peer
+    TYPE_HELLO      = 0x0A # Capability exchange, sent To BROADCAST (see main.py)
+
+    # OR-ed into the data types above: payload is an LZSS stream (see lzss.py)
+    FLAG_COMPRESSED = 0x80
+    # OR-ed into a data type: payload starts with piggybacked SACK state,
+    # [n][cum seq][n-byte bitmap], ahead of the data (see pack_with_ack())
+    FLAG_ACK = 0x40
+    # OR-ed into any type: a fifth header byte holds the high half of a
+    # 16-bit seq_num (extended header, only sent to peers that announced it)
+    FLAG_SEQ16 = 0x20
+    TYPE_MASK = 0x1F       # Type without the flags above
+
+    BROADCAST = 0xFF       # To address of TYPE_HELLO; 8-bit-only peers drop it unread
 
-    # Header: To (1), From (1), Seq (1), Type (1)
+    # Header: To (1), From (1), Seq (1), Type (1) [, Seq high (1) with FLAG_SEQ16]
     HEADER_FMT = 'BBBB'
     HEADER_SIZE = struct.calcsize(HEADER_FMT)
     FOOTER_SIZE = 2 # CRC16
+    MAX_FRAME = 255 # SX126x max packet length
+
+    # No per-instance __dict__; `buf`/`length` hold the encoded frame (see load())
+    __slots__ = ('to_addr', 'from_addr', 'seq_num', 'pkt_type', 'payload', 'buf', 'length')
+
+    def __init__(self, to_addr=0, from_addr=0, seq_num=0, pkt_type=0, payload=b''):
+        self.to_addr = to_addr & 0xFF
+        self.from_addr = from_addr & 0xFF
+        self.pkt_type = pkt_type & 0xFF
+        self.seq_num = seq_num & (0xFFFF if self.pkt_type & self.FLAG_SEQ16 else 0xFF)
+        self.payload = payload
+        self.buf = None
+        self.length = 0
+
+    @classmethod
+    def header_size(cls, pkt_type):
+        """Header length for `pkt_type` (one byte longer with FLAG_SEQ16)."""
+        return cls.HEADER_SIZE + 1 if pkt_type & cls.FLAG_SEQ16 else cls.HEADER_SIZE
+
+    def _pack_header(self, buf, offset, pkt_type):
+        struct.pack_into(self.HEADER_FMT, buf, offset, self.to_addr, self.from_addr, self.seq_num & 0xFF, pkt_type)
+        if pkt_type & self.FLAG_SEQ16:
+            buf[offset + self.HEADER_SIZE] = self.seq_num >> 8
+            return offset + self.HEADER_SIZE + 1
+        return offset + self.HEADER_SIZE
 
-    def __init__(self, to_addr, from_addr, seq_num, pkt_type, payload=b''):
+    def load(self, to_addr, from_addr, seq_num, pkt_type, payload=b''):
+        """
+        Re-initialise a (pooled) packet and encode it into its own `buf`.
+        The buffer is reused across loads when large enough, so ACKs and
+        retransmissions go out with sx.send(pkt.buf, pkt.length) and no
+        new bytes objects.
+        """
         self.to_addr = to_addr & 0xFF
         self.from_addr = from_addr & 0xFF
-        self.seq_num = seq_num & 0xFF
         self.pkt_type = pkt_type & 0xFF
+        self.seq_num = seq_num & (0xFFFF if self.pkt_type & self.FLAG_SEQ16 else 0xFF)
         self.payload = payload
 
+        hs = self.header_size(self.pkt_type)
+        need = hs + len(payload) + self.FOOTER_SIZE
+        if self.buf is None or len(self.buf) < need:
+            self.buf = bytearray(need)
+        self.length = self.pack_into(self.buf)
+        if payload:
+            # Point at our own copy so the caller's chunk can be freed
+            self.payload = memoryview(self.buf)[hs:need - self.FOOTER_SIZE]
+        return self
+
+    def pack_into(self, buf, offset=0):
+        """Serialize into `buf` at `offset`; returns the frame length."""
+        start = self._pack_header(buf, offset, self.pkt_type)
+        end = start + len(self.payload)
+        buf[start:end] = self.payload
+        struct.pack_into('>H', buf, end, crc16(memoryview(buf)[offset:end]))
+        return end + self.FOOTER_SIZE - offset
+
+    def pack_with_ack(self, buf, cum, bitmap):
+        """
+        Encode this data frame into `buf` with SACK state piggybacked in
+        front of the payload and FLAG_ACK set. The packet itself is not
+        modified. Returns the frame length, or 0 if it would not fit.
+        On a FLAG_SEQ16 frame `cum` takes two bytes (big-endian).
+        """
+        n = len(bitmap)
+        wide = self.pkt_type & self.FLAG_SEQ16
+        ptr = self.header_size(self.pkt_type)
+        start = ptr + (3 if wide else 2) + n
+        end = start + len(self.payload)
+        if end + self.FOOTER_SIZE > min(len(buf), self.MAX_FRAME):
+            return 0
+        self._pack_header(buf, 0, self.pkt_type | self.FLAG_ACK)
+        buf[ptr] = n
+        if wide:
+            struct.pack_into('>H', buf, ptr + 1, cum)
+        else:
+            buf[ptr + 1] = cum
+        buf[start - n:start] = bitmap
+        buf[start:end] = self.payload
+        struct.pack_into('>H', buf, end, crc16(memoryview(buf)[:end]))
+        return end + self.FOOTER_SIZE
+
+    def strip_ack(self):
+        """
+        Split piggybacked SACK state off a received FLAG_ACK frame.
+        Returns (cum, bitmap) and leaves a plain data packet behind,
+        or None if the frame carries no (or a truncated) ACK prefix.
+        """
+        if not self.pkt_type & self.FLAG_ACK or len(self.payload) < 2:
+            return None
+        mv = memoryview(self.payload)
+        n = mv[0]
+        if self.pkt_type & self.FLAG_SEQ16:
+            if len(mv) < 3 + n:
+                return None
+            cum, start = (mv[1] << 8) | mv[2], 3
+        else:
+            if len(mv) < 2 + n:
+                return None
+            cum, start = mv[1], 2
+        self.pkt_type &= ~self.FLAG_ACK
+        self.payload = mv[start + n:]
+        return cum, mv[start:start + n]
+
     def to_bytes(self):
-        header = struct.pack(self.HEADER_FMT, self.to_addr, self.from_addr, self.seq_num, self.pkt_type)
-        packet_no_crc = header + self.payload
-        checksum = crc16(packet_no_crc)
-        crc_bytes = struct.pack('>H', checksum)
-        return packet_no_crc + crc_bytes
+        buf = bytearray(self.header_size(self.pkt_type) + len(self.payload) + self.FOOTER_SIZE)
+        self.pack_into(buf)
+        return bytes(buf)
 
     @classmethod
     def from_bytes(cls, data):
+        pkt = cls.from_view(data)
+        if pkt:
+            pkt.payload = bytes(pkt.payload)
+        return pkt
+
+    # --- Zero-copy decode path (RX hot loop) ---
+    @classmethod
+    def peek(cls, data):
+        """
+        Read (to_addr, pkt_type) straight from the header without CRC work.
+        Returns None if the frame is too short to hold a header + CRC.
+        """
         if len(data) < (cls.HEADER_SIZE + cls.FOOTER_SIZE):
             return None
-        
-        payload_with_header = data[:-cls.FOOTER_SIZE]
-        received_crc = struct.unpack('>H', data[-cls.FOOTER_SIZE:])[0]
-        
-        if crc16(payload_with_header) != received_crc:
+        to_addr, _, _, pkt_type = struct.unpack_from(cls.HEADER_FMT, data, 0)
+        return to_addr, pkt_type
+
+    @classmethod
+    def from_view(cls, data, my_addr=None, out=None):
+        """
+        Lazy decode: the header is unpacked in place, frames addressed to
+        another node (when `my_addr` is given) are dropped before the CRC is
+        computed, and `payload` is a memoryview into `data`.
+        Call `detach()` on packets that outlive the receive buffer.
+        If `out` is given (e.g. from a PacketPool) it is filled in and returned
+        instead of allocating a new packet.
+        """
+        end = len(data) - cls.FOOTER_SIZE
+        if end < cls.HEADER_SIZE:
+            return None
+
+        to_addr, from_addr, seq_num, pkt_type = struct.unpack_from(cls.HEADER_FMT, data, 0)
+        if my_addr is not None and to_addr != my_addr:
+            return None # Foreign frame, skip CRC
+        hs = cls.header_size(pkt_type)
+        if end < hs:
+            return None
+        if hs > cls.HEADER_SIZE:
+            seq_num |= data[cls.HEADER_SIZE] << 8
+
+        mv = memoryview(data)
+        if crc16(mv[:end]) != ((data[end] << 8) | data[end + 1]):
             return None # CRC Fail
-        
-        header = payload_with_header[:cls.HEADER_SIZE]
-        to_addr, from_addr, seq_num, pkt_type = struct.unpack(cls.HEADER_FMT, header)
-        payload = payload_with_header[cls.HEADER_SIZE:]
-        
-        return cls(to_addr, from_addr, seq_num, pkt_type, payload)
+
+        if out is None:
+            return cls(to_addr, from_addr, seq_num, pkt_type, mv[hs:end])
+        out.to_addr = to_addr
+        out.from_addr = from_addr
+        out.seq_num = seq_num
+        out.pkt_type = pkt_type
+        out.payload = mv[hs:end]
+        return out
+
+    def detach(self):
+        """
+        Copy a memoryview payload out of the RX frame so the frame can be freed.
+        Pooled packets copy into their own `buf` instead of a new bytes object.
+        """
+        if isinstance(self.payload, memoryview):
+            n = len(self.payload)
+            if self.buf is not None and len(self.buf) >= n:
+                self.buf[:n] = self.payload
+                self.payload = memoryview(self.buf)[:n]
+            else:
+                self.payload = bytes(self.payload)
+        return self
+
+    @classmethod
+    def split_aggregate(cls, payload):
+        """
+        Yield the inner frames of a TYPE_AGGREGATE payload as memoryviews.
+        Layout: [len][frame][len][frame]... ; stops at a truncated record.
+        """
+        mv = memoryview(payload)
+        ptr = 0
+        n = len(mv)
+        while ptr < n:
+            length = mv[ptr]
+            ptr += 1
+            if length == 0 or ptr + length > n:
+                return
+            yield mv[ptr:ptr + length]
+            ptr += length
+
+
+class FrameAggregator:
+    """
+    Collects complete frames for one peer and packs them into a single
+    TYPE_AGGREGATE radio packet (<= MAX_FRAME bytes), so ACKs, short chunks
+    and retransmissions share one preamble + LoRa header.
+
+    A lone frame is sent as-is, without the container's 7-byte overhead.
+    Both buffers are preallocated; add()/finish() do not allocate.
+    """
+    __slots__ = ('from_addr', 'to_addr', 'count', 'frame', 'length', 'single', 'single_len')
+
+    # Room for [len][frame] records between the container header and CRC
+    CAPACITY = PacketV13.MAX_FRAME - PacketV13.HEADER_SIZE - PacketV13.FOOTER_SIZE
+
+    def __init__(self, from_addr):
+        self.from_addr = from_addr
+        self.frame = bytearray(PacketV13.MAX_FRAME)   # Container being built
+        self.single = bytearray(PacketV13.MAX_FRAME)  # First frame, until a second arrives
+        self.reset()
+
+    def reset(self):
+        self.to_addr = 0
+        self.count = 0
+        self.length = PacketV13.HEADER_SIZE
+        self.single_len = 0
+
+    def _append(self, data, length):
+        start = self.length + 1
+        self.frame[self.length] = length
+        self.frame[start:start + length] = memoryview(data)[:length]
+        self.length = start + length
+
+    def add(self, data, length, to_addr):
+        """
+        Queue one encoded frame. Returns False (and queues nothing) when it
+        does not fit or is for a different peer: finish() and send, then retry.
+        """
+        if self.count == 0:
+            self.to_addr = to_addr
+            self.single[:length] = memoryview(data)[:length]
+            self.single_len = length
+            self.count = 1
+            return True
+        used = self.length - PacketV13.HEADER_SIZE
+        if self.count == 1:
+            used += 1 + self.single_len
+        if to_addr != self.to_addr or used + 1 + length > self.CAPACITY:
+            return False
+        if self.count == 1:
+            self._append(self.single, self.single_len)
+        self._append(data, length)
+        self.count += 1
+        return True
+
+    def finish(self):
+        """
+        Close the current packet and return (buf, length) ready for
+        sx.send(buf, length); the aggregator is empty afterwards.
+        The buffer stays valid until the next add().
+        """
+        if self.count == 1:
+            buf, length = self.single, self.single_len
+        else:
+            end = self.length
+            struct.pack_into(PacketV13.HEADER_FMT, self.frame, 0,
+                             self.to_addr, self.from_addr, 0, PacketV13.TYPE_AGGREGATE)
+            struct.pack_into('>H', self.frame, end, crc16(memoryview(self.frame)[:end]))
+            buf, length = self.frame, end + PacketV13.FOOTER_SIZE
+        self.reset()
+        return buf, length
+
+class TxRing:
+    """
+    Transmit window indexed by seq: the packet for seq s lives in slot s & mask.
+    The slot count must be a power of two dividing every seq space (256, 65536),
+    so `mod` can grow without moving a slot.
+    """
+    __slots__ = ('mask', 'mod', 'base', 'next', 'unacked', 'pkts', 'acked', 'sent', 'tries', 'tags')
+
+    def __init__(self, size, mod=256):
+        self.mask = size - 1
+        self.mod = mod
+        self.base = 0
+        self.next = 0
+        self.unacked = 0              # Packets in flight not yet acknowledged
+        self.pkts = [None] * size
+        self.acked = bytearray(size)
+        self.sent = [0] * size        # millis() of the last transmission, 0 = due now
+        self.tries = bytearray(size)  # Transmissions so far (saturates at 255)
+        self.tags = [None] * size     # Caller's note per packet, handed back by pop()
+
+    def count(self):
+        """Packets in flight (sent or not, acknowledged or not)."""
+        return (self.next - self.base) % self.mod
+
+    def holds(self, seq):
+        return (seq - self.base) % self.mod < self.count()
+
+    def push(self, pkt, tag=None):
+        """Append a packet loaded with seq `next`; returns that seq."""
+        seq = self.next
+        i = seq & self.mask
+        self.pkts[i] = pkt
+        self.tags[i] = tag
+        self.acked[i] = 0
+        self.sent[i] = 0
+        self.tries[i] = 0
+        self.next = (seq + 1) % self.mod
+        self.unacked += 1
+        return seq
+
+    def get(self, seq):
+        """Packet for `seq` (caller checks holds())."""
+        return self.pkts[seq & self.mask]
+
+    def ack(self, seq):
+        """Mark `seq` acknowledged; True if it was in flight and not yet ACKed."""
+        i = seq & self.mask
+        if self.holds(seq) and not self.acked[i]:
+            self.acked[i] = 1
+            self.unacked -= 1
+            return True
+        return False
+
+    def is_acked(self, seq):
+        return self.acked[seq & self.mask]
+
+    def stamp(self, seq, now):
+        """Record one transmission of `seq` at millis() `now`."""
+        i = seq & self.mask
+        self.sent[i] = now
+        if self.tries[i] < 255:
+            self.tries[i] += 1
+
+    def pop(self):
+        """
+        Slide past the front packet once it is acknowledged.
+        Returns (pkt, tries, tag), or None while the front is unacked or the
+        window is empty.
+        """
+        if self.base == self.next:
+            return None
+        i = self.base & self.mask
+        if not self.acked[i]:
+            return None
+        pkt = self.pkts[i]
+        tag = self.tags[i]
+        self.pkts[i] = None
+        self.tags[i] = None
+        self.base = (self.base + 1) % self.mod
+        return pkt, self.tries[i], tag
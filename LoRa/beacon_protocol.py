@@ -2,10 +2,16 @@ import struct
 
 # --- CONSTANTS ---
 TYPE_BEACON     = 0x10
+TYPE_BEACON_V2  = 0x11  # Compact beacon (node set + offset-into-frame time)
 TYPE_JOIN_REQ   = 0x20
+TYPE_JOIN_REQ_V2 = 0x21 # Join with fixed-point position (same 12 bytes as the legacy join)
 TYPE_DATA_REQ   = 0x30 
 TYPE_CONTROL    = 0x40 
+TYPE_CONTROL_V2 = 0x41  # Heartbeat with compact (delta / unchanged) position
+TYPE_CONTROL_V3 = 0x42  # Compact heartbeat + last completed broadcast transfer
 TYPE_HUB_SCHED  = 0x50
+TYPE_HUB_SCHED_V2 = 0x51 # Node set + packed 4-bit lanes
+TYPE_FOUNTAIN   = 0x60  # Hub broadcast: one LT-coded symbol (see fountain.py)
 TYPE_ACK        = 0x01
 TYPE_MSG_CHUNK  = 0x02
 TYPE_MSG_END    = 0x06
@@ -13,152 +19,425 @@ TYPE_FILE_START = 0x03
 TYPE_FILE_CHUNK = 0x04
 TYPE_FILE_END   = 0x05
 
-# --- CRC Helper ---
-def crc16(data: bytes) -> int:
-    crc = 0xFFFF
-    for byte in data:
-        crc ^= (byte << 8)
-        for _ in range(8):
-            if crc & 0x8000: crc = (crc << 1) ^ 0x1021
-            else: crc <<= 1
-        crc &= 0xFFFF
-    return crc
+FRAME_MS = 60000  # TDMA frame length; beacon v2 timestamps are frame-relative
+
+from packet_schema import Layout, SchemaPacket, register_tail, nodeset_len, pack_nodeset, unpack_nodeset
+
+# --- COMPACT GPS POSITION FIELD ---
+# One header byte: [mode (2 bits) | ref_id (6 bits)], then
+#   GPS_ABS   : lat, lon as int32 in 1e-7 degrees (re-anchors the reference)
+#   GPS_SAME  : nothing, position == reference
+#   GPS_DELTA : lat, lon offsets from the reference in 1e-5 degree steps (~1.1 m),
+#               int8 each when they fit (wire mode 2), else int16 (wire mode 3)
+# The ref_id ties deltas to the absolute fix they are relative to, so a hub
+# that missed that fix drops them instead of decoding a wrong position.
+# A join request carries a bare absolute fix, which is reference GPS_JOIN_REF.
+GPS_ABS   = 0
+GPS_SAME  = 1
+GPS_DELTA = 2
+_GPS_DELTA16 = 3
+GPS_FP_SCALE = 10000000  # 1e-7 degree units
+GPS_DELTA_UNIT = 100     # 1e-5 degree in fixed-point units
+GPS_REANCHOR_EVERY = 10  # Heartbeats between absolute fixes (recovers a lost anchor)
+GPS_JOIN_REF = 0         # ref_id of a join's fix; heartbeat anchors use 1..63
+
+def _gps_mode(pos):
+    mode, _, a, b = pos
+    if mode == GPS_DELTA and not (-128 <= a <= 127 and -128 <= b <= 127):
+        return _GPS_DELTA16
+    return mode
+
+_GPS_LEN = (9, 1, 3, 5)
+_GPS_FMT = ('>ii', None, '>bb', '>hh')
+
+def _gps_len(pos):
+    return _GPS_LEN[_gps_mode(pos)]
+
+def _pack_gps(buf, ptr, pos):
+    mode = _gps_mode(pos)
+    buf[ptr] = (mode << 6) | (pos[1] & 0x3F)
+    if _GPS_FMT[mode]:
+        struct.pack_into(_GPS_FMT[mode], buf, ptr + 1, pos[2], pos[3])
+    return ptr + _GPS_LEN[mode]
+
+def _unpack_gps(data, ptr, end, count, view):
+    if ptr >= end: return None
+    mode, ref_id = data[ptr] >> 6, data[ptr] & 0x3F
+    if ptr + _GPS_LEN[mode] > end: return None
+    if not _GPS_FMT[mode]: return (mode, ref_id, 0, 0)
+    a, b = struct.unpack_from(_GPS_FMT[mode], data, ptr + 1)
+    return (GPS_DELTA if mode == _GPS_DELTA16 else mode, ref_id, a, b)
+
+register_tail('gps', _gps_len, _pack_gps, _unpack_gps)
+
+# --- COMPACT LANE SCHEDULE ---
+# Node set of the scheduled addresses (sorted), then their lanes as 4-bit
+# values in the same order, two per byte (high nibble first).
+# Value is a dict {addr: lane}, so lookups on the client are O(1).
+def _lanes_len(lanes):
+    return nodeset_len(lanes) + (len(lanes) + 1) // 2
+
+def _pack_lanes(buf, ptr, lanes):
+    addrs = sorted(lanes)
+    ptr = pack_nodeset(buf, ptr, addrs)
+    for i in range(0, len(addrs), 2):
+        hi = lanes[addrs[i]] & 0x0F
+        lo = (lanes[addrs[i + 1]] & 0x0F) if i + 1 < len(addrs) else 0
+        buf[ptr] = (hi << 4) | lo
+        ptr += 1
+    return ptr
+
+def _unpack_lanes(data, ptr, end, count, view):
+    addrs = unpack_nodeset(data, ptr, end, count, view)
+    if addrs is None: return None
+    ptr += nodeset_len(addrs)
+    if ptr + (len(addrs) + 1) // 2 > end: return None
+    lanes = {}
+    for i, addr in enumerate(addrs):
+        b = data[ptr + (i >> 1)]
+        lanes[addr] = (b & 0x0F) if i & 1 else (b >> 4)
+    return lanes
+
+register_tail('lanes', _lanes_len, _pack_lanes, _unpack_lanes)
+
+def to_fixed(deg):
+    return int(round(deg * GPS_FP_SCALE))
+
+def from_fixed(fp):
+    return fp / GPS_FP_SCALE
+
+class PositionEncoder:
+    """
+    Node side. Picks the shortest position field against the last absolute
+    fix sent (the reference): unchanged, small delta, or a new absolute fix
+    when the delta no longer fits in int16 or every GPS_REANCHOR_EVERY calls.
+    Deltas are never confirmed: call reanchor() when the hub may have lost
+    the reference (a new hub, or its beacon no longer lists this node).
+    """
+    __slots__ = ('ref_id', 'ref_lat', 'ref_lon', 'since_anchor')
+
+    def __init__(self):
+        self.ref_id = 0
+        self.ref_lat = None
+        self.ref_lon = None
+        self.since_anchor = 0
+
+    def absolute(self, lat, lon):
+        """New reference, sent in a heartbeat."""
+        self.ref_id = self.ref_id % 0x3F + 1
+        self.ref_lat, self.ref_lon = to_fixed(lat), to_fixed(lon)
+        self.since_anchor = 0
+        return (GPS_ABS, self.ref_id, self.ref_lat, self.ref_lon)
+
+    def join(self, lat, lon):
+        """New reference GPS_JOIN_REF, sent in a join request."""
+        pos = self.absolute(lat, lon)
+        self.ref_id = GPS_JOIN_REF
+        return (GPS_ABS, GPS_JOIN_REF, pos[2], pos[3])
+
+    def reanchor(self):
+        """Make the next encode() an absolute fix."""
+        self.ref_lat = None
+
+    def encode(self, lat, lon):
+        if self.ref_lat is None or self.since_anchor >= GPS_REANCHOR_EVERY:
+            return self.absolute(lat, lon)
+        dlat = (to_fixed(lat) - self.ref_lat + GPS_DELTA_UNIT // 2) // GPS_DELTA_UNIT
+        dlon = (to_fixed(lon) - self.ref_lon + GPS_DELTA_UNIT // 2) // GPS_DELTA_UNIT
+        if not (-32768 <= dlat <= 32767 and -32768 <= dlon <= 32767):
+            return self.absolute(lat, lon)
+        self.since_anchor += 1
+        if dlat == 0 and dlon == 0:
+            return (GPS_SAME, self.ref_id, 0, 0)
+        return (GPS_DELTA, self.ref_id, dlat, dlon)
+
+class PositionDecoder:
+    """Hub side. Keeps each node's reference fix and resolves position fields."""
+    __slots__ = ('refs',)
+
+    def __init__(self):
+        self.refs = {}  # addr -> (ref_id, lat_fp, lon_fp)
+
+    def decode(self, addr, pos):
+        """Returns (lat, lon) in degrees, or None if the reference is unknown."""
+        mode, ref_id, a, b = pos
+        if mode == GPS_ABS:
+            self.refs[addr] = (ref_id, a, b)
+            return from_fixed(a), from_fixed(b)
+        ref = self.refs.get(addr)
+        if ref is None or ref[0] != ref_id:
+            return None
+        if mode == GPS_SAME:
+            return from_fixed(ref[1]), from_fixed(ref[2])
+        return from_fixed(ref[1] + a * GPS_DELTA_UNIT), from_fixed(ref[2] + b * GPS_DELTA_UNIT)
+
+# --- SCHEMA TABLE ---
+# One row per packet type, compiled once into precompiled structs + pack/unpack
+# routines (see packet_schema.Layout). Columns:
+#   type byte (None = pkt_type is a field) | struct codes after it | attribute
+#   names | variable tail (kind, attr) | CRC16 | destination field
+SCHEMA = {
+    'BeaconPacket':   (TYPE_BEACON,    'BQQBB', ('hub_id', 'net_time', 'frame_start', 'term'),
+                       ('list', 'active_nodes'), False, None),
+    'CompactBeaconPacket': (TYPE_BEACON_V2, 'BIHB', ('hub_id', 'frame_no', 'frame_offset', 'term'),
+                       ('nodeset', 'active_nodes'), False, None),
+    'ControlPacket':  (TYPE_CONTROL,   'Bff',   ('src', 'lat', 'lon'), None, True, None),
+    'DataPacket':     (None,           'BBBB',  ('pkt_type', 'to_addr', 'from_addr', 'seq_num'),
+                       ('bytes', 'payload'), True, 'to_addr'),
+    'JoinReqPacket':  (TYPE_JOIN_REQ,  'Bff',   ('node_addr', 'lat', 'lon'), None, True, None),
+    'HubSchedPacket': (TYPE_HUB_SCHED, 'B',     (), ('pairs', 'assignments'), False, None),
+    'CompactHubSchedPacket': (TYPE_HUB_SCHED_V2, '', (), ('lanes', 'lanes'), False, None),
+    'CompactControlPacket': (TYPE_CONTROL_V2, 'B', ('src',), ('gps', 'pos'), True, None),
+    'CompactJoinReqPacket': (TYPE_JOIN_REQ_V2, 'Bii', ('node_addr', 'lat_fp', 'lon_fp'), None, True, None),
+    'BcastControlPacket': (TYPE_CONTROL_V3, 'BB', ('src', 'bcast_id'), ('gps', 'pos'), True, None),
+    'FountainPacket': (TYPE_FOUNTAIN, 'BIHB', ('xfer_id', 'size', 'esi', 'degree'),
+                       ('bytes', 'payload'), True, None),
+}
+
+LAYOUTS = {name: Layout(*row) for name, row in SCHEMA.items()}
 
 # --- 1. BEACON PACKET ---
-class BeaconPacket:
+class BeaconPacket(SchemaPacket):
     """
     [0] Type (0x10) | [1] Hub_ID 
     [2-9] Net_Time (8B) | [10-17] Frame_Start (8B)
     [18] Term_Remaining | [19] Node_Count | [20...] Active Nodes
     """
-    def __init__(self, hub_id, net_time, frame_start, term, active_nodes=None):
+    LAYOUT = LAYOUTS['BeaconPacket']
+    __slots__ = ('hub_id', 'net_time', 'frame_start', 'term', 'active_nodes')
+
+    def __init__(self, hub_id=0, net_time=0, frame_start=0, term=0, active_nodes=None):
         self.hub_id = hub_id
         self.net_time = net_time
         self.frame_start = frame_start
         self.term = term
         self.active_nodes = active_nodes if active_nodes else [] 
 
-    def to_bytes(self):
-        count = len(self.active_nodes)
-        # >BBQQBB = 1 byte, 1 byte, 8 bytes, 8 bytes, 1 byte, 1 byte
-        header = struct.pack('>BBQQBB', TYPE_BEACON, self.hub_id, self.net_time, self.frame_start, self.term, count)
-        payload = bytearray(self.active_nodes) 
-        return header + payload
+# --- 1b. COMPACT BEACON (v2) ---
+class CompactBeaconPacket(SchemaPacket):
+    """
+    [0] Type (0x11) | [1] Hub_ID
+    [2-5] Frame_No (net_time // FRAME_MS) | [6-7] Frame_Offset (ms into frame)
+    [8] Term_Remaining | [9] Node set: count + sorted addrs, or 0xFF + 32B bitmap
+    At most 42 bytes, against 20 + one byte per node for BeaconPacket.
+    """
+    LAYOUT = LAYOUTS['CompactBeaconPacket']
+    __slots__ = ('hub_id', 'frame_no', 'frame_offset', 'term', 'active_nodes')
+
+    def __init__(self, hub_id=0, net_time=0, term=0, active_nodes=None):
+        self.hub_id = hub_id
+        self.term = term
+        self.active_nodes = active_nodes if active_nodes else []
+        self.set_time(net_time)
 
-    @classmethod
-    def from_bytes(cls, data):
-        if len(data) < 20 or data[0] != TYPE_BEACON: return None
-        try:
-            _, hid, ntime, fstart, term, count = struct.unpack('>BBQQBB', data[:20])
-            active_nodes = list(data[20:20+count])
-            return cls(hid, ntime, fstart, term, active_nodes)
-        except: return None
+    def set_time(self, net_time):
+        self.frame_no = net_time // FRAME_MS
+        self.frame_offset = net_time % FRAME_MS
+
+    # Same view of time as BeaconPacket, so receivers handle both alike
+    @property
+    def frame_start(self):
+        return self.frame_no * FRAME_MS
+
+    @property
+    def net_time(self):
+        return self.frame_no * FRAME_MS + self.frame_offset
+
+def decode_beacon(data):
+    """Decode either beacon format (v1 BeaconPacket or v2 CompactBeaconPacket)."""
+    if not data: return None
+    if data[0] == TYPE_BEACON_V2: return CompactBeaconPacket.from_bytes(data)
+    return BeaconPacket.from_bytes(data)
 
 # --- 2. CONTROL PACKET (Now with GPS) ---
-class ControlPacket:
+class ControlPacket(SchemaPacket):
     """
     Sent during Phase 2 Control Window.
     Header: [Type, Src] (2B) + [Lat, Lon] (8B) + CRC (2B)
     """
-    def __init__(self, src, lat=0.0, lon=0.0):
+    LAYOUT = LAYOUTS['ControlPacket']
+    __slots__ = ('src', 'lat', 'lon')
+
+    def __init__(self, src=0, lat=0.0, lon=0.0):
         self.src = src
         self.lat = float(lat)
         self.lon = float(lon)
 
-    def to_bytes(self):
-        # >BBff = Type (1B), Src (1B), Lat (4B Float), Lon (4B Float)
-        pkt = struct.pack('>BBff', TYPE_CONTROL, self.src, self.lat, self.lon)
-        return pkt + struct.pack('>H', crc16(pkt))
-
-    @classmethod
-    def from_bytes(cls, data):
-        if len(data) < 12 or data[0] != TYPE_CONTROL: return None
-        payload = data[:-2]
-        if crc16(payload) != struct.unpack('>H', data[-2:])[0]: return None
-        _, src, lat, lon = struct.unpack('>BBff', payload)
-        return cls(src, lat, lon)
-
 # --- 3. DATA PACKET ---
-class DataPacket:
+class DataPacket(SchemaPacket):
     """
     Used for File Chunks, Text, ACKs.
     Header: [Type, To, From, Seq] (4B) + Payload + CRC(2B)
     """
-    HEADER_FMT = '>BBBB'
+    LAYOUT = LAYOUTS['DataPacket']
     HEADER_SIZE = 4
     FOOTER_SIZE = 2
+    MAX_FRAME = 255
+
+    __slots__ = ('to_addr', 'from_addr', 'seq_num', 'pkt_type', 'payload', 'buf')
 
-    def __init__(self, to_addr, from_addr, seq_num, pkt_type, payload=b''):
+    def __init__(self, to_addr=0, from_addr=0, seq_num=0, pkt_type=0, payload=b''):
         self.to_addr = to_addr
         self.from_addr = from_addr
         self.seq_num = seq_num
         self.pkt_type = pkt_type
         self.payload = payload
+        self.buf = None
 
-    def to_bytes(self):
-        header = struct.pack(self.HEADER_FMT, self.pkt_type, self.to_addr, self.from_addr, self.seq_num)
-        pkt = header + self.payload
-        checksum = crc16(pkt)
-        return pkt + struct.pack('>H', checksum)
+    @classmethod
+    def peek(cls, data):
+        """(to_addr, pkt_type) from the header, no CRC check. None if too short."""
+        if len(data) < cls.LAYOUT.min_len: return None
+        return data[1], data[0]
 
     @classmethod
-    def from_bytes(cls, data):
-        if len(data) < (cls.HEADER_SIZE + cls.FOOTER_SIZE): return None
-        payload_part = data[:-cls.FOOTER_SIZE]
-        received_crc = struct.unpack('>H', data[-cls.FOOTER_SIZE:])[0]
-        if crc16(payload_part) != received_crc: return None
-        
-        h = struct.unpack(cls.HEADER_FMT, payload_part[:cls.HEADER_SIZE])
-        return cls(h[1], h[2], h[3], h[0], payload_part[cls.HEADER_SIZE:])    
+    def from_view(cls, data, my_addr=None, out=None):
+        """
+        Zero-copy decode. Frames for another node are rejected before the CRC
+        is computed; `payload` is a memoryview into `data` (see `detach()`).
+        `out` (e.g. a pooled packet) is filled in instead of allocating.
+        """
+        return cls.LAYOUT.unpack(cls, data, out, True, my_addr)
+
+    def detach(self):
+        """Copy a memoryview payload (into `buf` if pooled) before keeping the packet."""
+        if isinstance(self.payload, memoryview):
+            n = len(self.payload)
+            if self.buf is not None and len(self.buf) >= n:
+                self.buf[:n] = self.payload
+                self.payload = memoryview(self.buf)[:n]
+            else: self.payload = bytes(self.payload)
+        return self
 
 # --- 4. JOIN REQ PACKET (Now with GPS) ---
-class JoinReqPacket:
+class JoinReqPacket(SchemaPacket):
     """
     Stranger asking to join the network.
     Header: [Type, Addr] (2B) + [Lat, Lon] (8B) + CRC (2B)
     """
-    def __init__(self, node_addr, lat=0.0, lon=0.0):
+    LAYOUT = LAYOUTS['JoinReqPacket']
+    __slots__ = ('node_addr', 'lat', 'lon')
+
+    def __init__(self, node_addr=0, lat=0.0, lon=0.0):
         self.node_addr = node_addr
         self.lat = float(lat)
         self.lon = float(lon)
 
-    def to_bytes(self):
-        pkt = struct.pack('>BBff', TYPE_JOIN_REQ, self.node_addr, self.lat, self.lon)
-        return pkt + struct.pack('>H', crc16(pkt))
-
-    @classmethod
-    def from_bytes(cls, data):
-        if len(data) < 12 or data[0] != TYPE_JOIN_REQ: return None
-        payload = data[:-2]
-        if crc16(payload) != struct.unpack('>H', data[-2:])[0]: return None
-        _, addr, lat, lon = struct.unpack('>BBff', payload)
-        return cls(addr, lat, lon)
-
 # --- 5. HUB SCHEDULING (DATA_REQ_REP) ---
-class HubSchedPacket:
+class HubSchedPacket(SchemaPacket):
     """
     Hub granting bandwidth/frequency pairs to nodes.
     [0] Type (0x50) | [1] Count | [2...] Assignments (Addr, Pair)
     """
+    LAYOUT = LAYOUTS['HubSchedPacket']
+    __slots__ = ('assignments',)
+
     def __init__(self, assignments=None):
         self.assignments = assignments if assignments else []
 
-    def to_bytes(self):
-        count = len(self.assignments)
-        payload = struct.pack('>BB', TYPE_HUB_SCHED, count)
-        for asm in self.assignments:
-            payload += struct.pack('>BB', asm[0], asm[1])
-        return payload
+    def lane_for(self, addr):
+        """Lane assigned to `addr`, 0 if none (linear scan of the legacy list)."""
+        for a, lane in self.assignments:
+            if a == addr: return lane
+        return 0
+
+# --- 5b. COMPACT HUB SCHEDULING (v2) ---
+class CompactHubSchedPacket(SchemaPacket):
+    """
+    [0] Type (0x51) | [1...] Node set of scheduled addrs | Lanes, 4 bits each
+    1.5 bytes per assignment (or 33B + 0.5B each once the set is a bitmap),
+    against 2 bytes each in HubSchedPacket.
+    """
+    LAYOUT = LAYOUTS['CompactHubSchedPacket']
+    __slots__ = ('lanes',)
+
+    def __init__(self, assignments=None):
+        self.lanes = dict(assignments) if assignments else {}
+
+    @property
+    def assignments(self):
+        return sorted(self.lanes.items())
+
+    def lane_for(self, addr):
+        """Lane assigned to `addr`, 0 if none. O(1) dict lookup."""
+        return self.lanes.get(addr, 0)
+
+def decode_sched(data):
+    """Decode either schedule format (v1 HubSchedPacket or v2 CompactHubSchedPacket)."""
+    if not data: return None
+    if data[0] == TYPE_HUB_SCHED_V2: return CompactHubSchedPacket.from_bytes(data)
+    return HubSchedPacket.from_bytes(data)
+
+# --- 6. COMPACT CONTROL / JOIN (fixed-point + delta GPS) ---
+class CompactControlPacket(SchemaPacket):
+    """
+    Heartbeat with a compact position (see PositionEncoder).
+    [0] Type (0x41) | [1] Src | [2...] Position field (1-9B) | CRC (2B)
+    5 bytes when the node has not moved, 7 for a small move, against 12.
+    """
+    LAYOUT = LAYOUTS['CompactControlPacket']
+    __slots__ = ('src', 'pos')
+
+    def __init__(self, src=0, pos=(GPS_SAME, 0, 0, 0)):
+        self.src = src
+        self.pos = pos
+
+class CompactJoinReqPacket(SchemaPacket):
+    """
+    Join request carrying an absolute fixed-point fix, which also becomes the
+    hub's reference GPS_JOIN_REF for this node's later deltas.
+    [0] Type (0x21) | [1] Addr | [2-5] Lat | [6-9] Lon (int32, 1e-7 deg) | CRC (2B)
+    Always absolute, so no position header: 12 bytes, like JoinReqPacket.
+    """
+    LAYOUT = LAYOUTS['CompactJoinReqPacket']
+    __slots__ = ('node_addr', 'lat_fp', 'lon_fp')
+
+    def __init__(self, node_addr=0, pos=(GPS_ABS, GPS_JOIN_REF, 0, 0)):
+        self.node_addr = node_addr
+        self.pos = pos
+
+    # Position field view, as the compact heartbeats carry it
+    @property
+    def pos(self):
+        return (GPS_ABS, GPS_JOIN_REF, self.lat_fp, self.lon_fp)
+
+    @pos.setter
+    def pos(self, pos):
+        self.lat_fp, self.lon_fp = pos[2], pos[3]
+
+# --- 7. BROADCAST TRANSFER (fountain-coded, hub -> all nodes) ---
+class BcastControlPacket(SchemaPacket):
+    """
+    Compact heartbeat that also reports the last broadcast transfer this node
+    fully decoded, so the hub knows when every node is done.
+    [0] Type (0x42) | [1] Src | [2] Bcast_ID | [3...] Position field | CRC (2B)
+    """
+    LAYOUT = LAYOUTS['BcastControlPacket']
+    __slots__ = ('src', 'bcast_id', 'pos')
+
+    def __init__(self, src=0, bcast_id=0, pos=(GPS_SAME, 0, 0, 0)):
+        self.src = src
+        self.bcast_id = bcast_id
+        self.pos = pos
+
+class FountainPacket(SchemaPacket):
+    """
+    One LT symbol of a broadcast transfer (see fountain.py).
+    [0] Type (0x60) | [1] Xfer_ID | [2-5] Size of the blob | [6-7] ESI
+    [8] Degree | [9...] Symbol (fixed size per transfer) | CRC (2B)
+    Source block count is derived from size and symbol length.
+    """
+    LAYOUT = LAYOUTS['FountainPacket']
+    __slots__ = ('xfer_id', 'size', 'esi', 'degree', 'payload')
+
+    def __init__(self, xfer_id=0, size=0, esi=0, degree=1, payload=b''):
+        self.xfer_id = xfer_id
+        self.size = size
+        self.esi = esi
+        self.degree = degree
+        self.payload = payload
 
     @classmethod
-    def from_bytes(cls, data):
-        if len(data) < 2 or data[0] != TYPE_HUB_SCHED: return None
-        count = data[1]
-        assignments = []
-        ptr = 2
-        for _ in range(count):
-            if ptr + 2 > len(data): break
-            addr, pair = struct.unpack('>BB', data[ptr:ptr+2])
-            assignments.append((addr, pair))
-            ptr += 2
-        return cls(assignments)
+    def from_view(cls, data, out=None):
+        """Zero-copy decode; `payload` is a memoryview into `data`."""
+        return cls.LAYOUT.unpack(cls, data, out, True)
@@ -0,0 +1,105 @@
+# block_writer.py
+# Write-behind buffer that turns chunk-sized file writes into block writes.
+#
+# Received file chunks are ~200 bytes; writing each one costs a flash
+# program (and on FAT a read-modify-write of the whole sector) per chunk.
+# BlockWriter gathers them into `size`-byte buffers aligned on file offsets
+# and writes a buffer out in one go once it is full. Chunks may come at any
+# offset, in any order: a handful of buffers (`count`) are kept, each with
+# the extents filled so far, and the least recently used one is written out
+# (extent by extent) when a chunk needs a block that is not buffered.
+
+class BlockWriter:
+    """
+    - write(data, offset=None): `data` at `offset` (None: right after the
+      previous write, for sequential streams)
+    - seek(offset): the next write(data) without an offset goes there
+    - flush(end=None): write buffered data below `end` (all by default)
+      to the file and flush the file
+    - close(): flush() and close the file
+    - writes: file write() calls so far, bytes: bytes written through us
+    """
+    __slots__ = ('f', 'size', 'bufs', 'bases', 'extents', 'used', 'tick', 'pos', 'writes', 'bytes')
+
+    def __init__(self, f, size=4096, count=2):
+        self.f = f
+        self.size = size
+        self.bufs = [bytearray(size) for _ in range(count)]
+        self.bases = [None] * count      # File offset of each buffer, None = free
+        self.extents = [[] for _ in range(count)]  # Filled [start, end) per buffer, sorted
+        self.used = [0] * count          # LRU stamp
+        self.tick = 0
+        self.pos = 0
+        self.writes = 0
+        self.bytes = 0
+
+    def write(self, data, offset=None):
+        if offset is None:
+            offset = self.pos
+        mv = memoryview(data)
+        self.pos = offset + len(mv)
+        self.bytes += len(mv)
+        size = self.size
+        while mv:
+            base = offset - offset % size
+            i = self._slot(base)
+            start = offset - base
+            n = min(len(mv), size - start)
+            self.bufs[i][start:start + n] = mv[:n]
+            ext = self._fill(i, start, start + n)
+            if ext[0] == (0, size):
+                self._write_out(i)  # Whole block: one write
+            offset += n
+            mv = mv[n:]
+
+    def seek(self, offset):
+        self.pos = offset
+
+    def _slot(self, base):
+        self.tick += 1
+        bases = self.bases
+        if base in bases:
+            i = bases.index(base)
+        elif None in bases:
+            i = bases.index(None)
+        else:
+            i = self.used.index(min(self.used))
+            self._write_out(i)
+        bases[i] = base
+        self.used[i] = self.tick
+        return i
+
+    def _fill(self, i, start, end):
+        """Add [start, end) to buffer i's extents, merging neighbours."""
+        out = []
+        for a, b in self.extents[i]:
+            if b < start or a > end:
+                out.append((a, b))
+            else:
+                start, end = min(a, start), max(b, end)
+        out.append((start, end))
+        out.sort()
+        self.extents[i] = out
+        return out
+
+    def _write_out(self, i):
+        base = self.bases[i]
+        buf = memoryview(self.bufs[i])
+        f = self.f
+        for a, b in self.extents[i]:
+            f.seek(base + a)
+            f.write(buf[a:b])
+            self.writes += 1
+        self.bases[i] = None
+        self.extents[i] = []
+        self.used[i] = 0
+
+    def flush(self, end=None):
+        for i in range(len(self.bases)):
+            if self.bases[i] is not None and (end is None or self.bases[i] < end):
+                self._write_out(i)
+        self.f.flush()
+
+    def close(self):
+        self.flush()
+        self.f.close()
@@ -0,0 +1,94 @@
+# chunk_bitmap.py
+# Persisted map of the parts of an incoming file that are safely on flash.
+#
+# The file is split into BLOCK-byte blocks, doubled until there are at most
+# 65535 so block numbers fit the 16-bit ranges of a resume reply. Data comes
+# in sequential runs (from the start, or from a seek); a block is marked once
+# one run has covered all of it, the last block of the file may be short.
+# Saved as [transfer ID 4B][size 4B][block 2B][bitmap]. The owner flushes the
+# file before every save(), so a set bit never stands for bytes still in a
+# write buffer.
+
+class ChunkBitmap:
+    """
+    - seek(offset): a new sequential run starts at `offset`
+    - wrote(n): the next `n` bytes of the run are written
+    - ranges(limit): up to `limit` (first block, count) runs of complete blocks
+    - save() / load(path, xid, size): persist / restore (None if missing or
+      saved for another transfer)
+    """
+    __slots__ = ('path', 'xid', 'size', 'block', 'bits', 'start', 'pos', 'unsaved')
+
+    BLOCK = 512
+
+    def __init__(self, path, xid, size, block=0):
+        self.path = path
+        self.xid = xid
+        self.size = size
+        if not block:
+            block = self.BLOCK
+            while (size + block - 1) // block > 0xFFFF:
+                block *= 2
+        self.block = block
+        self.bits = bytearray((self.blocks() + 7) // 8)
+        self.start = 0
+        self.pos = 0
+        self.unsaved = 0   # Bytes written since the last save()
+
+    def blocks(self):
+        return (self.size + self.block - 1) // self.block
+
+    def seek(self, offset):
+        self.start = self.pos = offset
+
+    def wrote(self, n):
+        b = self.block
+        # First block that starts inside this run and was not complete before
+        first = max((self.start + b - 1) // b, self.pos // b)
+        self.pos += n
+        self.unsaved += n
+        last = self.blocks() if self.pos >= self.size else self.pos // b
+        for i in range(first, last):
+            self.bits[i >> 3] |= 1 << (i & 7)
+
+    def has(self, i):
+        return self.bits[i >> 3] & (1 << (i & 7))
+
+    def ranges(self, limit):
+        out = []
+        i, n = 0, self.blocks()
+        while i < n and len(out) < limit:
+            if not self.has(i):
+                i += 1
+                continue
+            j = i
+            while j < n and self.has(j):
+                j += 1
+            out.append((i, j - i))
+            i = j
+        return out
+
+    def save(self):
+        with open(self.path, 'wb') as f:
+            f.write(self.xid.to_bytes(4, 'big'))
+            f.write(self.size.to_bytes(4, 'big'))
+            f.write(self.block.to_bytes(2, 'big'))
+            f.write(self.bits)
+        self.unsaved = 0
+
+    @classmethod
+    def load(cls, path, xid, size):
+        try:
+            with open(path, 'rb') as f:
+                head = f.read(10)
+                bits = f.read()
+        except OSError:
+            return None
+        if (len(head) < 10 or int.from_bytes(head[:4], 'big') != xid
+                or int.from_bytes(head[4:8], 'big') != size):
+            return None
+        bm = cls(path, xid, size, int.from_bytes(head[8:10], 'big'))
+        if len(bits) != len(bm.bits):
+            return None
+        bm.bits = bytearray(bits)
+        return bm
@@ -0,0 +1,64 @@
+# chunk_sizer.py
+# Picks the message/file chunk size that maximises expected goodput for the
+# current modulation and the loss rate seen on the link.
+#
+# For a payload of p bytes in a frame of L = p + overhead bytes:
+#   airtime(L)  from the radio's getTimeOnAir() (SF/BW/CR/preamble aware)
+#   success(L)  = (1 - byte_loss) ** L, where byte_loss is derived from the
+#                 smoothed frame loss rate at the frame lengths actually sent
+#   goodput(p)  = p * success(L) / (airtime(L) + gap_ms)
+# Clean links therefore get the largest chunk; lossy ones shrink it until the
+# extra headers cost less than the retransmissions they save.
+
+class ChunkSizer:
+    """
+    - size(): current best payload size (recomputed lazily after samples)
+    - sample(length, lost): feed one transmitted frame; `lost` is True for a
+      retransmission (the earlier copy of that frame was lost)
+    - retune(): rebuild the airtime table after an SF/BW/CR change
+    """
+    __slots__ = ('toa_us', 'overhead', 'gap_ms', 'sizes', 'airtime', 'loss', 'mean_len',
+                 'best', 'dirty')
+
+    ALPHA = 1 / 16     # EWMA weight of one frame sample
+    STEP = 8           # Granularity of the candidate sizes
+
+    def __init__(self, toa_us, min_size, max_size, overhead, gap_ms=30):
+        self.toa_us = toa_us          # Radio's getTimeOnAir(len) -> microseconds
+        self.overhead = overhead      # Header + CRC bytes around every payload
+        self.gap_ms = gap_ms          # Per-frame cost beyond airtime (LBT, turnaround)
+        self.sizes = list(range(max_size, min_size - 1, -self.STEP))
+        self.loss = 0.0               # Smoothed frame loss rate
+        self.mean_len = max_size + overhead
+        self.best = max_size
+        self.dirty = False
+        self.retune()
+
+    def retune(self):
+        self.airtime = [self.toa_us(p + self.overhead) / 1000 for p in self.sizes]
+        self.dirty = True
+
+    def sample(self, length, lost):
+        self.loss += self.ALPHA * ((1.0 if lost else 0.0) - self.loss)
+        self.mean_len += self.ALPHA * (length - self.mean_len)
+        self.dirty = True
+
+    def size(self):
+        if self.dirty:
+            self.dirty = False
+            # Per-byte survival that reproduces the observed frame loss
+            keep = (1.0 - min(self.loss, 0.95)) ** (1.0 / self.mean_len)
+            best, best_rate = self.sizes[0], -1.0
+            for p, air in zip(self.sizes, self.airtime):
+                rate = p * keep ** (p + self.overhead) / (air + self.gap_ms)
+                if rate > best_rate:
+                    best, best_rate = p, rate
+            self.best = best
+        return self.best
+
+    def goodput(self):
+        """Expected goodput (bytes/s) at the current size and loss estimate."""
+        p = self.size()
+        air = self.airtime[self.sizes.index(p)]
+        keep = (1.0 - min(self.loss, 0.95)) ** ((p + self.overhead) / self.mean_len)
+        return p * keep * 1000 / (air + self.gap_ms)
@@ -0,0 +1,61 @@
+# congestion.py
+# AIMD congestion window for the ARQ sender.
+#
+# The ARQ window (WINDOW_SIZE) only bounds the seq space; this window bounds
+# how many unacknowledged frames the sender actually puts on the air:
+#   slow start     cwnd += 1 per newly ACKed frame, up to ssthresh
+#   additive       cwnd += 1 per window of ACKed frames (a clean round)
+#   multiplicative cwnd, ssthresh = cwnd * BETA on a retransmit timeout or
+#                  a busy channel (CAD), at most once per window of ACKs so
+#                  one loss burst is one cut
+
+class CongestionWindow:
+    """
+    - size(): frames allowed in flight
+    - on_ack(n, now): n frames newly acknowledged (one ACK/SACK)
+    - on_congestion(now, reason): timeout / busy channel; True if it cut
+    - history: last HISTORY (millis, cwnd, reason) changes, oldest first
+    """
+    __slots__ = ('cwnd', 'ssthresh', 'min_w', 'max_w', 'since_cut', 'history')
+
+    BETA = 0.5
+    HISTORY = 32
+
+    def __init__(self, initial, min_w=1, max_w=256):
+        self.min_w = min_w
+        self.max_w = max_w
+        self.cwnd = float(initial)
+        self.ssthresh = float(max_w)  # No loss seen yet: slow start to the top
+        self.since_cut = initial      # The first congestion signal may cut
+        self.history = []
+
+    def size(self):
+        return int(self.cwnd)
+
+    def _log(self, now, reason):
+        self.history.append((now, int(self.cwnd), reason))
+        if len(self.history) > self.HISTORY:
+            self.history.pop(0)
+
+    def on_ack(self, n, now):
+        if n <= 0:
+            return
+        before = int(self.cwnd)
+        self.since_cut += n
+        if self.cwnd < self.ssthresh:
+            self.cwnd = min(self.cwnd + n, self.ssthresh)
+        else:
+            self.cwnd += n / self.cwnd
+        if self.cwnd > self.max_w:
+            self.cwnd = float(self.max_w)
+        if int(self.cwnd) != before:
+            self._log(now, "ack")
+
+    def on_congestion(self, now, reason):
+        if self.since_cut < self.cwnd:
+            return False  # Same loss round as the last cut
+        self.ssthresh = max(float(self.min_w), self.cwnd * self.BETA)
+        self.cwnd = self.ssthresh
+        self.since_cut = 0
+        self._log(now, reason)
+        return True
@@ -0,0 +1,35 @@
+# crc.py
+# Shared CRC16-CCITT engine (poly 0x1021, init 0xFFFF) used by every packet format.
+
+CRC16_INIT = 0xFFFF
+CRC16_POLY = 0x1021
+
+# --- 256-entry lookup table (built once at import) ---
+def _build_table():
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = (crc << 1) ^ CRC16_POLY
+            else:
+                crc <<= 1
+        table.append(crc & 0xFFFF)
+    return tuple(table)
+
+_TABLE = _build_table()
+
+def update(crc, chunk):
+    """
+    Feed `chunk` (bytes, bytearray or memoryview) into a running CRC.
+    Lets callers checksum header and payload separately, or a memoryview
+    slice of a received frame, without concatenating them first.
+    """
+    table = _TABLE
+    for byte in chunk:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
+
+def crc16(data) -> int:
+    """One-shot CRC16-CCITT of `data`."""
+    return update(CRC16_INIT, data)
@@ -0,0 +1,55 @@
+# fec.py
+# XOR parity for file transfers: rebuild a lost chunk without waiting for ARQ.
+#
+# A block of K data chunks gets P parity chunks; parity j covers the data
+# chunks j, j + P, j + 2P, ... of the block (interleaved), so any burst of up
+# to P consecutive losses is repaired. Parity payload:
+#   [first seq][count][stride][XOR of chunk lengths][XOR of chunks, zero-padded]
+# The header makes each parity self-describing: the receiver needs no K/P.
+
+HEADER_SIZE = 4
+
+def xor_into(acc, data):
+    """acc[i] ^= data[i] over len(data) bytes (acc must be at least as long)."""
+    for i in range(len(data)):
+        acc[i] ^= data[i]
+
+def encode(chunks, first_seq, stride):
+    """
+    Build one parity payload over `chunks` (payloads of the data frames with
+    seqs first_seq, first_seq + stride, ...). Chunks must be <= 255 bytes.
+    """
+    size = max(len(c) for c in chunks)
+    out = bytearray(HEADER_SIZE + size)
+    lens = 0
+    body = memoryview(out)[HEADER_SIZE:]
+    for c in chunks:
+        lens ^= len(c)
+        xor_into(body, c)
+    out[0] = first_seq & 0xFF
+    out[1] = len(chunks)
+    out[2] = stride
+    out[3] = lens
+    return out
+
+def covered(parity, seq=0, mod=256):
+    """
+    Seqs of the data chunks a parity payload protects. The header keeps only
+    the low byte of the first seq; with a 16-bit seq space (`mod` 65536) the
+    rest comes from the parity's own `seq`, which follows its chunks.
+    """
+    first, count, stride = parity[0], parity[1], parity[2]
+    first = (seq - ((seq - first) & 0xFF)) % mod
+    return [(first + k * stride) % mod for k in range(count)]
+
+def rebuild(parity, others):
+    """
+    Recover the one missing chunk from a parity payload and the payloads of
+    every other chunk it covers. Returns the chunk as bytes.
+    """
+    body = bytearray(memoryview(parity)[HEADER_SIZE:])
+    n = parity[3]
+    for c in others:
+        n ^= len(c)
+        xor_into(body, c)
+    return bytes(body[:n])
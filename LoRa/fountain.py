@@ -0,0 +1,157 @@
+# fountain.py
+# Systematic LT (fountain) code for hub -> all-nodes broadcasts.
+#
+# The source blob is cut into K blocks of `symbol_size` bytes (last one
+# zero-padded). Symbol `esi` is the XOR of `degree` source blocks:
+#   esi < K  -> degree 1, block esi (systematic: a clean link decodes from
+#               the first K symbols without any XOR work)
+#   esi >= K -> degree drawn from the robust soliton distribution, blocks
+#               picked by a PRNG seeded with (xfer_id, esi)
+# Only (xfer_id, esi, degree) travel with a symbol; the receiver rebuilds the
+# block set itself, so any K(1 + eps) symbols decode, whichever were lost.
+import math
+import random
+
+SOLITON_C = 0.1      # Robust soliton tuning: spike position / height
+SOLITON_DELTA = 0.5  # Failure bound of the robust soliton distribution
+
+def num_blocks(size, symbol_size):
+    return max(1, (size + symbol_size - 1) // symbol_size)
+
+def _xor_into(acc, data):
+    for i in range(len(data)):
+        acc[i] ^= data[i]
+
+def neighbors(xfer_id, esi, degree, k):
+    """Source block indices combined into symbol `esi` (sorted, distinct)."""
+    if esi < k:
+        return [esi]
+    degree = min(degree, k)
+    # 31-bit LCG: integer only, identical on every port
+    x = ((xfer_id << 16) ^ esi ^ 0x5DEECE6) & 0x7FFFFFFF
+    picked = set()
+    while len(picked) < degree:
+        x = (x * 1103515245 + 12345) & 0x7FFFFFFF
+        picked.add((x >> 8) % k)
+    return sorted(picked)
+
+def soliton_cdf(k):
+    """Cumulative robust soliton distribution over degrees 1..k."""
+    r = SOLITON_C * math.log(k / SOLITON_DELTA) * k ** 0.5
+    spike = max(1, min(k, int(k / r))) if r > 0 else k
+    w = [0.0] * (k + 1)
+    w[1] = 1.0 / k
+    for d in range(2, k + 1):
+        w[d] = 1.0 / (d * (d - 1))
+    for d in range(1, spike):
+        w[d] += r / (d * k)
+    if r > SOLITON_DELTA:
+        w[spike] += r * math.log(r / SOLITON_DELTA) / k
+    total = sum(w)
+    cdf = []
+    acc = 0.0
+    for d in range(1, k + 1):
+        acc += w[d] / total
+        cdf.append(acc)
+    return cdf
+
+class Encoder:
+    """
+    Hub side. next_symbol(buf) writes the next symbol into `buf` and returns
+    (esi, degree); the symbol stream never ends, the hub decides when to
+    stop (main.py: every node reported, or a symbol budget ran out).
+    """
+    __slots__ = ('xfer_id', 'data', 'size', 'symbol_size', 'k', 'cdf', 'esi')
+
+    def __init__(self, xfer_id, data, symbol_size):
+        self.xfer_id = xfer_id
+        self.data = memoryview(data)
+        self.size = len(data)
+        self.symbol_size = symbol_size
+        self.k = num_blocks(self.size, symbol_size)
+        self.cdf = soliton_cdf(self.k)
+        self.esi = 0
+
+    def _degree(self):
+        u = random.random()
+        for d, p in enumerate(self.cdf):
+            if u <= p:
+                return d + 1
+        return self.k
+
+    def next_symbol(self, buf):
+        esi = self.esi
+        self.esi = (esi + 1) & 0xFFFF
+        degree = 1 if esi < self.k else min(self._degree(), 255)
+        n = self.symbol_size
+        for i in range(n):
+            buf[i] = 0
+        for b in neighbors(self.xfer_id, esi, degree, self.k):
+            _xor_into(buf, self.data[b * n:(b + 1) * n])
+        return esi, degree
+
+class Decoder:
+    """
+    Node side. Peeling decoder: a symbol reduced to one unknown block solves
+    it, and every solved block is XOR-ed out of the symbols still waiting on
+    it. Memory is K blocks plus the symbols not yet reduced.
+    """
+    __slots__ = ('xfer_id', 'size', 'symbol_size', 'k', 'blocks', 'solved',
+                 'waiting', 'received')
+
+    def __init__(self, xfer_id, size, symbol_size):
+        self.xfer_id = xfer_id
+        self.size = size
+        self.symbol_size = symbol_size
+        self.k = num_blocks(size, symbol_size)
+        self.blocks = [None] * self.k
+        self.solved = 0
+        self.waiting = {}    # block index -> list of [unknown set, data]
+        self.received = 0
+
+    @property
+    def done(self):
+        return self.solved == self.k
+
+    def add(self, esi, degree, payload):
+        """Feed one symbol. Returns True once the blob is complete."""
+        if self.done or len(payload) != self.symbol_size:
+            return self.done
+        self.received += 1
+        data = bytearray(payload)
+        unknown = set()
+        for b in neighbors(self.xfer_id, esi, degree, self.k):
+            if self.blocks[b] is None:
+                unknown.add(b)
+            else:
+                _xor_into(data, self.blocks[b])
+        if len(unknown) > 1:
+            sym = [unknown, data]
+            for b in unknown:
+                self.waiting.setdefault(b, []).append(sym)
+        elif unknown:
+            self._solve(unknown.pop(), data)
+        return self.done
+
+    def _solve(self, block, data):
+        ready = [(block, data)]
+        while ready:
+            b, d = ready.pop()
+            if self.blocks[b] is not None:
+                continue
+            self.blocks[b] = d
+            self.solved += 1
+            for sym in self.waiting.pop(b, ()):
+                sym[0].discard(b)
+                _xor_into(sym[1], d)
+                if len(sym[0]) == 1:
+                    last = sym[0].pop()
+                    self.waiting[last].remove(sym)
+                    ready.append((last, sym[1]))
+
+    def data(self):
+        """The decoded blob (valid once `done`)."""
+        out = bytearray()
+        for blk in self.blocks:
+            out += blk
+        return bytes(out[:self.size])
@@ -0,0 +1,123 @@
+# lzss.py
+# Small LZSS codec for LoRa payloads: one-shot compressor, streaming decompressor.
+#
+# Stream format: a flag byte announces the next 8 tokens (LSB first).
+#   bit = 1 -> literal: 1 byte
+#   bit = 0 -> match:   2 bytes, big-endian (distance - 1) << 4 | (length - 3)
+# Distances reach back WINDOW bytes, lengths run 3..18. A match may overlap
+# the bytes it produces (distance < length), which encodes runs.
+
+WINDOW = 4096
+MIN_MATCH = 3
+MAX_MATCH = 18
+
+_MASK = WINDOW - 1
+_HASH_BITS = 12
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+def _hash(data, i):
+    return ((data[i] << 8) ^ (data[i + 1] << 4) ^ data[i + 2]) & _HASH_MASK
+
+def compress(data):
+    """
+    Compress `data` (bytes, bytearray or memoryview) into LZSS bytes.
+    Match search keeps only the last position per 3-byte hash, so memory
+    stays at one fixed table whatever the input size.
+    """
+    n = len(data)
+    out = bytearray()
+    head = [-WINDOW - 1] * (1 << _HASH_BITS)
+    i = 0
+    while i < n:
+        flag_pos = len(out)
+        out.append(0)
+        flags = 0
+        for bit in range(8):
+            if i >= n:
+                break
+            best = 0
+            if i + MIN_MATCH <= n:
+                h = _hash(data, i)
+                cand = head[h]
+                head[h] = i
+                dist = i - cand
+                if dist <= WINDOW:
+                    limit = min(MAX_MATCH, n - i)
+                    while best < limit and data[cand + best] == data[i + best]:
+                        best += 1
+            if best >= MIN_MATCH:
+                v = ((dist - 1) << 4) | (best - MIN_MATCH)
+                out.append(v >> 8)
+                out.append(v & 0xFF)
+                # Index the positions inside the match for later searches
+                for j in range(i + 1, min(i + best, n - MIN_MATCH + 1)):
+                    head[_hash(data, j)] = j
+                i += best
+            else:
+                flags |= 1 << bit
+                out.append(data[i])
+                i += 1
+        out[flag_pos] = flags
+    return bytes(out)
+
+
+class Decompressor:
+    """
+    Incremental decoder: feed() the compressed stream in arbitrary pieces
+    (e.g. one packet payload at a time) and get the decoded bytes back.
+    Tokens split across pieces are carried over, so only the WINDOW-byte
+    history is kept, never the whole message or file.
+    """
+    __slots__ = ('_hist', '_pos', '_flags', '_bits', '_pending', 'total_in', 'total_out')
+
+    def __init__(self):
+        self._hist = bytearray(WINDOW)
+        self._pos = 0
+        self._flags = 0
+        self._bits = 0
+        self._pending = -1   # First byte of a match split across pieces
+        self.total_in = 0
+        self.total_out = 0
+
+    def feed(self, chunk):
+        out = bytearray()
+        hist = self._hist
+        pos = self._pos
+        flags = self._flags
+        bits = self._bits
+        pending = self._pending
+        for b in chunk:
+            if pending >= 0:
+                v = (pending << 8) | b
+                pending = -1
+                src = pos - (v >> 4) - 1
+                for _ in range((v & 0x0F) + MIN_MATCH):
+                    c = hist[src & _MASK]
+                    hist[pos] = c
+                    out.append(c)
+                    pos = (pos + 1) & _MASK
+                    src += 1
+            elif bits == 0:
+                flags = b
+                bits = 8
+            else:
+                literal = flags & 1
+                flags >>= 1
+                bits -= 1
+                if literal:
+                    hist[pos] = b
+                    out.append(b)
+                    pos = (pos + 1) & _MASK
+                else:
+                    pending = b
+        self._pos = pos
+        self._flags = flags
+        self._bits = bits
+        self._pending = pending
+        self.total_in += len(chunk)
+        self.total_out += len(out)
+        return out
+
+def decompress(data):
+    """One-shot decode of a complete LZSS stream."""
+    return bytes(Decompressor().feed(data))
@@ -1,11 +1,16 @@
 from machine import Pin
 from sx1262 import SX1262
-import time, _thread, random, network, socket, json
+import time, _thread, random, network, socket, json, os
 
 # Custom protocol definitions for parsing and building network frames
-from beacon_protocol import BeaconPacket, ControlPacket, DataPacket, JoinReqPacket, HubSchedPacket, \
-     TYPE_BEACON, TYPE_CONTROL, TYPE_DATA_REQ, TYPE_JOIN_REQ, TYPE_HUB_SCHED, TYPE_MSG_CHUNK, TYPE_FILE_CHUNK
+from beacon_protocol import BeaconPacket, CompactBeaconPacket, ControlPacket, DataPacket, JoinReqPacket, HubSchedPacket, \
+     CompactControlPacket, CompactJoinReqPacket, CompactHubSchedPacket, BcastControlPacket, FountainPacket, \
+     PositionEncoder, PositionDecoder, decode_beacon, decode_sched, \
+     TYPE_BEACON, TYPE_BEACON_V2, TYPE_CONTROL, TYPE_CONTROL_V2, TYPE_CONTROL_V3, TYPE_DATA_REQ, TYPE_JOIN_REQ, \
+     TYPE_JOIN_REQ_V2, TYPE_HUB_SCHED, TYPE_HUB_SCHED_V2, TYPE_MSG_CHUNK, TYPE_FILE_CHUNK, TYPE_FOUNTAIN
+import fountain
 from slot_manager import SlotManager
+from packet_pool import PacketPool
 from config_loader import load_identity
 from utils2 import get_network_time, set_network_time, log, web_logs
 
@@ -15,6 +20,12 @@ from utils2 import get_network_time, set_network_time, log, web_logs
 id_data = load_identity()
 # Node's unique address in the network. Defaults to 0x02 if not found.
 MY_ADDR = id_data.get("my_addr", 0x02) 
+# Beacon wire format sent when Hub: 2 = compact (node set + frame offset), 1 = legacy.
+# Both are always decoded; keep 1 while the fleet still has pre-v2 clients.
+BEACON_VERSION = id_data.get("beacon_version", 2)
+# Control/join wire format sent as Client: 2 = compact (GPS deltas), 1 = legacy float GPS.
+# The Hub decodes both; keep 1 while the Hub may still run pre-v2 firmware.
+CONTROL_VERSION = id_data.get("control_version", 2)
 
 # ==========================================
 # --- STATE VARIABLES ---
@@ -33,6 +44,10 @@ missed_beacons = 0
 # ==========================================
 my_lat = 0.0
 my_lon = 0.0
+# Compact GPS: clients send deltas against their last absolute fix, the Hub
+# keeps every node's reference fix to resolve them
+gps_enc = PositionEncoder()
+gps_dec = PositionDecoder()
 # Dictionary mapping Node IDs to their last known GPS coordinates
 node_locations = {} # Hub stores network map here: {addr: {"lat": x, "lon": y}}
 
@@ -46,6 +61,28 @@ pending_reqs = []   # Queue of nodes requesting data slots (Hub use only)
 is_joined = False   # Network join status
 last_phase = ""     # Tracks the previous TDMA phase to detect transitions
 
+# ==========================================
+# --- BROADCAST TRANSFER (fountain-coded file / OTA push) ---
+# ==========================================
+# Hub streams LT symbols on lane 0 during idle data phases; every client
+# decodes once it holds enough symbols, whichever ones it lost, and reports
+# the transfer id in its heartbeat. The hub stops when all nodes reported,
+# after BCAST_BUDGET symbols per block, or on /api/broadcast?stop.
+BCAST_SYMBOL = 200   # Symbol size in bytes (frame = 9 + symbol + 2 CRC)
+BCAST_MAX = 65536    # Largest blob; clients hold it in RAM while decoding
+BCAST_BUDGET = 4     # Hub gives up after this many symbols per block (k)
+BCAST_DIR = "bcast"  # Only place broadcasts are sent from (Hub) and saved to (clients)
+bcast_enc = None     # Hub: fountain.Encoder of the running transfer
+bcast_next_id = 1    # Hub: id for the next transfer (1..255, 0 = none)
+bcast_done = set()   # Hub: nodes that reported the running transfer complete
+bcast_mute = set()   # Hub: nodes on legacy heartbeats, which cannot report; not waited for
+bcast_dec = None     # Client: fountain.Decoder of the transfer being received
+bcast_got = 0        # Client: id of the last transfer fully decoded (0 = none)
+try:
+    os.mkdir(BCAST_DIR)
+except OSError:
+    pass  # Already there
+
 log(f"Booting Node 0x{MY_ADDR:02X}. Waiting for Phone Sync or Hub Beacon...", save_to_file=True)
 
 # ==========================================
@@ -74,6 +111,123 @@ log(f"[Init] Starting Hardware -> TX: {tx_f:.2f} MHz | RX: {rx_f:.2f} MHz")
 sx_tx = get_sx(1, 1, 18, 5, 6, tx_f)
 sx_rx = get_sx(2, 12, 13, 8, 7, rx_f)
 
+# ==========================================
+# --- PREALLOCATED PACKETS (no per-frame allocation) ---
+# ==========================================
+# Sender thread only: one frame buffer and reusable beacon/data packet objects
+tx_frame = bytearray(DataPacket.MAX_FRAME)
+tx_beacon = CompactBeaconPacket() if BEACON_VERSION == 2 else BeaconPacket()
+tx_data = DataPacket()
+tx_control = CompactControlPacket(MY_ADDR) if CONTROL_VERSION == 2 else ControlPacket(MY_ADDR)
+tx_join = CompactJoinReqPacket(MY_ADDR) if CONTROL_VERSION == 2 else JoinReqPacket(MY_ADDR)
+tx_sched = CompactHubSchedPacket() if BEACON_VERSION == 2 else HubSchedPacket()
+tx_bcast_control = BcastControlPacket(MY_ADDR)
+tx_symbol = FountainPacket(payload=bytearray(BCAST_SYMBOL))
+# RX thread decodes DataPackets into pooled objects
+rx_pool = PacketPool(DataPacket, 4, DataPacket.MAX_FRAME)
+rx_symbol = FountainPacket()
+
+def send_data(to_addr, seq, pkt_type, payload):
+    """Encode a DataPacket into the shared TX frame buffer and transmit it."""
+    tx_data.to_addr, tx_data.from_addr, tx_data.seq_num, tx_data.pkt_type = to_addr, MY_ADDR, seq, pkt_type
+    tx_data.payload = payload
+    sx_tx.send(tx_frame, tx_data.pack_into(tx_frame))
+    tx_data.payload = b''
+
+def send_heartbeat():
+    """
+    Heartbeat with the shortest position field (unchanged / delta / absolute).
+    Once a broadcast has been decoded, the v3 heartbeat also carries its id.
+    With CONTROL_VERSION 1 it is the legacy float GPS heartbeat.
+    """
+    pkt = tx_control
+    if CONTROL_VERSION == 1:
+        pkt.lat, pkt.lon = my_lat, my_lon
+        sx_tx.send(tx_frame, pkt.pack_into(tx_frame))
+        return
+    if bcast_got:
+        pkt = tx_bcast_control
+        pkt.bcast_id = bcast_got
+    pkt.pos = gps_enc.encode(my_lat, my_lon)
+    sx_tx.send(tx_frame, pkt.pack_into(tx_frame))
+
+def bcast_name(name):
+    """
+    Check a broadcast file name (from the web API or off the air): a bare
+    name inside BCAST_DIR, never a path, and never one of the node's own
+    code or config files. Raises ValueError otherwise.
+    """
+    if not name or "/" in name or "\\" in name or ".." in name:
+        raise ValueError(f"bad broadcast name '{name}'")
+    if name.split(".")[-1] in ("py", "mpy", "json") and name in os.listdir():
+        raise ValueError(f"{name} is a system file")
+    return name
+
+def start_broadcast(name):
+    """
+    Hub: start pushing BCAST_DIR/`name` to every node. The blob is
+    b"name\0" + content, so clients save it under the same name.
+    """
+    global bcast_enc, bcast_next_id
+    name = bcast_name(name)
+    with open(f"{BCAST_DIR}/{name}", "rb") as f:
+        blob = name.encode() + b"\0" + f.read()
+    if len(blob) > BCAST_MAX:
+        raise ValueError(f"broadcast too large ({len(blob)} B)")
+    bcast_enc = fountain.Encoder(bcast_next_id, blob, BCAST_SYMBOL)
+    bcast_next_id = bcast_next_id % 255 + 1
+    bcast_done.clear()
+    log(f"[BCAST] #{bcast_enc.xfer_id} {name}: {len(blob)} B in {bcast_enc.k} blocks", save_to_file=True)
+
+def stop_broadcast(reason):
+    """Hub: end the running transfer, if any."""
+    global bcast_enc
+    enc, bcast_enc = bcast_enc, None
+    if enc:
+        log(f"[BCAST] #{enc.xfer_id} {reason} after {enc.esi} symbols", save_to_file=True)
+
+def send_symbol():
+    """
+    Hub: transmit the next LT symbol. Ends the transfer once every client
+    that can report has it, or after BCAST_BUDGET symbols per block.
+    """
+    enc = bcast_enc
+    if enc is None:
+        return  # Stopped from the web thread
+    clients = [n for n in active_nodes if n != MY_ADDR and n not in bcast_mute]
+    if all(n in bcast_done for n in clients):
+        stop_broadcast(f"complete on {len(clients)} nodes")
+        return
+    if enc.esi >= BCAST_BUDGET * enc.k:
+        stop_broadcast(f"gave up with {len(bcast_done)}/{len(clients)} nodes")
+        return
+    tx_symbol.esi, tx_symbol.degree = enc.next_symbol(tx_symbol.payload)
+    tx_symbol.xfer_id, tx_symbol.size = enc.xfer_id, enc.size
+    sx_tx.send(tx_frame, tx_symbol.pack_into(tx_frame))
+
+def receive_symbol(sym):
+    """Client: feed one symbol; save the file and remember its id once decoded."""
+    global bcast_dec, bcast_got
+    if sym.xfer_id == bcast_got or sym.size > BCAST_MAX:
+        return
+    if bcast_dec is None or bcast_dec.xfer_id != sym.xfer_id:
+        bcast_dec = fountain.Decoder(sym.xfer_id, sym.size, len(sym.payload))
+        log(f"[BCAST] Receiving #{sym.xfer_id} ({sym.size} B)")
+    if bcast_dec.add(sym.esi, sym.degree, sym.payload):
+        blob = bcast_dec.data()
+        name, _, content = blob.partition(b"\0")
+        try:
+            name = bcast_name(name.decode())
+            with open(f"{BCAST_DIR}/{name}", "wb") as f:
+                f.write(content)
+            log(f"[BCAST] #{sym.xfer_id} saved {name} ({len(content)} B, {bcast_dec.received} symbols)",
+                save_to_file=True)
+        except (ValueError, UnicodeError) as e:
+            # Never written: still counts as decoded, or we would decode it forever
+            log(f"[BCAST] #{sym.xfer_id} rejected: {e}", save_to_file=True)
+        bcast_got = sym.xfer_id
+        bcast_dec = None
+
 def switch_lane(p, peer_addr=None):
     """
     Handles Frequency Hopping logic. Swaps TX/RX frequencies based on the node's role 
@@ -183,8 +337,12 @@ def sender_loop():
                 # Hub broadcasts the beacon to sync all client clocks and share active nodes
                 if current_role == "HUB" and not flags["b"]:
                     now_net = get_network_time()
-                    current_frame_start = now_net - (now_net % 60000) 
-                    sx_tx.send(BeaconPacket(MY_ADDR, now_net, current_frame_start, 4-sm.slot_idx, active_nodes).to_bytes())
+                    tx_beacon.hub_id, tx_beacon.term, tx_beacon.active_nodes = MY_ADDR, 4-sm.slot_idx, active_nodes
+                    if BEACON_VERSION == 2:
+                        tx_beacon.set_time(now_net)
+                    else:
+                        tx_beacon.net_time, tx_beacon.frame_start = now_net, now_net - (now_net % 60000)
+                    sx_tx.send(tx_frame, tx_beacon.pack_into(tx_frame))
                     flags["b"] = 1
                     log(f"[TX] Beacon Sent (Active Nodes: {len(active_nodes)})")
 
@@ -197,12 +355,17 @@ def sender_loop():
                     
                     if not is_joined:
                         # New node asking to enter the network, shares GPS
-                        sx_tx.send(JoinReqPacket(MY_ADDR, my_lat, my_lon).to_bytes())
+                        # Absolute fixed-point fix; becomes the Hub's reference for our deltas
+                        if CONTROL_VERSION == 2:
+                            tx_join.pos = gps_enc.join(my_lat, my_lon)
+                        else:
+                            tx_join.lat, tx_join.lon = my_lat, my_lon
+                        sx_tx.send(tx_frame, tx_join.pack_into(tx_frame))
                         flags["c"] = 1
                         log(f"[TX] Join Request Sent with GPS ({my_lat:.4f}, {my_lon:.4f})", save_to_file=True)
                     else:
                         # Existing node sending alive heartbeat and updated GPS
-                        sx_tx.send(ControlPacket(MY_ADDR, my_lat, my_lon).to_bytes())
+                        send_heartbeat()
                         flags["c"] = 1
                         log(f"[TX] Heartbeat Sent with GPS ({my_lat:.4f}, {my_lon:.4f})")
 
@@ -214,7 +377,7 @@ def sender_loop():
                     if len(outgoing_payload) > 0:
                         # Node has data. Wait randomly, then raise hand to Hub
                         time.sleep_ms(random.randint(500, 3000)) 
-                        sx_tx.send(DataPacket(1, MY_ADDR, 0, TYPE_DATA_REQ, b'RQ').to_bytes())
+                        send_data(1, 0, TYPE_DATA_REQ, b'RQ')
                         log("[TX] Hand raised! Data Request Sent.", save_to_file=True)
                     flags["r"] = 1
 
@@ -225,7 +388,9 @@ def sender_loop():
                 if current_role == "HUB" and not flags["s"]:
                     # Assign a data lane (1-5) to each requesting client
                     asgn = [(addr, (i%5)+1) for i, addr in enumerate(pending_reqs)]
-                    sx_tx.send(HubSchedPacket(asgn).to_bytes())
+                    if BEACON_VERSION == 2: tx_sched.lanes = dict(asgn)
+                    else: tx_sched.assignments = asgn
+                    sx_tx.send(tx_frame, tx_sched.pack_into(tx_frame))
                     
                     if len(asgn) > 0: sm.assigned_lane = asgn[0][1] 
                     else: sm.assigned_lane = 0
@@ -240,7 +405,7 @@ def sender_loop():
                 # Failsafe: If Client has a lane but missed the schedule confirmation, ping Hub
                 if current_role == "CLIENT" and not flags["s"] and sm.assigned_lane > 0:
                     time.sleep_ms(1500) 
-                    sx_tx.send(ControlPacket(MY_ADDR, my_lat, my_lon).to_bytes())
+                    send_heartbeat()
                     log("[TX] Wake-up ping sent to rescue Hub!")
                     flags["s"] = 1
 
@@ -260,7 +425,7 @@ def sender_loop():
                     
                     if len(outgoing_payload) > 0 and current_role == "CLIENT" and not flags["d"]:
                         time.sleep_ms(1500) # Buffer to ensure radios are tuned
-                        sx_tx.send(DataPacket(hub_addr, MY_ADDR, 1, TYPE_MSG_CHUNK, outgoing_payload).to_bytes())
+                        send_data(hub_addr, 1, TYPE_MSG_CHUNK, outgoing_payload)
                         log(f"[TX] PAYLOAD FIRED: {outgoing_payload.decode('utf-8')}", save_to_file=True)
                         flags["d"] = 1
                         outgoing_payload = b"" # Clear payload after sending
@@ -268,6 +433,9 @@ def sender_loop():
                 else: 
                     # No data assigned, return to control lane
                     switch_lane(0)
+                    # Idle Hub streams broadcast symbols to every node on lane 0
+                    if current_role == "HUB" and bcast_enc:
+                        send_symbol()
 
             time.sleep_ms(50) # Yield to prevent watchdog crash
         except Exception as e: log(f"TX Error: {e}")
@@ -294,8 +462,8 @@ def rx_loop():
                 t = data[0] # First byte is the packet type header
                 
                 # --- BEACON RECEIVED ---
-                if t == TYPE_BEACON:
-                    b = BeaconPacket.from_bytes(data)
+                if t == TYPE_BEACON or t == TYPE_BEACON_V2:
+                    b = decode_beacon(data)
                     if b:
                         last_beacon_time = time.ticks_ms()
                         # If we aren't the hub, sync our clocks to the hub
@@ -303,7 +471,11 @@ def rx_loop():
                             set_network_time(b.net_time) 
                             time_since_frame_start = b.net_time - b.frame_start
                             sm.time_in_slot = time_since_frame_start
-                            sync_source = f"HUB (0x{b.hub_id:02X})"
+                            # A new hub, or one that dropped us, lacks the fix our deltas refer to
+                            hub_src = f"HUB (0x{b.hub_id:02X})"
+                            if hub_src != sync_source or MY_ADDR not in b.active_nodes:
+                                gps_enc.reanchor()
+                            sync_source = hub_src
                             
                             # Auto-demote to Client if a Hub is found
                             if current_role == "LISTENER":
@@ -319,35 +491,68 @@ def rx_loop():
                                 log("Successfully joined the network!", save_to_file=True)
                             
                 # --- JOIN REQUEST RECEIVED (Hub only) ---
-                elif t == TYPE_JOIN_REQ and current_role == "HUB":
-                    j = JoinReqPacket.from_bytes(data)
+                elif (t == TYPE_JOIN_REQ or t == TYPE_JOIN_REQ_V2) and current_role == "HUB":
+                    if t == TYPE_JOIN_REQ_V2:
+                        j = CompactJoinReqPacket.from_bytes(data)
+                        loc = gps_dec.decode(j.node_addr, j.pos) if j else None
+                    else: # Legacy float GPS
+                        j = JoinReqPacket.from_bytes(data)
+                        loc = (j.lat, j.lon) if j else None
                     if j:
                         if j.node_addr not in active_nodes: 
                             active_nodes.append(j.node_addr)
-                        node_locations[j.node_addr] = {"lat": j.lat, "lon": j.lon} # Store GPS
-                        log(f"[RX] Node 0x{j.node_addr:02X} joined at ({j.lat:.4f}, {j.lon:.4f})", save_to_file=True)
+                        if t == TYPE_JOIN_REQ:
+                            bcast_mute.add(j.node_addr)
+                        else:
+                            bcast_mute.discard(j.node_addr)
+                        if loc:
+                            node_locations[j.node_addr] = {"lat": loc[0], "lon": loc[1]} # Store GPS
+                            log(f"[RX] Node 0x{j.node_addr:02X} joined at ({loc[0]:.4f}, {loc[1]:.4f})", save_to_file=True)
+                        else:
+                            # Not an absolute fix: the node's next one anchors it
+                            log(f"[RX] Node 0x{j.node_addr:02X} joined (GPS reference unknown)", save_to_file=True)
 
                 # --- CONTROL/HEARTBEAT RECEIVED (Hub only) ---
-                elif t == TYPE_CONTROL and current_role == "HUB":
-                    c = ControlPacket.from_bytes(data)
-                    if c:
-                        node_locations[c.src] = {"lat": c.lat, "lon": c.lon} # Store GPS update
-                        log(f"[RX] Heartbeat from 0x{c.src:02X} at ({c.lat:.4f}, {c.lon:.4f})")
+                elif (t == TYPE_CONTROL or t == TYPE_CONTROL_V2 or t == TYPE_CONTROL_V3) and current_role == "HUB":
+                    if t == TYPE_CONTROL_V3:
+                        c = BcastControlPacket.from_bytes(data)
+                        loc = gps_dec.decode(c.src, c.pos) if c else None
+                        if c and bcast_enc and c.bcast_id == bcast_enc.xfer_id and c.src not in bcast_done:
+                            bcast_done.add(c.src)
+                            log(f"[BCAST] Node 0x{c.src:02X} has #{c.bcast_id}", save_to_file=True)
+                    elif t == TYPE_CONTROL_V2:
+                        c = CompactControlPacket.from_bytes(data)
+                        loc = gps_dec.decode(c.src, c.pos) if c else None
+                    else: # Legacy float GPS
+                        c = ControlPacket.from_bytes(data)
+                        loc = (c.lat, c.lon) if c else None
+                    if c and t == TYPE_CONTROL:
+                        bcast_mute.add(c.src)
+                    elif c:
+                        bcast_mute.discard(c.src)
+                    if loc:
+                        node_locations[c.src] = {"lat": loc[0], "lon": loc[1]} # Store GPS update
+                        log(f"[RX] Heartbeat from 0x{c.src:02X} at ({loc[0]:.4f}, {loc[1]:.4f})")
+                    elif c:
+                        # Delta against a fix we never got; the node re-anchors periodically
+                        log(f"[RX] Heartbeat from 0x{c.src:02X} (GPS reference unknown)")
                         
                 # --- DATA REQUEST RECEIVED (Hub only) ---
                 elif t == TYPE_DATA_REQ and current_role == "HUB":
-                    d = DataPacket.from_bytes(data)
+                    r = rx_pool.acquire()
+                    d = DataPacket.from_view(data, out=r)
                     if d and d.from_addr not in pending_reqs: 
                         # Add client to the queue for the scheduling phase
                         pending_reqs.append(d.from_addr)
                         log(f"[RX] Data Request received from Node 0x{d.from_addr:02X}", save_to_file=True)
+                    rx_pool.release(r)
                         
                 # --- HUB SCHEDULE RECEIVED (Clients only) ---
-                elif t == TYPE_HUB_SCHED and current_role == "CLIENT":
-                    s = HubSchedPacket.from_bytes(data)
+                elif (t == TYPE_HUB_SCHED or t == TYPE_HUB_SCHED_V2) and current_role == "CLIENT":
+                    s = decode_sched(data)
                     if s:
                         # Check if Hub assigned us a frequency lane
-                        sm.assigned_lane = next((l for a, l in s.assignments if a == MY_ADDR), 0)
+                        sm.assigned_lane = s.lane_for(MY_ADDR)
                         if sm.assigned_lane > 0:
                             log(f"[RX] Hub assigned us to Data Lane {sm.assigned_lane}!", save_to_file=True)
                             hub_addr = 1 
@@ -360,12 +565,22 @@ def rx_loop():
                             if MY_ADDR > hub_addr: next_r = FREQ_PAIRS[sm.assigned_lane][0]
                             target_rx_f = next_r
 
+                # --- BROADCAST SYMBOL RECEIVED (Clients only) ---
+                elif t == TYPE_FOUNTAIN and current_role == "CLIENT":
+                    sym = FountainPacket.from_view(data, out=rx_symbol)
+                    if sym:
+                        receive_symbol(sym)
+                    rx_symbol.payload = b''
+
                 # --- ACTUAL DATA PAYLOAD RECEIVED ---
                 elif t == TYPE_MSG_CHUNK or t == TYPE_FILE_CHUNK:
-                    d = DataPacket.from_bytes(data)
+                    # Zero-copy decode; frames for other nodes skip the CRC
+                    r = rx_pool.acquire()
+                    d = DataPacket.from_view(data, MY_ADDR, r)
                     if d:
-                        msg = d.payload.decode('utf-8')
+                        msg = bytes(d.payload).decode('utf-8')
                         log(f"🟢 [INCOMING MESSAGE] From Node 0x{d.from_addr:02X}: {msg}", save_to_file=True)
+                    rx_pool.release(r)
                         
         except Exception as e: pass
 
@@ -413,6 +628,18 @@ def run_web():
                     print(f"Sync Parsing Error: {e}")
                 cl.send("HTTP/1.1 200 OK\r\n\r\nOK")
 
+            # --- API ENDPOINT: Hub pushes a flash file to every node ---
+            elif "/api/broadcast" in r:
+                try:
+                    if current_role != "HUB": raise ValueError("not the Hub")
+                    if " /api/broadcast?stop" in r:
+                        stop_broadcast("stopped")
+                    else:
+                        start_broadcast(r.split(" /api/broadcast?file=")[1].split(" ")[0])
+                    cl.send("HTTP/1.1 200 OK\r\n\r\nOK")
+                except Exception as e:
+                    cl.send(f"HTTP/1.1 400 Bad Request\r\n\r\n{e}")
+
             # --- API ENDPOINT: Frontend Dashboard polling node state ---
             elif "/api/state" in r:
                 # Expose the internal network map and TDMA state to the frontend
@@ -421,6 +648,9 @@ def run_web():
                     "phase": sm.get_current_phase(), "slot": sm.slot_idx+1, 
                     "active": [hex(n) for n in active_nodes], 
                     "locations": node_locations,
+                    "bcast": {"id": bcast_enc.xfer_id, "symbols": bcast_enc.esi, "done": [hex(n) for n in bcast_done],
+                              "mute": [hex(n) for n in bcast_mute]}
+                             if bcast_enc else {"got": bcast_got},
                     "logs": web_logs
                 }
                 cl.send("HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n" + json.dumps(res))
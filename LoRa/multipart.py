@@ -0,0 +1,93 @@
+# multipart.py
+# Incremental multipart/form-data parser that spools an upload to flash.
+#
+# The web server feed()s the request body as it comes off the socket. The
+# first part with filename="..." is written straight to the spool file, any
+# other part is skipped. Only one recv() plus a delimiter's worth of carry-
+# over is buffered (a delimiter may straddle two reads), so memory does not
+# grow with the size of the upload.
+#
+#   body:  --B\r\n<headers>\r\n\r\n<data>\r\n--B\r\n<headers>...\r\n--B--
+# Parts are split on "\r\n--B"; the parser starts as if a "\r\n" preceded
+# the body so the first delimiter matches the same way.
+
+_SKIP = 0      # Preamble, or a part we do not keep
+_HEADERS = 1   # Between a delimiter and the blank line
+_FILE = 2      # Data of the spooled part
+_END = 3       # Closing delimiter seen
+
+class MultipartSpool:
+    """
+    - feed(data): next piece of the request body
+    - close(): close the spool file (call once the body has been read)
+    - filename: from the spooled part's headers, None if no file part
+    - size: bytes written to `path`
+    - done: the closing delimiter was seen (the body is complete)
+    """
+    __slots__ = ('path', 'delim', 'buf', 'state', 'f', 'filename', 'size', 'done')
+
+    HEADERS_MAX = 1024  # Longer part headers are refused
+
+    def __init__(self, boundary, path):
+        self.path = path
+        self.delim = b'\r\n--' + boundary
+        self.buf = b'\r\n'
+        self.state = _SKIP
+        self.f = None
+        self.filename = None
+        self.size = 0
+        self.done = False
+
+    def feed(self, data):
+        buf = self.buf + data
+        delim = self.delim
+        while True:
+            state = self.state
+            if state == _END:
+                buf = b''
+                break
+            if state == _HEADERS:
+                if len(buf) < 2:
+                    break
+                if buf[:2] == b'--':
+                    self.state = _END
+                    self.done = True
+                    continue
+                i = buf.find(b'\r\n\r\n')
+                if i < 0:
+                    if len(buf) > self.HEADERS_MAX:
+                        raise ValueError("part headers too long")
+                    break
+                headers = buf[:i].decode()
+                buf = buf[i + 4:]
+                if self.filename is None and 'filename="' in headers:
+                    self.filename = headers.split('filename="')[1].split('"')[0]
+                    self.f = open(self.path, 'wb')
+                    self.state = _FILE
+                else:
+                    self.state = _SKIP
+                continue
+            i = buf.find(delim)
+            if i < 0:
+                # Keep what could be the start of a delimiter
+                n = len(buf) - len(delim) + 1
+                if n > 0:
+                    if state == _FILE:
+                        self._write(buf, n)
+                    buf = buf[n:]
+                break
+            if state == _FILE:
+                self._write(buf, i)
+                self.close()
+            buf = buf[i + len(delim):]
+            self.state = _HEADERS
+        self.buf = buf
+
+    def _write(self, buf, n):
+        self.f.write(memoryview(buf)[:n])
+        self.size += n
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
@@ -0,0 +1,49 @@
+# packet_pool.py
+# Fixed-size free list for packet objects (PacketV13, DataPacket, ...).
+
+class PacketPool:
+    """
+    Recycles packet objects together with their frame bytearrays so the
+    steady-state ARQ path (ACKs, retransmissions, RX decode) does not
+    allocate and does not wake the GC.
+
+    - acquire(): pop a free packet, or build a new one when the pool is dry
+      (counted in `misses`).
+    - release(pkt): hand it back; packets beyond `size` are left to the GC.
+    - resize(size): change `size`; a larger pool fills up from the packets
+      built on misses, a smaller one drops its surplus free packets.
+
+    list.pop()/append() are single operations under the MicroPython GIL, so
+    the RX, sender and web threads can share one pool without a lock.
+    """
+    __slots__ = ('_free', '_factory', 'size', 'misses')
+
+    def __init__(self, factory, size, frame_size=0):
+        self._factory = factory
+        self.size = size
+        self.misses = 0
+        self._free = []
+        for _ in range(size):
+            pkt = factory()
+            if frame_size:
+                pkt.buf = bytearray(frame_size)
+            self._free.append(pkt)
+
+    def acquire(self):
+        try:
+            return self._free.pop()
+        except IndexError:
+            self.misses += 1
+            return self._factory()
+
+    def release(self, pkt):
+        pkt.payload = b''  # Drop references to RX frames / app data
+        if len(self._free) < self.size:
+            self._free.append(pkt)
+
+    def resize(self, size):
+        self.size = size
+        del self._free[size:]
+
+    def available(self):
+        return len(self._free)
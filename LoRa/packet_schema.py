@@ -0,0 +1,253 @@
+# packet_schema.py
+# Compiles declarative field layouts into pack/unpack routines for packet classes.
+import struct
+from crc import crc16
+
+# MicroPython's struct has no Struct class; fall back to a tiny equivalent
+try:
+    _Struct = struct.Struct
+except AttributeError:
+    class _Struct:
+        __slots__ = ('format', 'size')
+
+        def __init__(self, fmt):
+            self.format = fmt
+            self.size = struct.calcsize(fmt)
+
+        def pack_into(self, buf, offset, *vals):
+            struct.pack_into(self.format, buf, offset, *vals)
+
+        def unpack_from(self, data, offset=0):
+            return struct.unpack_from(self.format, data, offset)
+
+CRC_SIZE = 2
+
+# --- Variable tails (after the fixed header, before the optional CRC) ---
+# 'bytes' : raw payload, runs up to the CRC                  -> bytes / memoryview
+# 'list'  : count byte (last header field) + one byte each   -> list of ints
+# 'pairs' : count byte (last header field) + two bytes each  -> list of (a, b)
+# 'nodeset': set of 8-bit addresses, self-describing (see below) -> sorted list
+# Protocol-specific kinds can be added with register_tail().
+_TAIL_WIDTH = {'bytes': 1, 'list': 1, 'pairs': 2}
+
+# Node sets: a mode byte, then either the sorted addresses (mode = count) or,
+# when that would be longer, a 32-byte bitmap of all 256 addresses (mode = 0xFF).
+NODESET_BITMAP = 0xFF
+NODESET_BITMAP_LEN = 32
+
+def nodeset_len(nodes):
+    n = len(nodes)
+    return 1 + (n if n < NODESET_BITMAP_LEN else NODESET_BITMAP_LEN)
+
+def _pairs_len(value):
+    return 2 * len(value)
+
+def _pack_bytes(buf, ptr, value):
+    end = ptr + len(value)
+    buf[ptr:end] = value
+    return end
+
+def _pack_list(buf, ptr, value):
+    for item in value:
+        buf[ptr] = item
+        ptr += 1
+    return ptr
+
+def _pack_pairs(buf, ptr, value):
+    for a, b in value:
+        buf[ptr] = a
+        buf[ptr + 1] = b
+        ptr += 2
+    return ptr
+
+def pack_nodeset(buf, ptr, nodes):
+    if len(nodes) < NODESET_BITMAP_LEN:
+        buf[ptr] = len(nodes)
+        ptr += 1
+        for addr in sorted(nodes):
+            buf[ptr] = addr
+            ptr += 1
+        return ptr
+    buf[ptr] = NODESET_BITMAP
+    ptr += 1
+    for i in range(ptr, ptr + NODESET_BITMAP_LEN):
+        buf[i] = 0
+    for addr in nodes:
+        buf[ptr + (addr >> 3)] |= 1 << (addr & 7)
+    return ptr + NODESET_BITMAP_LEN
+
+def _unpack_bytes(data, ptr, end, count, view):
+    if view:
+        return memoryview(data)[ptr:end]
+    return bytes(memoryview(data)[ptr:end])
+
+def _unpack_list(data, ptr, end, count, view):
+    return list(memoryview(data)[ptr:ptr + count])
+
+def _unpack_pairs(data, ptr, end, count, view):
+    return [(data[i], data[i + 1]) for i in range(ptr, ptr + 2 * count, 2)]
+
+def unpack_nodeset(data, ptr, end, count, view):
+    if ptr >= end:
+        return None
+    mode = data[ptr]
+    ptr += 1
+    if mode != NODESET_BITMAP:
+        if ptr + mode > end:
+            return None
+        return list(memoryview(data)[ptr:ptr + mode])
+    if ptr + NODESET_BITMAP_LEN > end:
+        return None
+    nodes = []
+    for i in range(NODESET_BITMAP_LEN):
+        bits = data[ptr + i]
+        if bits:
+            for b in range(8):
+                if bits & (1 << b):
+                    nodes.append((i << 3) | b)
+    return nodes
+
+_LENGTHS = {'bytes': len, 'list': len, 'pairs': _pairs_len, 'nodeset': nodeset_len}
+_PACKERS = {'bytes': _pack_bytes, 'list': _pack_list, 'pairs': _pack_pairs, 'nodeset': pack_nodeset}
+_UNPACKERS = {'bytes': _unpack_bytes, 'list': _unpack_list, 'pairs': _unpack_pairs, 'nodeset': unpack_nodeset}
+
+def register_tail(kind, length, pack, unpack):
+    """
+    Add a self-describing tail kind for protocol-specific fields:
+    length(value) -> bytes, pack(buf, ptr, value) -> new ptr,
+    unpack(data, ptr, end, count, view) -> value or None if malformed.
+    Register before building the Layouts that use it.
+    """
+    _LENGTHS[kind] = length
+    _PACKERS[kind] = pack
+    _UNPACKERS[kind] = unpack
+
+
+class Layout:
+    """
+    Compiled layout of one packet type (one struct code per field):
+    [type byte] | fixed fields (big-endian struct) | [tail] | [CRC16].
+    Encode is one pack_into() into the caller's buffer, decode one unpack_from().
+    """
+    __slots__ = ('type_id', 'head', 'fields', 'offsets', 'tail_kind', 'tail_attr',
+                 'counted', 'crc', 'dest', 'min_len', '_tail_len', '_pack_tail', '_unpack_tail')
+
+    def __init__(self, type_id, fmt, fields, tail=None, crc=False, dest=None):
+        self.type_id = type_id
+        full = ('>B' + fmt) if type_id is not None else ('>' + fmt)
+        self.head = _Struct(full)
+        self.fields = tuple(fields)
+        self.tail_kind, self.tail_attr = tail if tail else (None, None)
+        self.counted = self.tail_kind in ('list', 'pairs')
+        self.crc = crc
+        self.dest = dest
+        self.min_len = self.head.size + (CRC_SIZE if crc else 0)
+
+        # Byte offset of each named field, for header peeks before CRC work
+        first = 1 if type_id is not None else 0
+        self.offsets = {}
+        for i, name in enumerate(self.fields):
+            self.offsets[name] = struct.calcsize(full[:1 + first + i])
+
+        if len(self.fields) + first + (1 if self.counted else 0) != len(full) - 1:
+            raise ValueError("Layout fields do not match format " + full)
+
+        self._tail_len = _LENGTHS.get(self.tail_kind)
+        self._pack_tail = _PACKERS.get(self.tail_kind)
+        self._unpack_tail = _UNPACKERS.get(self.tail_kind)
+
+    def size(self, pkt):
+        """Encoded length of `pkt` in bytes."""
+        n = self.min_len
+        if self.tail_kind:
+            n += self._tail_len(getattr(pkt, self.tail_attr))
+        return n
+
+    def pack_into(self, pkt, buf, offset=0):
+        """Encode `pkt` into `buf` at `offset`; returns the frame length."""
+        vals = [getattr(pkt, name) for name in self.fields]
+        if self.type_id is not None:
+            vals.insert(0, self.type_id)
+        tail = getattr(pkt, self.tail_attr) if self.tail_kind else None
+        if self.counted:
+            vals.append(len(tail))
+        self.head.pack_into(buf, offset, *vals)
+
+        ptr = offset + self.head.size
+        if tail is not None:
+            ptr = self._pack_tail(buf, ptr, tail)
+        if self.crc:
+            struct.pack_into('>H', buf, ptr, crc16(memoryview(buf)[offset:ptr]))
+            ptr += CRC_SIZE
+        return ptr - offset
+
+    def to_bytes(self, pkt):
+        buf = bytearray(self.size(pkt))
+        self.pack_into(pkt, buf)
+        return bytes(buf)
+
+    def peek(self, data, name):
+        """Read one fixed field straight from the frame, without validation."""
+        if len(data) < self.min_len:
+            return None
+        return data[self.offsets[name]]
+
+    def unpack(self, cls, data, out=None, view=False, dest=None):
+        """
+        Validate and decode `data` into `out` (or a new `cls()`).
+        Returns None on wrong type, short or truncated frame, bad CRC, or when
+        `dest` is given and the layout's destination field does not match;
+        that last check runs before the CRC is computed.
+        With `view=True` a 'bytes' tail is a memoryview into `data`.
+        """
+        n = len(data)
+        if n < self.min_len:
+            return None
+        if self.type_id is not None and data[0] != self.type_id:
+            return None
+        if dest is not None and data[self.offsets[self.dest]] != dest:
+            return None
+
+        end = n - CRC_SIZE if self.crc else n
+        if self.crc and crc16(memoryview(data)[:end]) != ((data[end] << 8) | data[end + 1]):
+            return None
+
+        vals = self.head.unpack_from(data, 0)
+        first = 1 if self.type_id is not None else 0
+        count = vals[-1] if self.counted else 0
+        ptr = self.head.size
+        if self.counted and ptr + _TAIL_WIDTH[self.tail_kind] * count > end:
+            return None
+
+        tail = None
+        if self.tail_kind:
+            tail = self._unpack_tail(data, ptr, end, count, view)
+            if tail is None:
+                return None # Truncated self-describing tail
+
+        pkt = out if out is not None else cls()
+        for i, name in enumerate(self.fields):
+            setattr(pkt, name, vals[first + i])
+        if self.tail_kind:
+            setattr(pkt, self.tail_attr, tail)
+        return pkt
+
+
+class SchemaPacket:
+    """Base class wiring a class-level LAYOUT into the usual packet methods."""
+    __slots__ = ()
+    LAYOUT = None
+
+    def size(self):
+        return self.LAYOUT.size(self)
+
+    def pack_into(self, buf, offset=0):
+        """Serialize into a reusable buffer; returns the frame length."""
+        return self.LAYOUT.pack_into(self, buf, offset)
+
+    def to_bytes(self):
+        return self.LAYOUT.to_bytes(self)
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls.LAYOUT.unpack(cls, data)
@@ -0,0 +1,47 @@
+# rtt_estimator.py
+# Retransmission timeout from measured round trips (RFC 6298 style).
+#
+#   SRTT   <- 7/8 SRTT + 1/8 R
+#   RTTVAR <- 3/4 RTTVAR + 1/4 |SRTT - R|
+#   RTO     = SRTT + max(tick, 4 RTTVAR), clamped to [floor, ceiling]
+# Karn's rule: R is only taken from frames sent exactly once, since the ACK
+# of a retransmitted frame cannot tell which copy it answers. A timeout
+# doubles the RTO until the next valid sample. The floor comes from the
+# radio's airtime, so a fast link cannot drive the RTO below the time a
+# frame and its ACK physically need.
+
+class RttEstimator:
+    """
+    One per peer.
+    - sample(rtt_ms): round trip of a frame sent once, data out to ACK in
+    - backoff(): a retransmit timer fired; double the RTO
+    - rto: timeout (ms) to arm for the next transmission
+    """
+    __slots__ = ('srtt', 'rttvar', 'rto', 'floor', 'ceiling', 'tick', 'samples')
+
+    K = 4
+
+    def __init__(self, initial_ms, floor_ms, ceiling_ms=60000, tick_ms=20):
+        self.srtt = 0          # 0 until the first sample
+        self.rttvar = 0
+        self.floor = floor_ms
+        self.ceiling = ceiling_ms
+        self.tick = tick_ms    # Timer granularity (G in RFC 6298)
+        self.samples = 0
+        self.rto = min(max(initial_ms, floor_ms), ceiling_ms)
+
+    def sample(self, rtt_ms):
+        if rtt_ms < 0:
+            return
+        if self.samples == 0:
+            self.srtt = rtt_ms
+            self.rttvar = rtt_ms // 2
+        else:
+            self.rttvar += (abs(self.srtt - rtt_ms) - self.rttvar) // 4
+            self.srtt += (rtt_ms - self.srtt) // 8
+        self.samples += 1
+        rto = self.srtt + max(self.tick, self.K * self.rttvar)
+        self.rto = min(max(rto, self.floor), self.ceiling)
+
+    def backoff(self):
+        self.rto = min(self.rto * 2, self.ceiling)
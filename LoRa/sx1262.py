@@ -180,11 +180,12 @@ class SX1262(SX126X):
         else:
             return self._receive(len, timeout_en, timeout_ms)
 
-    def send(self, data):
+    def send(self, data, len_=None):
+        # len_ lets callers transmit the first len_ bytes of a reusable buffer
         if not self.blocking:
-            return self._startTransmit(data)
+            return self._startTransmit(data, len_)
         else:
-            return self._transmit(data)
+            return self._transmit(data, len_)
 
     def _events(self):
         return super().getIrqStatus()
@@ -215,14 +216,17 @@ class SX1262(SX126X):
 
         return  bytes(data), state
 
-    def _transmit(self, data):
+    def _transmit(self, data, len_=None):
         if isinstance(data, bytes) or isinstance(data, bytearray):
             pass
         else:
             return 0, ERR_INVALID_PACKET_TYPE
 
-        state = super().transmit(data, len(data))
-        return len(data), state
+        if len_ is None or len_ > len(data):
+            len_ = len(data)
+
+        state = super().transmit(data, len_)
+        return len_, state
 
     def _readData(self, len_=0):
         state = ERR_NONE
@@ -248,14 +252,17 @@ class SX1262(SX126X):
         else:
             return b'', state
 
-    def _startTransmit(self, data):
+    def _startTransmit(self, data, len_=None):
         if isinstance(data, bytes) or isinstance(data, bytearray):
             pass
         else:
             return 0, ERR_INVALID_PACKET_TYPE
 
-        state = super().startTransmit(data, len(data))
-        return len(data), state
+        if len_ is None or len_ > len(data):
+            len_ = len(data)
+
+        state = super().startTransmit(data, len_)
+        return len_, state
 
     def _dummyFunction(self, *args):
         pass
@@ -0,0 +1,52 @@
+# timed_lock.py
+# Drop-in `with`-lock that measures how long it is held and waited for.
+#
+# Wraps a _thread lock; `with lock:` works as before. Each hold adds to
+# `holds`, `hold_us` (total) and `hold_max_us`; time spent blocked in
+# acquire adds to `wait_us` / `wait_max_us`. Two ticks_us() reads per
+# acquisition, no allocation.
+import time
+import _thread
+
+class TimedLock:
+    """
+    - stats(): dict of the counters (JSON-ready)
+    - reset(): zero the counters (start a fresh measurement)
+    """
+    __slots__ = ('lock', 'since', 'holds', 'hold_us', 'hold_max_us', 'wait_us', 'wait_max_us')
+
+    def __init__(self):
+        self.lock = _thread.allocate_lock()
+        self.since = 0
+        self.reset()
+
+    def reset(self):
+        self.holds = 0
+        self.hold_us = 0
+        self.hold_max_us = 0
+        self.wait_us = 0
+        self.wait_max_us = 0
+
+    def __enter__(self):
+        t = time.ticks_us()
+        self.lock.acquire()
+        now = time.ticks_us()
+        waited = time.ticks_diff(now, t)
+        self.wait_us += waited
+        if waited > self.wait_max_us:
+            self.wait_max_us = waited
+        self.since = now
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        held = time.ticks_diff(time.ticks_us(), self.since)
+        self.holds += 1
+        self.hold_us += held
+        if held > self.hold_max_us:
+            self.hold_max_us = held
+        self.lock.release()
+
+    def stats(self):
+        return {"holds": self.holds, "hold_us": self.hold_us, "hold_max_us": self.hold_max_us,
+                "hold_avg_us": self.hold_us // self.holds if self.holds else 0,
+                "wait_us": self.wait_us, "wait_max_us": self.wait_max_us}
@@ -0,0 +1,82 @@
+# timer_wheel.py
+# Hashed timer wheel for ARQ retransmit deadlines.
+#
+# A deadline d lands in slot (d // tick_ms) mod size, so scheduling is O(1)
+# and expire() only looks at the slots whose tick has passed since the last
+# call. Deadlines are time.ticks_ms() values and all arithmetic goes through
+# ticks_diff()/ticks_add(), so the 2**30 wrap of the tick counter is harmless.
+# Deadlines further away than one rotation (size * tick_ms) share a slot with
+# nearer ones and simply stay there until their own turn comes.
+#
+# There is no cancel(): the owner checks each expired key against its own
+# state (still unacked? last sent long enough ago?) and drops stale ones.
+import time
+
+class TimerWheel:
+    """
+    - schedule(key, deadline): fire `key` once ticks_ms() reaches `deadline`
+    - expire(now, out): append every key whose deadline has passed to `out`
+    - next_deadline(): earliest pending deadline, or None when empty
+    """
+    __slots__ = ('tick_ms', 'mask', 'slots', 'index', 'base', 'count')
+
+    def __init__(self, tick_ms=20, size=64):
+        self.tick_ms = tick_ms
+        self.mask = size - 1                        # size must be a power of two
+        self.slots = [[] for _ in range(size)]      # [deadline, key] entries
+        self.index = 0                              # Slot of the current tick
+        self.base = time.ticks_ms()                 # Start of the current tick
+        self.count = 0
+
+    def schedule(self, key, deadline):
+        # Overdue deadlines go to the current slot and fire on the next expire()
+        ahead = max(0, time.ticks_diff(deadline, self.base)) // self.tick_ms
+        self.slots[(self.index + ahead) & self.mask].append((deadline, key))
+        self.count += 1
+
+    def expire(self, now, out):
+        """Move the keys due at `now` into `out`; returns how many."""
+        passed = time.ticks_diff(now, self.base) // self.tick_ms
+        if passed < 0:
+            return 0
+        fired = 0
+        if self.count:
+            for step in range(min(passed + 1, self.mask + 1)):
+                slot = self.slots[(self.index + step) & self.mask]
+                if not slot:
+                    continue
+                keep = 0
+                for entry in slot:
+                    if time.ticks_diff(now, entry[0]) >= 0:
+                        out.append(entry[1])
+                        fired += 1
+                    else:
+                        slot[keep] = entry
+                        keep += 1
+                del slot[keep:]
+            self.count -= fired
+        self.index = (self.index + passed) & self.mask
+        self.base = time.ticks_add(self.base, passed * self.tick_ms)
+        return fired
+
+    def next_deadline(self):
+        """
+        Earliest pending deadline (a ticks_ms() value), found by walking the
+        slots from the current tick; None when nothing is scheduled.
+        """
+        if not self.count:
+            return None
+        tick = self.tick_ms
+        best = None
+        for step in range(self.mask + 1):
+            slot = self.slots[(self.index + step) & self.mask]
+            start = time.ticks_add(self.base, step * tick)
+            for entry in slot:
+                # Only entries of this rotation; later laps are found later
+                if time.ticks_diff(entry[0], start) < tick:
+                    if best is None or time.ticks_diff(entry[0], best) < 0:
+                        best = entry[0]
+            if best is not None:
+                return best
+        # Everything is more than one rotation away: wake after a lap
+        return time.ticks_add(self.base, (self.mask + 1) * tick)
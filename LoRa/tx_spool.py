@@ -0,0 +1,190 @@
+# tx_spool.py
+# Append-only flash spool of outgoing messages and files.
+#
+# Each queued message or file is one data file, <dir>/<id>.dat, holding the
+# bytes to send (compressed or raw). It is written once, before the entry is
+# queued, and never modified. The index, <dir>/index, is an append-only log:
+#   Q <id> <kind> <zflag> <length> <size> <xid> <name>   queued (data complete)
+#   A <id> <offset>                                      first <offset> bytes ACKed
+#   D <id>                                               fully ACKed, data deleted
+# <xid> is a random 32-bit transfer ID; it stays the same across reboots so
+# the receiver can recognise a file it has partly received. Q records from
+# before xids (no <xid> field) are read with a fresh one.
+# At boot the log is replayed: entries with a Q and no D are pending again.
+# A record torn by a reset mid-append has no newline and is ignored. The
+# log is then rewritten with only the pending entries, and truncated
+# whenever the last entry completes. Acks are logged every CHECKPOINT
+# bytes, not per frame, to spare the flash.
+import os
+import _thread
+
+KIND_MSG = 0
+KIND_FILE = 1
+
+def _new_xid():
+    return int.from_bytes(os.urandom(4), 'big')
+
+class SpoolEntry:
+    """
+    One queued message or file. `length` is the data file's size (bytes on
+    the air), `size` the original size before compression.
+    """
+    __slots__ = ('id', 'kind', 'zflag', 'length', 'size', 'xid', 'name', 'acked', 'saved', 'done')
+
+    def __init__(self, entry_id, kind, zflag, length, size, xid, name):
+        self.id = entry_id
+        self.kind = kind
+        self.zflag = zflag
+        self.length = length
+        self.size = size
+        self.xid = xid
+        self.name = name
+        self.acked = 0     # Bytes acknowledged in order
+        self.saved = 0     # `acked` as last logged in the index
+        self.done = False
+
+class TxSpool:
+    """
+    - reserve(): id for a new entry; write its data to path(id) first
+    - add(id, kind, zflag, length, size, name): log the entry as queued
+    - entries: pending entries in queue order (reloaded at boot)
+    - ack(entry, offset): first `offset` bytes ACKed, None = all of it
+    - sync(): log the acks since the last call and delete finished data
+    add() and sync() may run on different threads; ack() and sync() must
+    run on the same one.
+    """
+    __slots__ = ('dir', 'entries', 'next_id', 'dirty', 'lock')
+
+    CHECKPOINT = 4096
+
+    def __init__(self, directory='spool'):
+        self.dir = directory
+        self.entries = []
+        self.next_id = 1
+        self.dirty = []    # Entries with acks not yet logged
+        self.lock = _thread.allocate_lock()
+        try:
+            os.mkdir(directory)
+        except OSError:
+            pass  # Already there
+        self._load()
+
+    def path(self, entry_id):
+        return f"{self.dir}/{entry_id}.dat"
+
+    def _index(self):
+        return self.dir + '/index'
+
+    def _load(self):
+        pending = {}
+        try:
+            with open(self._index()) as f:
+                for line in f:
+                    if not line.endswith('\n'):
+                        break  # Torn by a reset mid-append
+                    try:
+                        rec = line[:-1].split(' ', 7)
+                        entry_id = int(rec[1])
+                        if rec[0] == 'Q':
+                            pending[entry_id] = self._parse_queued(line[:-1])
+                        elif rec[0] == 'A' and entry_id in pending:
+                            e = pending[entry_id]
+                            e.acked = e.saved = int(rec[2])
+                        elif rec[0] == 'D':
+                            pending.pop(entry_id, None)
+                    except (ValueError, IndexError):
+                        pass  # Malformed record: skipped, like a torn one
+        except OSError:
+            pass  # No index yet
+        self.entries = [pending[i] for i in sorted(pending)]
+        if self.entries:
+            self.next_id = self.entries[-1].id + 1
+        # Data files not in the index: uploads cut short, finished entries
+        for name in os.listdir(self.dir):
+            if name.endswith('.dat') and int(name[:-4]) not in pending:
+                os.remove(f"{self.dir}/{name}")
+        self._rewrite()
+
+    def _rewrite(self):
+        """Replace the index with one Q (+ A) record per pending entry."""
+        tmp = self._index() + '.tmp'
+        with open(tmp, 'w') as f:
+            for e in self.entries:
+                f.write(self._queued(e))
+                if e.saved:
+                    f.write(f"A {e.id} {e.saved}\n")
+        try:
+            os.rename(tmp, self._index())
+        except OSError:
+            # Filesystems that will not rename over an existing file
+            os.remove(self._index())
+            os.rename(tmp, self._index())
+
+    @staticmethod
+    def _parse_queued(line):
+        """SpoolEntry from a Q record; a record from before xids gets a new one."""
+        rec = line.split(' ', 7)
+        try:
+            xid, name = int(rec[6]), rec[7]
+        except (ValueError, IndexError):
+            # Q <id> <kind> <zflag> <length> <size> <name>
+            xid, name = _new_xid(), line.split(' ', 6)[6]
+        return SpoolEntry(int(rec[1]), int(rec[2]), int(rec[3]), int(rec[4]), int(rec[5]), xid, name)
+
+    @staticmethod
+    def _queued(e):
+        return f"Q {e.id} {e.kind} {e.zflag} {e.length} {e.size} {e.xid} {e.name}\n"
+
+    def reserve(self):
+        with self.lock:
+            entry_id = self.next_id
+            self.next_id += 1
+        return entry_id
+
+    def add(self, entry_id, kind, zflag, length, size, name):
+        e = SpoolEntry(entry_id, kind, zflag, length, size, _new_xid(), name)
+        with self.lock:
+            with open(self._index(), 'a') as f:
+                f.write(self._queued(e))
+            self.entries.append(e)
+        return e
+
+    def ack(self, entry, offset):
+        if offset is None:
+            entry.acked = entry.length
+            entry.done = True
+        elif offset > entry.acked:
+            entry.acked = offset
+            if offset - entry.saved < self.CHECKPOINT:
+                return
+        else:
+            return
+        if entry not in self.dirty:
+            self.dirty.append(entry)
+
+    def sync(self):
+        if not self.dirty:
+            return
+        dirty = self.dirty
+        self.dirty = []
+        with self.lock:
+            for e in dirty:
+                if e.done:
+                    self.entries.remove(e)
+            if self.entries:
+                with open(self._index(), 'a') as f:
+                    for e in dirty:
+                        if e.done:
+                            f.write(f"D {e.id}\n")
+                        else:
+                            f.write(f"A {e.id} {e.acked}\n")
+                            e.saved = e.acked
+            else:
+                open(self._index(), 'w').close()  # Nothing pending: start afresh
+            # Data goes only once the index no longer points at it
+            for e in dirty:
+                if e.done:
+                    os.remove(self.path(e.id))
+
+    def pending_bytes(self):
+        return sum(e.length - e.acked for e in self.entries)
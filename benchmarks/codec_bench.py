@@ -0,0 +1,209 @@
+"""
+Packet codec micro-benchmarks (host side, CPython 3).
+
+Compares encode/decode cost of every wire format in the tree:
+MiniPacket (V1.1), PacketV12, PacketV13 and the beacon_protocol family.
+For each format and payload size it reports:
+
+- encode / decode throughput (frames per second)
+- encode throughput into a reusable buffer, for formats with pack_into()
+- bytes allocated per encode and per decode (tracemalloc)
+- header overhead (frame length minus payload length)
+
+Results are written as JSON so two releases can be diffed:
+
+    python benchmarks/codec_bench.py --out bench_v1.json
+    python benchmarks/codec_bench.py --compare bench_v1.json bench_v2.json
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'LoRa')
+PAYLOAD_SIZES = (0, 16, 50, 100, 180, 200)
+
+# Shared modules (crc.py, packet_pool.py, beacon_protocol.py) live in LoRa/
+sys.path.insert(0, ROOT)
+
+
+def _load(name, rel_path):
+    """Import a file under a unique module name (every version ships `mini_protocol.py`)."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, rel_path))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def _formats():
+    """
+    Returns {name: (max_payload, make(size) -> packet, decode(frame))}.
+    `make` builds a packet carrying `size` bytes of variable payload.
+    """
+    v11 = _load('mini_protocol_v11', 'V1.1/mini_protocol.py')
+    v12 = _load('mini_protocol_v12', 'V1.2/mini_protocol.py')
+    v13 = _load('mini_protocol_v13', 'V1.3/mini_protocol.py')
+    bp = _load('beacon_protocol_bench', 'beacon_protocol.py')
+
+    return {
+        'MiniPacket': (50,
+                       lambda n: v11.MiniPacket(0x0B, 0x0A, 3, v11.MiniPacket.TYPE_DATA, bytes(n)),
+                       v11.MiniPacket.from_bytes),
+        'PacketV12': (50,
+                      lambda n: v12.PacketV12(0x0B, 0x0A, 3, v12.PacketV12.TYPE_DATA, bytes(n)),
+                      v12.PacketV12.from_bytes),
+        'PacketV13': (249,
+                      lambda n: v13.PacketV13(0x0B, 0x0A, 3, v13.PacketV13.TYPE_FILE_CHUNK, bytes(n)),
+                      v13.PacketV13.from_bytes),
+        'DataPacket': (249,
+                       lambda n: bp.DataPacket(0x0B, 0x0A, 3, bp.TYPE_FILE_CHUNK, bytes(n)),
+                       bp.DataPacket.from_bytes),
+        # Variable part = one byte per active node
+        'BeaconPacket': (200,
+                         lambda n: bp.BeaconPacket(1, 1700000000000, 1699999980000, 3, list(range(2, 2 + n))),
+                         bp.BeaconPacket.from_bytes),
+        # Same node list, v2 node-set encoding (list or 32-byte bitmap)
+        'CompactBeaconPacket': (200,
+                                lambda n: bp.CompactBeaconPacket(1, 1700000000000, 3, list(range(2, 2 + n))),
+                                bp.CompactBeaconPacket.from_bytes),
+        # Variable part = one (addr, lane) assignment per 2 bytes
+        'HubSchedPacket': (200,
+                           lambda n: bp.HubSchedPacket([(2 + i, (i % 5) + 1) for i in range(n // 2)]),
+                           bp.HubSchedPacket.from_bytes),
+        # Same assignments, v2 node set + 4-bit lanes
+        'CompactHubSchedPacket': (200,
+                                  lambda n: bp.CompactHubSchedPacket([(2 + i, (i % 5) + 1) for i in range(n // 2)]),
+                                  bp.CompactHubSchedPacket.from_bytes),
+        # Fixed-size frames: only the zero-payload row applies
+        'ControlPacket': (0, lambda n: bp.ControlPacket(2, 12.9716, 77.5946), bp.ControlPacket.from_bytes),
+        'JoinReqPacket': (0, lambda n: bp.JoinReqPacket(2, 12.9716, 77.5946), bp.JoinReqPacket.from_bytes),
+        'CompactJoinReqPacket': (0,
+                                 lambda n: bp.CompactJoinReqPacket(2, bp.PositionEncoder().join(12.9716, 77.5946)),
+                                 bp.CompactJoinReqPacket.from_bytes),
+        # Heartbeat from a node that moved ~10 m since its last absolute fix
+        'CompactControlPacket': (0,
+                                 lambda n: bp.CompactControlPacket(2, (bp.GPS_DELTA, 1, 9, -4)),
+                                 bp.CompactControlPacket.from_bytes),
+        # Same heartbeat, carrying a completed broadcast transfer id
+        'BcastControlPacket': (0,
+                               lambda n: bp.BcastControlPacket(2, 7, (bp.GPS_DELTA, 1, 9, -4)),
+                               bp.BcastControlPacket.from_bytes),
+        # Variable part = one LT symbol
+        'FountainPacket': (244,
+                           lambda n: bp.FountainPacket(7, 65536, 300, 3, bytes(n)),
+                           bp.FountainPacket.from_bytes),
+    }
+
+
+def _rate(fn, arg, min_time):
+    """Calls per second of fn(arg), measured for at least `min_time` seconds."""
+    loops = 16
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn(arg)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return loops / elapsed
+        loops *= 2
+
+
+def _alloc_bytes(fn, arg, rounds=200):
+    """Average peak heap growth (bytes) during one fn(arg) call, temporaries included."""
+    fn(arg)  # warm caches / lazy imports
+    total = 0
+    tracemalloc.start()
+    try:
+        for _ in range(rounds):
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            fn(arg)
+            total += tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    return total / rounds
+
+
+def run(min_time=0.05, sizes=PAYLOAD_SIZES):
+    results = []
+    for name, (max_payload, make, decode) in _formats().items():
+        for size in sizes:
+            if size > max_payload:
+                continue
+            pkt = make(size)
+            frame = pkt.to_bytes()
+            if decode(frame) is None:
+                raise RuntimeError(f"{name}: round-trip failed at payload {size}")
+            row = {
+                'format': name,
+                'payload': size,
+                'frame_len': len(frame),
+                'header_overhead': len(frame) - size,
+                'encode_per_s': round(_rate(lambda p: p.to_bytes(), pkt, min_time)),
+                'decode_per_s': round(_rate(decode, frame, min_time)),
+                'encode_alloc_bytes': round(_alloc_bytes(lambda p: p.to_bytes(), pkt), 1),
+                'decode_alloc_bytes': round(_alloc_bytes(decode, frame), 1),
+            }
+            if hasattr(pkt, 'pack_into'):
+                buf = bytearray(512)
+                row['pack_into_per_s'] = round(_rate(lambda p: p.pack_into(buf), pkt, min_time))
+                row['pack_into_alloc_bytes'] = round(_alloc_bytes(lambda p: p.pack_into(buf), pkt), 1)
+            results.append(row)
+    return {
+        'python': platform.python_implementation() + ' ' + platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def compare(old_path, new_path):
+    """Print per-row relative change between two result files."""
+    with open(old_path) as f:
+        old = {(r['format'], r['payload']): r for r in json.load(f)['results']}
+    with open(new_path) as f:
+        new = {(r['format'], r['payload']): r for r in json.load(f)['results']}
+
+    keys = ('frame_len', 'encode_per_s', 'decode_per_s', 'pack_into_per_s',
+            'encode_alloc_bytes', 'decode_alloc_bytes')
+    print(f"{'format':<15}{'payload':>8}  " + ''.join(f"{k:>20}" for k in keys))
+    for key in sorted(set(old) | set(new)):
+        o, n = old.get(key), new.get(key)
+        if o is None or n is None:
+            print(f"{key[0]:<15}{key[1]:>8}  {'only in ' + ('new' if o is None else 'old'):>20}")
+            continue
+        cells = []
+        for k in keys:
+            if k not in o or k not in n:
+                cells.append(f"{'-':>20}")
+            elif o[k]:
+                cells.append(f"{(n[k] - o[k]) * 100.0 / o[k]:>+19.1f}%")
+            else:
+                cells.append(f"{n[k]:>20}")
+        print(f"{key[0]:<15}{key[1]:>8}  " + ''.join(cells))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--out', help='write JSON results to this file (default: stdout)')
+    ap.add_argument('--min-time', type=float, default=0.05, help='seconds per throughput measurement')
+    ap.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='diff two result files')
+    args = ap.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    data = json.dumps(run(args.min_time), indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(data + '\n')
+    else:
+        print(data)
+
+
+if __name__ == '__main__':
+    main()
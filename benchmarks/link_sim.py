@@ -0,0 +1,272 @@
+"""
+Two-node loopback simulation of LoRa/V1.3/main.py (host side, CPython 3).
+
+Runs two copies of the V1.3 node in one process over a simulated radio
+link, sends a file plus a few text messages each way, and reports:
+
+- whether the file arrived intact, and the time until everything arrived
+- radio packets sent by both nodes until then
+- write() calls on the received file (flash writes on the device)
+- peak number of frames held whole in the receiver's reorder buffer
+  (sampled every 10 ms)
+
+The radio, threads, timers and the web server are stubbed: every send
+takes --air-ms and is dropped with probability --loss. Each run prints
+one JSON object. Results vary a little from run to run (thread timing,
+random loss), so compare a few runs.
+
+    python benchmarks/link_sim.py --loss 0.2 --size 20000
+    python benchmarks/link_sim.py --rev 65ec161^ --loss 0.2 --size 20000
+    python benchmarks/link_sim.py --set "FILE_OFFSETS_ENABLED = False"
+
+--rev runs the LoRa/ tree of an older commit (exported with git archive)
+so a change can be measured against the code before it.
+"""
+import argparse
+import io
+import json
+import os
+import queue
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import types
+
+REPO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# --- MicroPython stand-ins ---
+T0 = time.monotonic()
+
+
+def _ticks_ms():
+    return int((time.monotonic() - T0) * 1000) & 0x3FFFFFFF
+
+
+def _ticks_diff(a, b):
+    d = (a - b) & 0x3FFFFFFF
+    return d - 0x40000000 if d >= 0x20000000 else d
+
+
+def _stub_micropython():
+    time.ticks_ms = _ticks_ms
+    time.ticks_diff = _ticks_diff
+    time.ticks_add = lambda a, b: (a + b) & 0x3FFFFFFF
+    time.ticks_us = lambda: int((time.monotonic() - T0) * 1e6) & 0x3FFFFFFF
+    time.sleep_ms = lambda ms: time.sleep(ms / 1000)
+
+    machine = types.ModuleType('machine')
+    machine.Pin = lambda *a, **k: None
+    thread = types.ModuleType('_thread')
+    thread.allocate_lock = threading.Lock
+    thread.start_new_thread = lambda f, a: threading.Thread(target=f, args=a, daemon=True).start()
+    sx126x = types.ModuleType('sx126x')
+    sx126x.CHANNEL_FREE = 0
+    sx1262 = types.ModuleType('sx1262')
+    sx1262.SX1262 = Radio
+    sys.modules.update(machine=machine, _thread=thread, sx126x=sx126x, sx1262=sx1262)
+    for name in ('network', 'socket', 'select'):
+        sys.modules[name] = types.ModuleType(name)
+
+
+class Radio:
+    """SX1262 stand-in: one queue per frequency, lossy, `air_ms` per send."""
+    loss = 0.0
+    air_ms = 20.0
+    channels = {}
+
+    def __init__(self, **kwargs):
+        self.q = None
+        self.sent = 0
+
+    def begin(self, freq, **kwargs):
+        self.q = Radio.channels.setdefault(freq, queue.Queue())
+
+    def scanChannel(self):
+        return 0
+
+    def send(self, buf, n=None):
+        data = bytes(buf[:n] if n is not None else buf)
+        self.sent += 1
+        time.sleep(Radio.air_ms / 1000)
+        if random.random() >= Radio.loss:
+            self.q.put(data)
+
+    def recv(self, len=0, timeout_en=True, timeout_ms=1000):
+        try:
+            return self.q.get(timeout=timeout_ms / 1000), 0
+        except queue.Empty:
+            return b'', 0
+
+    def getTimeOnAir(self, n, sf=7, bw=250):
+        # SX126x formula (CR 4/5, 8-symbol preamble, explicit header, CRC on)
+        sym = int(((1000 * 10) << sf) / (bw * 10))
+        div = 4 * sf if sym < 16000 else 4 * (sf - 2)
+        bits = max(0, int(8 * n + 16 - 4 * sf + 8 + 20))
+        return int(sym * int(16 * 4 + 17 + int((bits + div - 1) / div) * 5 * 4) / 4)
+
+
+class _CountedFile:
+    """File wrapper counting write() calls."""
+
+    def __init__(self, f):
+        self._f = f
+        self.writes = 0
+
+    def write(self, data):
+        self.writes += 1
+        return self._f.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+def _export(rev, dest):
+    """Extract LoRa/ as of `rev` into `dest`; returns the LoRa directory."""
+    tar = subprocess.run(['git', '-C', REPO, 'archive', rev, 'LoRa'],
+                         check=True, stdout=subprocess.PIPE).stdout
+    tarfile.open(fileobj=io.BytesIO(tar)).extractall(dest)
+    return os.path.join(dest, 'LoRa')
+
+
+def _load(root, addr, target, work, settings, verbose):
+    """Run one node's main.py (web server left out); returns its globals."""
+    with open(os.path.join(root, 'V1.3', 'main.py')) as f:
+        src = f.read().replace('\r\n', '\n')
+    src = re.sub(r'^MY_ADDR = \w+', f'MY_ADDR = {addr}', src, flags=re.M)
+    src = re.sub(r'^TARGET_ADDR = \w+', f'TARGET_ADDR = {target}', src, flags=re.M)
+    for name in ('SPOOL_DIR', 'RESUME_DIR'):
+        src = re.sub(rf'^{name} = .*$', f'{name} = {os.path.join(work, f"{name.lower()}{addr}")!r}', src, flags=re.M)
+    src = src.replace('\nrun_web_server()\n', '\n').replace('print("Services Started', 'pass  # print("')
+    # Settings go right after the config block, before anything reads them
+    at = src.index('# --- HARDWARE INIT ---')
+    src = src[:at] + ''.join(s + '\n' for s in settings) + src[at:]
+
+    ns = {'__name__': f'node{addr:02x}', 'writes': [], 'heard': [0]}
+
+    def counted_open(path, mode='r', *args):
+        f = open(path, mode, *args)
+        if not os.path.isabs(path) and ('w' in mode or '+' in mode):
+            f = _CountedFile(f)
+            ns['writes'].append(f)
+        return f
+    ns['open'] = counted_open
+    if not verbose:
+        ns['print'] = lambda *args, **kwargs: None
+    exec(compile(src, f'node{addr:02x}/main.py', 'exec'), ns)
+
+    log_web = ns['log_web']
+
+    def counting_log_web(msg):
+        if msg.startswith('<< '):
+            ns['heard'][0] += 1
+        log_web(msg)
+    ns['log_web'] = counting_log_web
+    return ns
+
+
+def _queue_file(node, name, data):
+    if 'spool' in node:
+        entry_id = node['spool'].reserve()
+        with open(node['spool'].path(entry_id), 'wb') as f:
+            f.write(data)
+        node['queue_file'](name, entry_id, len(data))
+    else:
+        node['queue_file'](name, data)
+
+
+def run(root, work, loss, size, msgs, limit, settings, seed, verbose=False):
+    """
+    One run with fresh nodes, spools and channels under `work`. The nodes
+    of earlier runs keep running on their own channels until exit.
+    """
+    random.seed(seed)
+    Radio.loss = loss
+    Radio.channels = {}
+    cwd = os.getcwd()
+    try:
+        out = os.path.join(work, 'out')
+        os.mkdir(out)
+        os.chdir(out)  # Received files land here
+        a = _load(root, 0x0B, 0x0A, work, settings, verbose)
+        b = _load(root, 0x0A, 0x0B, work, settings, verbose)
+        data = bytes(random.getrandbits(8) for _ in range(size))
+
+        start = time.monotonic()
+        _queue_file(a, 'f.bin', data)
+        for i in range(msgs):
+            a['queue_message'](f'hello {i} ' * 5)
+            b['queue_message'](f'back {i} ' * 5)
+
+        def received():
+            if a['heard'][0] < msgs or b['heard'][0] < msgs or not os.path.exists('f.bin'):
+                return False
+            with open('f.bin', 'rb') as f:
+                return f.read() == data
+
+        peak = 0
+        ok = False
+        while time.monotonic() - start < limit:
+            held = sum(1 for p in list(b['rx_packet_buffer'].values()) if type(p) is not tuple)
+            peak = max(peak, held)
+            if received():
+                ok = True
+                break
+            time.sleep(0.01)
+        return {
+            'ok': ok,
+            'seconds': round(time.monotonic() - start, 2),
+            'radio_packets': a['sx_tx'].sent + b['sx_tx'].sent,
+            'file_writes': sum(f.writes for f in b['writes']),
+            'reorder_peak': peak,
+        }
+    finally:
+        os.chdir(cwd)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--rev', help='git revision whose LoRa/ tree to run (default: working tree)')
+    ap.add_argument('--loss', type=float, default=0.2, help='probability that a radio packet is lost')
+    ap.add_argument('--air-ms', type=float, default=20.0, help='milliseconds each send takes')
+    ap.add_argument('--size', type=int, default=3000, help='file size in bytes')
+    ap.add_argument('--msgs', type=int, default=5, help='text messages sent each way')
+    ap.add_argument('--limit', type=float, default=120.0, help='give up after this many seconds')
+    ap.add_argument('--runs', type=int, default=1, help='repeat the run this many times')
+    ap.add_argument('--seed', type=int, default=1, help='random seed of the first run')
+    ap.add_argument('--set', action='append', default=[], metavar='STMT',
+                    help='config statement for both nodes, e.g. "FEC_ENABLED = True"')
+    ap.add_argument('--verbose', action='store_true', help="show the nodes' own output")
+    args = ap.parse_args(argv)
+
+    Radio.air_ms = args.air_ms
+    _stub_micropython()
+    tmp = tempfile.mkdtemp(prefix='link_sim_')
+    root = _export(args.rev, tmp) if args.rev else os.path.join(REPO, 'LoRa')
+    # Shared modules (packet_pool.py, tx_spool.py, ...) live in LoRa/
+    sys.path[:0] = [os.path.join(root, 'V1.3'), root]
+    try:
+        for i in range(args.runs):
+            work = os.path.join(tmp, f'run{i}')
+            os.mkdir(work)
+            result = run(root, work, args.loss, args.size, args.msgs, args.limit, args.set, args.seed + i, args.verbose)
+            result.update(rev=args.rev or 'working tree', loss=args.loss, size=args.size, msgs=args.msgs)
+            print(json.dumps(result, sort_keys=True), flush=True)
+    finally:
+        shutil.rmtree(tmp, True)
+        os._exit(0)  # Node threads never return
+
+
+if __name__ == '__main__':
+    main()
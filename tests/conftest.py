@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Device modules import each other by bare name, as they sit side by side on the board
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'LoRa'))
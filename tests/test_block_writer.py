@@ -0,0 +1,88 @@
+import io
+import os
+import random
+
+from block_writer import BlockWriter
+
+
+class File(io.BytesIO):
+    """In-memory file counting write() calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def write(self, data):
+        self.calls += 1
+        return super().write(data)
+
+
+def test_sequential_chunks_become_block_writes():
+    f = File()
+    w = BlockWriter(f, 1024, 2)
+    data = os.urandom(4000)
+    for i in range(0, len(data), 200):
+        w.write(data[i:i + 200])
+    w.flush()
+    assert f.getvalue() == data
+    assert f.calls == w.writes == 4  # Three full blocks, then the tail at flush
+    assert w.bytes == 4000
+
+
+def test_out_of_order_extents_merge():
+    f = File()
+    w = BlockWriter(f, 1024, 2)
+    data = os.urandom(1024)
+    # Holes filled later; touching extents merge into one block write
+    for start in (512, 0, 768, 256):
+        w.write(data[start:start + 256], start)
+    assert w.extents == [[], []]  # Written out once complete
+    assert f.getvalue() == data and f.calls == 1
+
+
+def test_random_order_across_blocks():
+    f = File()
+    w = BlockWriter(f, 512, 3)
+    data = os.urandom(5000)
+    offsets = list(range(0, len(data), 100))
+    random.Random(3).shuffle(offsets)
+    for off in offsets:
+        w.write(data[off:off + 100], off)
+    w.flush()
+    assert f.getvalue() == data
+
+
+def test_flush_partial_extents_below_end():
+    f = File()
+    w = BlockWriter(f, 1024, 2)
+    w.write(b'a' * 100, 0)
+    w.write(b'b' * 100, 300)
+    w.write(b'c' * 100, 2048)
+    w.flush(1024)  # Only the first block, as its two separate extents
+    assert f.calls == 2
+    assert f.getvalue()[:100] == b'a' * 100 and f.getvalue()[300:400] == b'b' * 100
+    assert len(f.getvalue()) == 400
+    w.flush()
+    assert f.getvalue()[2048:] == b'c' * 100
+
+
+def test_lru_eviction():
+    f = File()
+    w = BlockWriter(f, 1024, 2)
+    w.write(b'1', 0)
+    w.write(b'2', 1024)
+    w.write(b'3', 1)      # Touches block 0 again
+    w.write(b'4', 2048)   # Evicts block 1, the least recently used
+    assert f.getvalue() == b'\0' * 1024 + b'2'
+    w.flush()
+    assert f.getvalue()[:2] == b'13' and f.getvalue()[2048:] == b'4'
+
+
+def test_seek_then_sequential():
+    f = File()
+    w = BlockWriter(f, 1024, 2)
+    w.seek(100)
+    w.write(b'xy')
+    w.write(b'z')
+    w.flush()
+    assert f.getvalue()[100:] == b'xyz'
@@ -0,0 +1,50 @@
+from chunk_bitmap import ChunkBitmap
+
+
+def test_runs_mark_whole_blocks(tmp_path):
+    bm = ChunkBitmap(str(tmp_path / 'bm'), 1, 5000)  # 10 blocks, the last one short
+    bm.wrote(1100)
+    assert bm.ranges(8) == [(0, 2)]
+    bm.seek(2000)  # Block 3 is only partly covered by this run
+    bm.wrote(1000)
+    assert bm.ranges(8) == [(0, 2), (4, 1)]
+    bm.seek(4600)
+    bm.wrote(400)  # Reaches the end: the short last block counts
+    assert bm.ranges(8) == [(0, 2), (4, 1), (9, 1)]
+    assert bm.ranges(2) == [(0, 2), (4, 1)]
+
+
+def test_block_grows_for_large_files(tmp_path):
+    bm = ChunkBitmap(str(tmp_path / 'bm'), 1, 100 * 1024 * 1024)
+    assert bm.blocks() <= 0xFFFF and bm.block == 2048
+
+
+def test_save_load(tmp_path):
+    path = str(tmp_path / 'bm')
+    bm = ChunkBitmap(path, 0xDEADBEEF, 5000)
+    bm.wrote(2048)
+    assert bm.unsaved == 2048
+    bm.save()
+    assert bm.unsaved == 0
+    again = ChunkBitmap.load(path, 0xDEADBEEF, 5000)
+    assert again.ranges(8) == [(0, 4)] and again.block == bm.block
+
+
+def test_load_rejects_other_transfer(tmp_path):
+    path = str(tmp_path / 'bm')
+    ChunkBitmap(path, 7, 5000).save()
+    assert ChunkBitmap.load(path, 8, 5000) is None  # Other xid
+    assert ChunkBitmap.load(path, 7, 5001) is None  # Other size
+    assert ChunkBitmap.load(path, 7, 5000) is not None
+
+
+def test_load_missing_or_torn(tmp_path):
+    path = str(tmp_path / 'bm')
+    assert ChunkBitmap.load(path, 7, 5000) is None
+    ChunkBitmap(path, 7, 5000).save()
+    with open(path, 'rb') as f:
+        data = f.read()
+    for n in (5, len(data) - 1):
+        with open(path, 'wb') as f:
+            f.write(data[:n])
+        assert ChunkBitmap.load(path, 7, 5000) is None
@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+import crc
+
+
+def bitwise_crc16(data):
+    # The per-bit CRC16-CCITT every packet module carried before crc.py
+    value = 0xFFFF
+    for byte in data:
+        value ^= byte << 8
+        for _ in range(8):
+            if value & 0x8000:
+                value = (value << 1) ^ 0x1021
+            else:
+                value <<= 1
+        value &= 0xFFFF
+    return value
+
+
+@pytest.mark.parametrize('data', [b'', b'\x00', b'\xff', b'123456789', bytes(range(256)), os.urandom(255)])
+def test_table_matches_bitwise(data):
+    assert crc.crc16(data) == bitwise_crc16(data)
+
+
+def test_check_value():
+    # CRC-16/CCITT-FALSE check value
+    assert crc.crc16(b'123456789') == 0x29B1
+
+
+def test_update_in_parts():
+    data = os.urandom(100)
+    running = crc.update(crc.CRC16_INIT, data[:37])
+    assert crc.update(running, memoryview(data)[37:]) == crc.crc16(data)
+
+
+def test_accepts_buffer_types():
+    data = b'lora frame'
+    assert crc.crc16(bytearray(data)) == crc.crc16(memoryview(data)) == crc.crc16(data)
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import fec
+
+
+def chunks(lengths):
+    return [os.urandom(n) for n in lengths]
+
+
+@pytest.mark.parametrize('lost', range(6))
+def test_rebuild_missing_chunk(lost):
+    data = chunks([200, 200, 200, 200, 200, 37])  # Last chunk of a file is short
+    parity = fec.encode(data, 10, 1)
+    others = [c for i, c in enumerate(data) if i != lost]
+    assert fec.rebuild(parity, others) == data[lost]
+
+
+def test_interleaved_lanes():
+    # P = 2: parity j covers chunks j, j + 2, ... - a burst of two losses is repaired
+    data = chunks([120] * 6)
+    seqs = list(range(250, 256))
+    lanes = [fec.encode(data[j::2], seqs[j], 2) for j in range(2)]
+    for j, parity in enumerate(lanes):
+        assert fec.covered(parity, 256 + j) == seqs[j::2]
+    lost = {2, 3}
+    for j, parity in enumerate(lanes):
+        lane = range(j, 6, 2)
+        missing = [i for i in lane if i in lost]
+        assert len(missing) == 1
+        assert fec.rebuild(parity, [data[i] for i in lane if i not in lost]) == data[missing[0]]
+
+
+def test_covered_wraps_8_bit():
+    parity = fec.encode(chunks([10, 10, 10]), 254, 1)
+    assert fec.covered(parity, 1) == [254, 255, 0]
+
+
+def test_covered_16_bit():
+    # Only the low byte of the first seq is sent; the parity's own seq gives the rest
+    parity = fec.encode(chunks([10, 10, 10]), 0x12FE, 1)
+    assert fec.covered(parity, 0x1301, 65536) == [0x12FE, 0x12FF, 0x1300]
@@ -0,0 +1,59 @@
+import os
+import random
+
+import pytest
+
+import fountain
+
+SYMBOL = 50
+
+
+def transfer(blob, keep, seed, limit):
+    """Feed an encoder's symbols to a decoder, each kept with probability `keep`."""
+    random.seed(seed)  # Encoder degrees come from `random`
+    rnd = random.Random(seed + 1000)
+    enc = fountain.Encoder(7, blob, SYMBOL)
+    dec = fountain.Decoder(7, len(blob), SYMBOL)
+    buf = bytearray(SYMBOL)
+    for _ in range(limit):
+        esi, degree = enc.next_symbol(buf)
+        if rnd.random() < keep and dec.add(esi, degree, buf):
+            return dec
+    return dec
+
+
+def test_clean_link_decodes_from_first_k():
+    blob = os.urandom(1000)
+    dec = transfer(blob, 1.0, 1, 20)
+    assert dec.done and dec.received == 20
+    assert dec.data() == blob
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_decodes_from_random_subset(seed):
+    blob = os.urandom(40 * SYMBOL - 13)  # Last block zero-padded
+    dec = transfer(blob, 0.6, seed, 4 * 40)
+    assert dec.done
+    assert dec.data() == blob
+
+
+def test_neighbors_match_both_sides():
+    k = 30
+    for esi in range(k, k + 50):
+        blocks = fountain.neighbors(3, esi, 4, k)
+        assert blocks == fountain.neighbors(3, esi, 4, k)
+        assert len(blocks) == 4 and len(set(blocks)) == 4
+        assert all(0 <= b < k for b in blocks)
+
+
+def test_wrong_symbol_size_ignored():
+    dec = fountain.Decoder(1, 100, SYMBOL)
+    assert not dec.add(0, 1, bytes(SYMBOL - 1))
+    assert dec.received == 0
+
+
+def test_soliton_cdf():
+    cdf = fountain.soliton_cdf(40)
+    assert len(cdf) == 40
+    assert cdf == sorted(cdf)
+    assert abs(cdf[-1] - 1.0) < 1e-9
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+import lzss
+
+SAMPLES = [
+    b'',
+    b'a',
+    b'ab',
+    b'aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa',
+    b'hello lora ' * 40,
+    ''.join(f'line {i} of the text file\n' for i in range(600)).encode(),
+    bytes(random.Random(1).getrandbits(8) for _ in range(3000)),
+]
+
+
+@pytest.mark.parametrize('data', SAMPLES)
+def test_roundtrip(data):
+    assert lzss.decompress(lzss.compress(data)) == data
+
+
+def test_compresses_text():
+    data = SAMPLES[5]
+    assert len(lzss.compress(data)) < len(data) // 3
+
+
+@pytest.mark.parametrize('data', SAMPLES[3:])
+@pytest.mark.parametrize('seed', range(5))
+def test_split_feeds(data, seed):
+    # Piece boundaries land anywhere, including between the two match bytes
+    packed = lzss.compress(data)
+    rnd = random.Random(seed)
+    dec = lzss.Decompressor()
+    out = bytearray()
+    i = 0
+    while i < len(packed):
+        n = rnd.randint(1, 40)
+        out += dec.feed(memoryview(packed)[i:i + n])
+        i += n
+    assert out == data
+    assert (dec.total_in, dec.total_out) == (len(packed), len(data))
+
+
+def test_byte_by_byte():
+    data = SAMPLES[4]
+    dec = lzss.Decompressor()
+    assert b''.join(bytes(dec.feed(bytes((b,)))) for b in lzss.compress(data)) == data
+
+
+def test_matches_reach_back_a_window():
+    block = bytes(random.Random(2).getrandbits(8) for _ in range(lzss.WINDOW - 100))
+    data = block + block[:500]
+    packed = lzss.compress(data)
+    assert len(packed) < len(data)
+    assert lzss.decompress(packed) == data
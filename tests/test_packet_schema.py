@@ -0,0 +1,104 @@
+import pytest
+
+import packet_schema
+from packet_schema import Layout, SchemaPacket
+
+
+class Frame(SchemaPacket):
+    __slots__ = ('kind', 'to_addr', 'seq', 'items')
+
+    def __init__(self, kind=0, to_addr=0, seq=0, items=None):
+        self.kind = kind
+        self.to_addr = to_addr
+        self.seq = seq
+        self.items = items if items is not None else []
+
+
+def layout(tail, crc=True, dest=None):
+    counted = tail in ('list', 'pairs')
+    return Layout(0x42, 'BBH' + ('B' if counted else ''), ('kind', 'to_addr', 'seq'), (tail, 'items'), crc, dest)
+
+
+def roundtrip(lay, pkt):
+    data = lay.to_bytes(pkt)
+    assert len(data) == lay.size(pkt)
+    return lay.unpack(Frame, data)
+
+
+def test_counted_list():
+    lay = layout('list')
+    out = roundtrip(lay, Frame(1, 2, 513, [5, 6, 7]))
+    assert (out.kind, out.to_addr, out.seq, out.items) == (1, 2, 513, [5, 6, 7])
+    assert lay.to_bytes(Frame(items=[5, 6, 7]))[5] == 3  # Count byte after the fixed fields
+
+
+def test_counted_pairs():
+    out = roundtrip(layout('pairs'), Frame(items=[(1, 2), (3, 4)]))
+    assert out.items == [(1, 2), (3, 4)]
+
+
+def test_empty_counted_tail():
+    assert roundtrip(layout('list'), Frame()).items == []
+
+
+def test_bytes_tail_view():
+    lay = layout('bytes')
+    data = lay.to_bytes(Frame(items=b'payload'))
+    out = lay.unpack(Frame, data, view=True)
+    assert isinstance(out.items, memoryview) and bytes(out.items) == b'payload'
+    assert lay.unpack(Frame, data).items == b'payload'
+
+
+@pytest.mark.parametrize('nodes', [[], [3, 1, 2], list(range(31)), list(range(32)), list(range(0, 256, 3)), list(range(256))])
+def test_nodeset(nodes):
+    lay = layout('nodeset')
+    pkt = Frame(items=nodes)
+    data = lay.to_bytes(pkt)
+    # Up to 31 addresses as a list, from 32 on as a 32-byte bitmap
+    assert data[5] == (len(nodes) if len(nodes) < 32 else packet_schema.NODESET_BITMAP)
+    assert len(data) == lay.min_len + (1 + len(nodes) if len(nodes) < 32 else 33)
+    assert lay.unpack(Frame, data).items == sorted(nodes)
+
+
+@pytest.mark.parametrize('tail, items', [('list', [1, 2, 3]), ('pairs', [(1, 2)]), ('nodeset', [4, 5]),
+                                         ('nodeset', list(range(40)))])
+def test_truncated(tail, items):
+    lay = layout(tail, crc=False)
+    data = lay.to_bytes(Frame(items=items))
+    for n in range(len(data)):
+        assert lay.unpack(Frame, data[:n]) is None
+
+
+def test_wrong_type_and_bad_crc():
+    lay = layout('list')
+    data = bytearray(lay.to_bytes(Frame(items=[1])))
+    assert lay.unpack(Frame, data) is not None
+    data[-1] ^= 1
+    assert lay.unpack(Frame, data) is None
+    data[-1] ^= 1
+    data[0] = 0x43
+    assert lay.unpack(Frame, data) is None
+
+
+def test_dest_checked_before_crc(monkeypatch):
+    lay = layout('bytes', dest='to_addr')
+    data = lay.to_bytes(Frame(to_addr=7, items=b'x'))
+    calls = []
+    real = packet_schema.crc16
+    monkeypatch.setattr(packet_schema, 'crc16', lambda view: calls.append(1) or real(view))
+    assert lay.unpack(Frame, data, dest=8) is None
+    assert calls == []
+    assert lay.unpack(Frame, data, dest=7).to_addr == 7
+    assert calls == [1]
+
+
+def test_unpack_into_out():
+    lay = layout('list')
+    out = Frame()
+    assert lay.unpack(Frame, lay.to_bytes(Frame(seq=9, items=[1])), out) is out
+    assert out.seq == 9
+
+
+def test_fields_must_match_format():
+    with pytest.raises(ValueError):
+        Layout(0x42, 'BB', ('kind',))
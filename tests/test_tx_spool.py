@@ -0,0 +1,92 @@
+import os
+
+import tx_spool
+from tx_spool import TxSpool
+
+
+def queue(spool, data, name='f.bin', kind=tx_spool.KIND_FILE):
+    entry_id = spool.reserve()
+    with open(spool.path(entry_id), 'wb') as f:
+        f.write(data)
+    return spool.add(entry_id, kind, 0, len(data), len(data), name)
+
+
+def index(spool):
+    with open(spool.dir + '/index') as f:
+        return f.read()
+
+
+def test_reload_after_queue_ack_done(tmp_path):
+    d = str(tmp_path / 'spool')
+    spool = TxSpool(d)
+    a = queue(spool, b'a' * 10000, 'a.bin')
+    b = queue(spool, b'hello', 'msg', tx_spool.KIND_MSG)
+    c = queue(spool, b'c' * 100, 'c.bin')
+    spool.ack(a, 5000)  # Past CHECKPOINT: logged
+    spool.ack(b, None)
+    spool.sync()
+    assert not os.path.exists(spool.path(b.id))
+
+    again = TxSpool(d)
+    assert [e.id for e in again.entries] == [a.id, c.id]
+    ra, rc = again.entries
+    assert (ra.kind, ra.length, ra.size, ra.xid, ra.name, ra.acked) == (a.kind, 10000, 10000, a.xid, 'a.bin', 5000)
+    assert (rc.acked, rc.xid) == (0, c.xid)
+    assert again.next_id == c.id + 1
+    # Reloading compacts the log to the pending entries
+    assert index(again).count('\n') == 3 and 'D ' not in index(again)
+
+
+def test_small_acks_wait_for_checkpoint(tmp_path):
+    d = str(tmp_path / 'spool')
+    spool = TxSpool(d)
+    e = queue(spool, b'x' * 10000)
+    spool.ack(e, 100)
+    spool.sync()
+    assert TxSpool(d).entries[0].acked == 0
+    assert spool.pending_bytes() == 9900
+
+
+def test_torn_last_record(tmp_path):
+    d = str(tmp_path / 'spool')
+    spool = TxSpool(d)
+    a = queue(spool, b'a' * 10)
+    b = queue(spool, b'b' * 10)
+    with open(d + '/index', 'a') as f:
+        f.write(f"D {a.id}")  # Reset before the newline
+    again = TxSpool(d)
+    assert [e.id for e in again.entries] == [a.id, b.id]
+    assert index(again).endswith('\n')
+
+
+def test_torn_queue_record_drops_its_data(tmp_path):
+    d = str(tmp_path / 'spool')
+    spool = TxSpool(d)
+    a = queue(spool, b'a' * 10)
+    entry_id = spool.reserve()
+    with open(spool.path(entry_id), 'wb') as f:
+        f.write(b'cut short')
+    with open(d + '/index', 'a') as f:
+        f.write(f"Q {entry_id} 1 0 9 9 12")
+    again = TxSpool(d)
+    assert [e.id for e in again.entries] == [a.id]
+    assert not os.path.exists(again.path(entry_id))
+
+
+def test_last_entry_done_empties_log(tmp_path):
+    d = str(tmp_path / 'spool')
+    spool = TxSpool(d)
+    e = queue(spool, b'z')
+    spool.ack(e, None)
+    spool.sync()
+    assert index(spool) == ''
+    assert TxSpool(d).entries == []
+
+
+def test_queue_record_without_xid(tmp_path):
+    d = tmp_path / 'spool'
+    d.mkdir()
+    (d / '1.dat').write_bytes(b'data')
+    (d / 'index').write_text("Q 1 1 0 4 4 old name.bin\n")
+    e = TxSpool(str(d)).entries[0]
+    assert e.name == 'old name.bin' and 0 <= e.xid < 1 << 32